@@ -1,14 +1,26 @@
+cimport cython
+from cpython.buffer cimport Py_buffer
 from libc.stdint cimport *
 from libcpp.vector cimport vector
 
+# final so calls from other modules go straight to the C functions instead of through the vtable
+@cython.final
 cdef class ByteReader:
     cdef:
-        bytes buf # keep a reference to the Python bytes or else it'll be garbage collected
+        # whatever owns the memory being read, kept alive for as long as the reader is
+        object owner
+        Py_buffer view
+        bint has_view
         char *start
         char *pos
         char *end
 
+    @staticmethod
+    cdef ByteReader wrap(char *data, size_t size, object owner=*)
+    cdef void release(self)
     cdef char *read(self, size_t num) except NULL
+    cdef int read_into(self, void *out, size_t size) except -1
+    cdef int read_float_array(self, float *out, size_t count) except -1
     cpdef uint8_t read_uint8(self) except? 0
     cpdef int8_t read_int8(self) except? 0
     cpdef uint16_t read_uint16(self) except? 0
@@ -20,11 +32,17 @@ cdef class ByteReader:
     cpdef bint data_left(self)
     cpdef bytes get(self)
 
+@cython.final
 cdef class ByteWriter:
-    cdef vector[char] *vec
+    cdef vector[char] vec
 
+    @staticmethod
+    cdef ByteWriter acquire()
+    cpdef void release(self)
+    cpdef void reset(self)
     cpdef void write(self, bytes data, size_t size = ?) except *
-    cdef  void write_buf(self, char *buf, size_t size) except +
+    cdef  void write_buf(self, const char *buf, size_t size) except +
+    cdef  void write_float_array(self, const float *values, size_t count) except +
     cpdef void write_uint8(self, uint8_t val) except +
     cpdef void write_int8(self, int8_t val) except +
     cpdef void write_uint16(self, uint16_t val) except +
@@ -32,5 +50,5 @@ cdef class ByteWriter:
     cpdef void write_uint32(self, uint32_t val) except +
     cpdef void write_int32(self, int32_t val) except +
     cpdef void write_float(self, float val) except +
-    cpdef void write_bytes(self, bytes val) except +
+    cpdef void write_bytes(self, bytes val) except *
     cpdef bytes get(self)
@@ -1,3 +1,7 @@
+from cpython.buffer cimport PyObject_GetBuffer, PyBuffer_Release, PyBUF_SIMPLE
+from cpython.mem cimport PyMem_Malloc, PyMem_Free
+from libc.string cimport memcpy
+
 cdef extern from "bytes_c.cpp" nogil:
     uint8_t   read_uint8(char *buffer)
     uint16_t read_uint16(char *buffer)
@@ -13,18 +17,47 @@ cdef extern from "<string.h>" nogil:
     size_t strnlen(const char *s, size_t maxlen) # this isn't standard but gcc and msvc implement it so fuck it
 
 cdef class ByteReader:
-    def __init__(self, bytes buf, size_t size=0):
-        self.buf = buf
-        self.start = <char *>buf
-        self.pos = self.start
+    # Reads straight out of any buffer (bytes, bytearray, memoryview, mmap...) without copying it. The buffer is
+    # held for as long as the reader is, so a bytearray under a reader can't be resized.
+    def __init__(self, buf, size_t size=0):
+        self.release()
+        PyObject_GetBuffer(buf, &self.view, PyBUF_SIMPLE)
+        self.has_view = True
+        self.owner = buf
 
         if size == 0:
-            size = len(buf)
+            size = self.view.len
             if size == 0:
                 raise IOError("No data.")
+        elif size > <size_t>self.view.len:
+            raise ValueError(f"size {size} is larger than the buffer ({self.view.len} bytes)")
 
+        self.start = <char *>self.view.buf
+        self.pos = self.start
         self.end = self.start + size
 
+    def __dealloc__(self):
+        self.release()
+
+    # A reader over memory Python doesn't know about. `owner` is kept alive alongside it, whatever `data` belongs
+    # to has to outlive the reader.
+    @staticmethod
+    cdef ByteReader wrap(char *data, size_t size, object owner=None):
+        if size == 0:
+            raise IOError("No data.")
+        cdef ByteReader reader = ByteReader.__new__(ByteReader)
+        reader.owner = owner
+        reader.start = data
+        reader.pos = data
+        reader.end = data + size
+        return reader
+
+    cdef void release(self):
+        if self.has_view:
+            PyBuffer_Release(&self.view)
+            self.has_view = False
+        self.owner = None
+
     cdef char *read(self, size_t num) except NULL:
         if self.pos + num > self.end:
             raise IOError("Not enough data left.")
@@ -33,6 +66,24 @@ cdef class ByteReader:
         self.pos += num
         return pos
 
+    # copies the next `size` bytes as they are, for fixed-layout data read into a matching struct
+    cdef int read_into(self, void *out, size_t size) except -1:
+        memcpy(out, self.read(size), size)
+        return 0
+
+    cdef int read_float_array(self, float *out, size_t count) except -1:
+        return self.read_into(out, count * sizeof(float))
+
+    def read_floats(self, size_t count):
+        cdef float *values = <float *>PyMem_Malloc(count * sizeof(float))
+        if values == NULL:
+            raise MemoryError()
+        try:
+            self.read_float_array(values, count)
+            return tuple([values[i] for i in range(count)])
+        finally:
+            PyMem_Free(values)
+
     cpdef uint8_t read_uint8(self) except? 0:
         return read_uint8(self.read(sizeof(uint8_t)))
 
@@ -75,21 +126,52 @@ cdef class ByteReader:
     def __repr__(self):
         return repr(self.get())
 
+# writers given back with release(), ByteWriter.acquire() hands them out again with their buffers still allocated
+cdef list writer_pool = []
+cdef size_t WRITER_POOL_SIZE = 64
+# most packets fit in this, bigger ones grow the buffer once and keep it when pooled
+cdef size_t WRITER_RESERVE = 64
+
+
 cdef class ByteWriter:
     def __cinit__(self):
-        self.vec = new vector[char]()
+        self.vec.reserve(WRITER_RESERVE)
 
-    def __dealloc__(self):
-        del self.vec
+    # An empty writer from the pool, or a new one if the pool is empty.
+    @staticmethod
+    cdef ByteWriter acquire():
+        if writer_pool:
+            return writer_pool.pop()
+        return ByteWriter.__new__(ByteWriter)
+
+    # Empties the writer and puts it in the pool. It must not be used afterwards, anything written will be overwritten.
+    cpdef void release(self):
+        self.vec.clear()
+        if len(writer_pool) < WRITER_POOL_SIZE:
+            writer_pool.append(self)
+
+    cpdef void reset(self):
+        self.vec.clear()
 
     cpdef void write(self, bytes data, size_t size=0) except *:
         if size == 0:
             size = len(data)
         self.write_buf(data, size)
 
-    cdef void write_buf(self, char *buf, size_t size) except +:
+    cdef void write_buf(self, const char *buf, size_t size) except +:
         self.vec.insert(self.vec.end(), buf, buf + size)
 
+    cdef void write_float_array(self, const float *values, size_t count) except +:
+        self.write_buf(<const char *>values, count * sizeof(float))
+
+    def write_floats(self, values):
+        cdef float value
+        cdef size_t start = self.vec.size()
+        self.vec.resize(start + len(values) * sizeof(float))
+        for value in values:
+            memcpy(self.vec.data() + start, &value, sizeof(float))
+            start += sizeof(float)
+
     cpdef void write_uint8(self, uint8_t val) except +:
         self.write_buf(<char *>&val, sizeof(uint8_t))
 
@@ -111,8 +193,9 @@ cdef class ByteWriter:
     cpdef void write_float(self, float val) except +:
         self.write_buf(<char *>&val, sizeof(float))
 
-    cpdef void write_bytes(self, bytes val) except +:
-        self.write(val + b'\x00')
+    cpdef void write_bytes(self, bytes val) except *:
+        # bytes objects always keep a NUL after their data, it's written as the terminator
+        self.write_buf(val, len(val) + 1)
 
     cpdef bytes get(self):
         return self.vec.data()[:self.vec.size()]
@@ -96,6 +96,11 @@ class TEAM(IntEnum):
 
 MELEE_DISTANCE = 3
 
+# padding (in blocks) added to player hitboxes when checking hits clients report
+HITSCAN_TOLERANCE = 0.5
+# extra padding per block of distance, for orientation updates lagging behind shots
+HITSCAN_SPREAD = 0.08
+
 MAX_CHAT_SIZE = 90
 
 UPDATE_FPS = 60.0
@@ -1,15 +1,21 @@
 from acelib cimport math3d_c
+from libcpp.vector cimport vector
 
 cdef class Vector3:
     cdef:
         math3d_c.Vector3[double] *c_vec
+        # where c_vec points unless this is a proxy for someone else's vector
+        math3d_c.Vector3[double] value
         bint is_ref
     cpdef void set(self, double x, double y, double z)
+    cpdef void copy_from(self, Vector3 other)
     cpdef void normalize(self)
     cpdef double sq_magnitude(self)
     cpdef double magnitude(self)
     cpdef double sq_distance(self, Vector3 other)
     cpdef double distance(self, Vector3 other)
+    cpdef double sq_distance_xyz(self, double x, double y, double z)
+    cpdef double distance_xyz(self, double x, double y, double z)
     cpdef double dot(self, Vector3 other)
     cpdef double angle(self, Vector3 other, bint deg=*)
     cpdef bint equals(self, Vector3 other, double tolerance=*)
@@ -18,10 +24,26 @@ cdef class Vector3:
     cpdef Vector3 scale(self, Vector3 other)
     cpdef Vector3 max(self, Vector3 other)
     cpdef Vector3 min(self, Vector3 other)
+    cpdef Vector3 add_into(self, Vector3 other, Vector3 out)
+    cpdef Vector3 sub_into(self, Vector3 other, Vector3 out)
+    cpdef Vector3 mul_into(self, double scalar, Vector3 out)
+    cpdef Vector3 normalize_into(self, Vector3 out)
+
+
+cdef class Vector3Array:
+    cdef:
+        vector[math3d_c.Vector3[double]] data
+        Py_ssize_t shape[2]
+        Py_ssize_t strides[2]
+        # buffers handed out, the array can't be resized while any are alive
+        int exports
+    cdef int check_resize(self) except -1
+    cdef double[:] output(self, out)
 
 
 cdef inline Vector3 new_vector3_from(math3d_c.Vector3[double] &other):
-    cdef Vector3 vec = Vector3()
+    # __new__ skips __init__ and goes straight to the freelist
+    cdef Vector3 vec = Vector3.__new__(Vector3)
     vec.c_vec.x = other.x
     vec.c_vec.y = other.y
     vec.c_vec.z = other.z
@@ -29,7 +51,7 @@ cdef inline Vector3 new_vector3_from(math3d_c.Vector3[double] &other):
 
 
 cdef inline Vector3 new_vector3(double x, double y, double z):
-    cdef Vector3 vec = Vector3()
+    cdef Vector3 vec = Vector3.__new__(Vector3)
     vec.c_vec.x = x
     vec.c_vec.y = y
     vec.c_vec.z = z
@@ -1,20 +1,22 @@
 cimport cython
 
 from libc.stdlib cimport malloc, free
-from libc.math cimport sin, cos
+from libc.math cimport sin, cos, sqrt
 from libcpp cimport limits
 
+from array import array
 
+
+# Vectors are created and dropped all the time, the freelist saves most of the trips to the allocator and the
+# coordinates live inside the object itself.
+@cython.freelist(256)
 cdef class Vector3:
     def __cinit__(self, double x=0, double y=0, double z=0, bint ref=False):
         if not ref:
-            self.c_vec = new math3d_c.Vector3[double](x, y, z)
+            self.value.set(x, y, z)
+            self.c_vec = &self.value
         self.is_ref = ref
 
-    def __dealloc__(self):
-        if not self.is_ref:
-            del self.c_vec
-
     def __init__(self, double x=0, double y=0, double z=0, bint ref=False):
         pass
 
@@ -117,6 +119,9 @@ cdef class Vector3:
     cpdef void set(self, double x, double y, double z):
         self.c_vec.set(x, y, z)
 
+    cpdef void copy_from(self, Vector3 other):
+        self.c_vec[0] = other.c_vec[0]
+
     cpdef void normalize(self):
         self.c_vec.normalize()
 
@@ -132,6 +137,15 @@ cdef class Vector3:
     cpdef double distance(self, Vector3 other):
         return self.c_vec.distance(other.c_vec[0])
 
+    cpdef double sq_distance_xyz(self, double x, double y, double z):
+        x -= self.c_vec.x
+        y -= self.c_vec.y
+        z -= self.c_vec.z
+        return x * x + y * y + z * z
+
+    cpdef double distance_xyz(self, double x, double y, double z):
+        return sqrt(self.sq_distance_xyz(x, y, z))
+
     cpdef double dot(self, Vector3 other):
         return self.c_vec.dot(other.c_vec[0])
 
@@ -156,6 +170,26 @@ cdef class Vector3:
     cpdef Vector3 min(self, Vector3 other):
         return new_vector3_from(self.c_vec.min(other.c_vec[0]))
 
+    # The *_into variants write their result to `out` (which may be self or other) instead of a new Vector3,
+    # and return it.
+
+    cpdef Vector3 add_into(self, Vector3 other, Vector3 out):
+        out.c_vec.set(self.c_vec.x + other.c_vec.x, self.c_vec.y + other.c_vec.y, self.c_vec.z + other.c_vec.z)
+        return out
+
+    cpdef Vector3 sub_into(self, Vector3 other, Vector3 out):
+        out.c_vec.set(self.c_vec.x - other.c_vec.x, self.c_vec.y - other.c_vec.y, self.c_vec.z - other.c_vec.z)
+        return out
+
+    cpdef Vector3 mul_into(self, double scalar, Vector3 out):
+        out.c_vec.set(self.c_vec.x * scalar, self.c_vec.y * scalar, self.c_vec.z * scalar)
+        return out
+
+    cpdef Vector3 normalize_into(self, Vector3 out):
+        out.c_vec[0] = self.c_vec[0]
+        out.c_vec.normalize()
+        return out
+
     @property
     def normalized(self):
         cdef Vector3 ret = new_vector3_from(self.c_vec[0])
@@ -227,6 +261,155 @@ cdef class Vector3:
         return new_vector3(1, 0, 0)
 
 
+cdef class Vector3Array:
+    """
+    A resizable array of vectors stored as contiguous doubles, one row of x, y, z per vector. It exposes an Nx3 buffer
+    (anything taking points in acelib.world takes it as is) and has kernels that work over every row at once.
+
+    Args:
+        size (int): Rows to start with, all zero
+    """
+    def __cinit__(self, size_t size=0):
+        self.data.resize(size)
+        self.exports = 0
+
+    def __len__(self):
+        return self.data.size()
+
+    def __getitem__(self, Py_ssize_t index):
+        if index < 0:
+            index += self.data.size()
+        if not 0 <= index < <Py_ssize_t>self.data.size():
+            raise IndexError("index out of range")
+        return new_vector3_from(self.data[index])
+
+    def __setitem__(self, Py_ssize_t index, value):
+        if index < 0:
+            index += self.data.size()
+        if not 0 <= index < <Py_ssize_t>self.data.size():
+            raise IndexError("index out of range")
+        if isinstance(value, Vector3):
+            self.data[index] = (<Vector3>value).c_vec[0]
+        else:
+            x, y, z = value
+            self.data[index].set(x, y, z)
+
+    def __repr__(self):
+        return f"Vector3Array({len(self)})"
+
+    def __getbuffer__(self, Py_buffer *buffer, int flags):
+        self.shape[0] = self.data.size()
+        self.shape[1] = 3
+        self.strides[0] = sizeof(math3d_c.Vector3[double])
+        self.strides[1] = sizeof(double)
+        buffer.buf = <char *>self.data.data()
+        buffer.format = "d"
+        buffer.internal = NULL
+        buffer.itemsize = sizeof(double)
+        buffer.len = self.data.size() * sizeof(math3d_c.Vector3[double])
+        buffer.ndim = 2
+        buffer.obj = self
+        buffer.readonly = 0
+        buffer.shape = self.shape
+        buffer.strides = self.strides
+        buffer.suboffsets = NULL
+        self.exports += 1
+
+    def __releasebuffer__(self, Py_buffer *buffer):
+        self.exports -= 1
+
+    cdef int check_resize(self) except -1:
+        if self.exports:
+            raise BufferError("can't resize a Vector3Array while its buffer is in use")
+        return 0
+
+    def resize(self, size_t size):
+        self.check_resize()
+        self.data.resize(size)
+
+    def clear(self):
+        self.check_resize()
+        self.data.clear()
+
+    def append(self, double x, double y, double z):
+        self.check_resize()
+        self.data.push_back(math3d_c.Vector3[double](x, y, z))
+
+    def extend(self, vectors):
+        self.check_resize()
+        for vec in vectors:
+            if isinstance(vec, Vector3):
+                self.data.push_back((<Vector3>vec).c_vec[0])
+            else:
+                x, y, z = vec
+                self.data.push_back(math3d_c.Vector3[double](x, y, z))
+
+    def set(self, size_t index, double x, double y, double z):
+        if index >= self.data.size():
+            raise IndexError("index out of range")
+        self.data[index].set(x, y, z)
+
+    cdef double[:] output(self, out):
+        if out is None:
+            out = array("d", bytes(self.data.size() * sizeof(double)))
+        cdef double[:] view = out
+        if view.shape[0] < <Py_ssize_t>self.data.size():
+            raise ValueError("output is shorter than the array")
+        return view
+
+    def sq_distances(self, Vector3 point, out=None):
+        """
+        Args:
+            point (Vector3)
+            out: A writable buffer of at least len(self) doubles to fill, a new array('d') if None
+
+        Returns:
+            The squared distance of every row to `point`, in `out`.
+        """
+        cdef double[:] view = self.output(out)
+        cdef size_t i
+        for i in range(self.data.size()):
+            view[i] = self.data[i].sq_distance(point.c_vec[0])
+        return view.base if out is None else out
+
+    def distances(self, Vector3 point, out=None):
+        """
+        Same as sq_distances, not squared.
+        """
+        cdef double[:] view = self.output(out)
+        cdef size_t i
+        for i in range(self.data.size()):
+            view[i] = self.data[i].distance(point.c_vec[0])
+        return view.base if out is None else out
+
+    def dots(self, Vector3 other, out=None):
+        """
+        Same as sq_distances, for the dot product of every row with `other`.
+        """
+        cdef double[:] view = self.output(out)
+        cdef size_t i
+        for i in range(self.data.size()):
+            view[i] = self.data[i].dot(other.c_vec[0])
+        return view.base if out is None else out
+
+    def normalize(self):
+        """
+        Normalizes every row in place.
+        """
+        cdef size_t i
+        for i in range(self.data.size()):
+            self.data[i].normalize()
+
+    def within(self, Vector3 point, double radius):
+        """
+        Returns:
+            list: The indices of the rows within `radius` of `point`.
+        """
+        cdef double sq_radius = radius * radius
+        cdef size_t i
+        return [i for i in range(self.data.size()) if self.data[i].sq_distance(point.c_vec[0]) <= sq_radius]
+
+
 # i wrote this a while back, its probably not very clean or good
 cdef class Matrix4x4:
     def __cinit__(self):
@@ -9,7 +9,7 @@
 namespace detail {
     template<typename T>
     T magnitude3(T x, T y, T z) {
-        return std::pow(x, 2) + std::pow(y, 2) + std::pow(z, 2);
+        return x * x + y * y + z * z;
     }
 
     template<typename T>
@@ -65,6 +65,9 @@ struct Vector3 {
     bool operator!=(const Vector3<T> &b) const;
 };
 
+// Vector3Array hands out arrays of these as plain rows of 3 doubles
+static_assert(sizeof(Vector3<double>) == 3 * sizeof(double), "Vector3<double> must be 3 packed doubles");
+
 template<typename T>
 void Vector3<T>::set(T x, T y, T z) {
     this->x = x; this->y = y; this->z = z;
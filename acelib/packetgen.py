@@ -0,0 +1,683 @@
+"""
+Generates the packet encoders and decoders in acelib/packets_codec.pxi, and the structs they use in
+acelib/packets_codec.pxd, from the layouts in acelib/packets_schema.py, and checks them against the compiled
+acelib.packets.
+
+    python -m acelib.packetgen generate     rewrites packets_codec.pxi/.pxd
+    python -m acelib.packetgen verify       checks they're up to date and round trips every packet
+
+Every run of fixed-size fields is packed into one struct and read or written with a single copy. Strings, trailing
+data, lists and fields that are only sometimes there are handled one at a time between those runs. Reads go into the
+instance they're called on and reuse its Pos3f/Color/nested objects, so decoding into a kept loader allocates nothing
+but strings and lists.
+"""
+import argparse
+import math
+import os
+import random
+import re
+import struct
+import sys
+from typing import *
+
+from acelib import constants
+
+CODEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "packets_codec.pxi")
+# the structs are declared apart so other modules can cimport them to read a packet's fixed part themselves
+STRUCTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "packets_codec.pxd")
+HEADER = "# Generated by acelib/packetgen.py from acelib/packets_schema.py, don't edit it by hand."
+
+# struct formats of the C types fields can have, the wire is little endian like the rest of acelib
+CTYPES = {"uint8_t": "B", "int8_t": "b", "uint16_t": "H", "int16_t": "h", "uint32_t": "I", "int32_t": "i",
+          "float": "f"}
+
+# every Record/Packet/Custom by name, so fields can refer to records declared after them
+RECORDS: Dict[str, 'Record'] = {}
+
+
+def snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", "_", name).lower()
+
+
+class Context:
+    # what the reference side needs to build and compare instances
+    def __init__(self, packets, rng: random.Random):
+        self.packets = packets
+        self.rng = rng
+
+
+class Field:
+    # Fixed fields are the same size in every packet and are packed into the struct of the run they're in, the
+    # others are read and written by themselves.
+    fixed = True
+
+    def leaves(self, target: str, prefix: str) -> List[Tuple['Field', str, str]]:
+        return [(self, target, prefix)]
+
+    # fixed fields: struct members, and copying them out of/into the struct `var`
+    def members(self, prefix: str) -> List[Tuple[str, str]]:
+        return []
+
+    def unpack(self, var: str, target: str, prefix: str) -> List[str]:
+        return []
+
+    def pack(self, var: str, target: str, prefix: str) -> List[str]:
+        return []
+
+    def before_read(self, target: str) -> List[str]:
+        return []
+
+    def before_write(self, target: str) -> List[str]:
+        return []
+
+    # variable fields
+    def declare(self, target: str) -> List[str]:
+        return []
+
+    def read(self, target: str) -> List[str]:
+        raise NotImplementedError
+
+    def write(self, target: str) -> List[str]:
+        raise NotImplementedError
+
+    # the reference encoding verify checks the generated code against
+    def encode(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def randomize(self, obj, ctx: Context):
+        pass
+
+    def compare(self, a, b, path: str) -> Iterator[str]:
+        return iter(())
+
+    # objects a read has to reuse rather than replace
+    def kept(self, obj) -> list:
+        return []
+
+
+class Int(Field):
+    def __init__(self, name: str, ctype: str="uint8_t"):
+        if ctype not in CTYPES or ctype == "float":
+            raise ValueError(f"{name}: {ctype} isn't an integer type")
+        self.name = name
+        self.ctype = ctype
+
+    def members(self, prefix):
+        return [(self.ctype, prefix + self.name)]
+
+    def unpack(self, var, target, prefix):
+        return [f"{target}.{self.name} = {var}.{prefix}{self.name}"]
+
+    def pack(self, var, target, prefix):
+        return [f"{var}.{prefix}{self.name} = {target}.{self.name}"]
+
+    def encode(self, obj):
+        return struct.pack("<" + CTYPES[self.ctype], getattr(obj, self.name))
+
+    def randomize(self, obj, ctx):
+        bits = struct.calcsize(CTYPES[self.ctype]) * 8
+        low, high = (-(1 << bits - 1), (1 << bits - 1) - 1) if self.ctype.startswith("int") else (0, (1 << bits) - 1)
+        # small values half the time, so fields compared against enums take every branch
+        value = ctx.rng.randint(max(low, 0), min(high, 3)) if ctx.rng.random() < 0.5 else ctx.rng.randint(low, high)
+        setattr(obj, self.name, value)
+
+    def compare(self, a, b, path):
+        if getattr(a, self.name) != getattr(b, self.name):
+            yield f"{path}.{self.name}: {getattr(a, self.name)!r} != {getattr(b, self.name)!r}"
+
+
+class Bool(Int):
+    def __init__(self, name: str):
+        super().__init__(name, "uint8_t")
+
+    def randomize(self, obj, ctx):
+        setattr(obj, self.name, ctx.rng.random() < 0.5)
+
+    def compare(self, a, b, path):
+        if bool(getattr(a, self.name)) != bool(getattr(b, self.name)):
+            yield f"{path}.{self.name}: {getattr(a, self.name)!r} != {getattr(b, self.name)!r}"
+
+
+class Float(Field):
+    def __init__(self, name: str):
+        self.name = name
+
+    def members(self, prefix):
+        return [("float", prefix + self.name)]
+
+    def unpack(self, var, target, prefix):
+        return [f"{target}.{self.name} = {var}.{prefix}{self.name}"]
+
+    def pack(self, var, target, prefix):
+        return [f"{var}.{prefix}{self.name} = {target}.{self.name}"]
+
+    def encode(self, obj):
+        return struct.pack("<f", getattr(obj, self.name))
+
+    def randomize(self, obj, ctx):
+        setattr(obj, self.name, random_float(ctx))
+
+    def compare(self, a, b, path):
+        if not same_float(getattr(a, self.name), getattr(b, self.name)):
+            yield f"{path}.{self.name}: {getattr(a, self.name)!r} != {getattr(b, self.name)!r}"
+
+
+class Pos(Field):
+    # a Pos3f, 3 floats
+    def __init__(self, name: str):
+        self.name = name
+
+    def members(self, prefix):
+        return [("float", f"{prefix}{self.name}_{axis}") for axis in "xyz"]
+
+    def unpack(self, var, target, prefix):
+        return [f"{target}.{self.name}.{axis} = {var}.{prefix}{self.name}_{axis}" for axis in "xyz"]
+
+    def pack(self, var, target, prefix):
+        return [f"{var}.{prefix}{self.name}_{axis} = {target}.{self.name}.{axis}" for axis in "xyz"]
+
+    def encode(self, obj):
+        return struct.pack("<3f", *getattr(obj, self.name).xyz)
+
+    def randomize(self, obj, ctx):
+        getattr(obj, self.name).xyz = random_float(ctx), random_float(ctx), random_float(ctx)
+
+    def compare(self, a, b, path):
+        xyz_a, xyz_b = getattr(a, self.name).xyz, getattr(b, self.name).xyz
+        if not all(same_float(x, y) for x, y in zip(xyz_a, xyz_b)):
+            yield f"{path}.{self.name}: {xyz_a!r} != {xyz_b!r}"
+
+    def kept(self, obj):
+        return [getattr(obj, self.name)]
+
+
+class Rgb(Field):
+    # a Color, blue first on the wire
+    def __init__(self, name: str):
+        self.name = name
+
+    def members(self, prefix):
+        return [("uint8_t", f"{prefix}{self.name}_{channel}") for channel in "bgr"]
+
+    def unpack(self, var, target, prefix):
+        return [f"{target}.{self.name}.{channel} = {var}.{prefix}{self.name}_{channel}" for channel in "bgr"]
+
+    def pack(self, var, target, prefix):
+        return [f"{var}.{prefix}{self.name}_{channel} = {target}.{self.name}.{channel}" for channel in "bgr"]
+
+    def encode(self, obj):
+        r, g, b = getattr(obj, self.name).rgb
+        return struct.pack("<3B", b, g, r)
+
+    def randomize(self, obj, ctx):
+        getattr(obj, self.name).rgb = ctx.rng.randrange(256), ctx.rng.randrange(256), ctx.rng.randrange(256)
+
+    def compare(self, a, b, path):
+        if getattr(a, self.name).rgb != getattr(b, self.name).rgb:
+            yield f"{path}.{self.name}: {getattr(a, self.name).rgb!r} != {getattr(b, self.name).rgb!r}"
+
+    def kept(self, obj):
+        return [getattr(obj, self.name)]
+
+
+class Flags(Field):
+    # bools packed into a byte, the first name is bit 0
+    def __init__(self, *names: str):
+        if not 0 < len(names) <= 8:
+            raise ValueError("a flags byte holds 1 to 8 flags")
+        self.names = names
+
+    def member(self, prefix):
+        return f"{prefix}{self.names[0]}_flags"
+
+    def members(self, prefix):
+        return [("uint8_t", self.member(prefix))]
+
+    def unpack(self, var, target, prefix):
+        return [f"{target}.{name} = {var}.{self.member(prefix)} & (1 << {bit})" for bit, name in enumerate(self.names)]
+
+    def pack(self, var, target, prefix):
+        bits = " | ".join(f"<bool>{target}.{name} << {bit}" for bit, name in enumerate(self.names))
+        return [f"{var}.{self.member(prefix)} = {bits}"]
+
+    def encode(self, obj):
+        return bytes([sum(bool(getattr(obj, name)) << bit for bit, name in enumerate(self.names))])
+
+    def randomize(self, obj, ctx):
+        for name in self.names:
+            setattr(obj, name, ctx.rng.random() < 0.5)
+
+    def compare(self, a, b, path):
+        for name in self.names:
+            if bool(getattr(a, name)) != bool(getattr(b, name)):
+                yield f"{path}.{name}: {getattr(a, name)!r} != {getattr(b, name)!r}"
+
+
+class Const(Field):
+    # always written as `value`, skipped when read
+    def __init__(self, value: int, ctype: str="uint8_t", name: str="constant"):
+        self.value = value
+        self.ctype = ctype
+        self.name = name
+
+    def members(self, prefix):
+        return [(self.ctype, prefix + self.name)]
+
+    def pack(self, var, target, prefix):
+        return [f"{var}.{prefix}{self.name} = {self.value}"]
+
+    def encode(self, obj):
+        return struct.pack("<" + CTYPES[self.ctype], self.value)
+
+
+class Str(Field):
+    # NUL terminated utf8
+    fixed = False
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def read(self, target):
+        return [f"{target}.{self.name} = reader.read_bytes().decode(\"utf8\")"]
+
+    def write(self, target):
+        return [f"writer.write_bytes({target}.{self.name}.encode(\"utf8\"))"]
+
+    def encode(self, obj):
+        return getattr(obj, self.name).encode("utf8") + b"\x00"
+
+    def randomize(self, obj, ctx):
+        setattr(obj, self.name, "".join(ctx.rng.choice("abcXYZ 019_-é€") for _ in range(ctx.rng.randrange(12))))
+
+    def compare(self, a, b, path):
+        if getattr(a, self.name) != getattr(b, self.name):
+            yield f"{path}.{self.name}: {getattr(a, self.name)!r} != {getattr(b, self.name)!r}"
+
+
+class Rest(Str):
+    # everything left in the packet, as bytes
+    def read(self, target):
+        return [f"{target}.{self.name} = reader.get()"]
+
+    def write(self, target):
+        return [f"writer.write({target}.{self.name})"]
+
+    def encode(self, obj):
+        return getattr(obj, self.name)
+
+    def randomize(self, obj, ctx):
+        setattr(obj, self.name, bytes(ctx.rng.randrange(256) for _ in range(ctx.rng.randrange(40))))
+
+
+class Nested(Field):
+    # another record inline. If it's all fixed it's flattened into the runs around it.
+    def __init__(self, name: str, record: str):
+        self.name = name
+        self.record_name = record
+
+    @property
+    def record(self) -> 'Record':
+        return RECORDS[self.record_name]
+
+    @property
+    def fixed(self):
+        return self.record.fixed
+
+    def leaves(self, target, prefix):
+        inner = f"{target}.{self.name}"
+        return [(self, target, prefix)] + [leaf for field in self.record.fields
+                                           for leaf in field.leaves(inner, f"{prefix}{self.name}_")]
+
+    def before_read(self, target):
+        return [f"if {target}.{self.name} is None:", f"    {target}.{self.name} = {self.record_name}()"]
+
+    def before_write(self, target):
+        return [f"if {target}.{self.name} is None:", f"    raise ValueError(\"{self.name} isn't set\")"]
+
+    def read(self, target):
+        return self.before_read(target) + [f"{self.record.reader}({target}.{self.name}, reader)"]
+
+    def write(self, target):
+        return self.before_write(target) + [f"{self.record.writer}({target}.{self.name}, writer)"]
+
+    def encode(self, obj):
+        return self.record.encode(getattr(obj, self.name))
+
+    def randomize(self, obj, ctx):
+        if getattr(obj, self.name) is None:
+            setattr(obj, self.name, getattr(ctx.packets, self.record_name)())
+        self.record.randomize(getattr(obj, self.name), ctx)
+
+    def compare(self, a, b, path):
+        return self.record.compare(getattr(a, self.name), getattr(b, self.name), f"{path}.{self.name}")
+
+    def kept(self, obj):
+        sub = getattr(obj, self.name)
+        return [sub] + self.record.kept(sub)
+
+
+class Records(Field):
+    # records one after the other until the end of the packet
+    fixed = False
+
+    def __init__(self, name: str, record: str):
+        self.name = name
+        self.record_name = record
+
+    @property
+    def record(self) -> 'Record':
+        return RECORDS[self.record_name]
+
+    def declare(self, target):
+        return [f"cdef {self.record_name} {self.name}_item"]
+
+    def read(self, target):
+        item = f"{self.name}_item"
+        return [f"{target}.{self.name} = []",
+                "while reader.data_left():",
+                f"    {item} = {self.record_name}()",
+                f"    {self.record.reader}({item}, reader)",
+                f"    {target}.{self.name}.append({item})"]
+
+    def write(self, target):
+        item = f"{self.name}_item"
+        return [f"for {item} in {target}.{self.name}:",
+                f"    {self.record.writer}({item}, writer)"]
+
+    def encode(self, obj):
+        return b"".join(self.record.encode(item) for item in getattr(obj, self.name))
+
+    def randomize(self, obj, ctx):
+        items = []
+        for _ in range(ctx.rng.randrange(4)):
+            item = getattr(ctx.packets, self.record_name)()
+            self.record.randomize(item, ctx)
+            items.append(item)
+        setattr(obj, self.name, items)
+
+    def compare(self, a, b, path):
+        items_a, items_b = getattr(a, self.name), getattr(b, self.name)
+        if len(items_a) != len(items_b):
+            yield f"{path}.{self.name}: {len(items_a)} items != {len(items_b)}"
+            return
+        for i, (item_a, item_b) in enumerate(zip(items_a, items_b)):
+            yield from self.record.compare(item_a, item_b, f"{path}.{self.name}[{i}]")
+
+
+class When(Field):
+    # fields that are only there when `condition`, a Cython expression on `self`, holds. Fields before it have
+    # already been read when it's checked.
+    fixed = False
+
+    def __init__(self, condition: str, *fields: Field):
+        self.condition = condition
+        self.fields = fields
+
+    def holds(self, obj) -> bool:
+        return eval(self.condition, {"self": obj, "isnan": math.isnan, "constants": constants})
+
+    def encode(self, obj):
+        return b"".join(field.encode(obj) for field in self.fields) if self.holds(obj) else b""
+
+    def randomize(self, obj, ctx):
+        for field in self.fields:
+            field.randomize(obj, ctx)
+
+    def compare(self, a, b, path):
+        if self.holds(a):
+            for field in self.fields:
+                yield from field.compare(a, b, path)
+
+    def kept(self, obj):
+        return [sub for field in self.fields for sub in field.kept(obj)]
+
+
+class Record:
+    # A cdef class in packets.pyx laid out as `fields`, with read_<name>/write_<name> generated for it.
+    header = b""
+
+    def __init__(self, name: str, *fields: Field):
+        self.name = name
+        self.fields = fields
+        RECORDS[name] = self
+
+    @property
+    def fixed(self) -> bool:
+        return all(field.fixed for field in self.fields)
+
+    @property
+    def reader(self) -> str:
+        return f"read_{snake_case(self.name)}"
+
+    @property
+    def writer(self) -> str:
+        return f"write_{snake_case(self.name)}"
+
+    # lines of the struct declarations, and of the read/write functions
+    def generate(self) -> Tuple[List[str], List[str]]:
+        emitter = Emitter(self.name)
+        read = emitter.body(self.fields, True)
+        write_decls, write_lines = emitter.body(self.fields, False)
+        if self.header:
+            write_lines.insert(0, f"writer.write_uint8({self.header[0]})")
+        write = write_decls, write_lines
+
+        structs = []
+        for struct_name, members in emitter.structs:
+            structs.append(f"cdef packed struct {struct_name}:")
+            structs.extend(f"    {ctype} {member}" for ctype, member in members)
+            structs.extend(["", ""])
+        lines = []
+        for signature, (decls, body) in ((f"{self.reader}({self.name} self, ByteReader reader)", read),
+                                         (f"{self.writer}({self.name} self, ByteWriter writer)", write)):
+            lines.append(f"cdef int {signature} except -1:")
+            lines.extend(f"    {line}" for line in decls + body + ["return 0"])
+            lines.extend(["", ""])
+        return structs, lines
+
+    def encode(self, obj) -> bytes:
+        return self.header + b"".join(field.encode(obj) for field in self.fields)
+
+    def randomize(self, obj, ctx: Context):
+        for field in self.fields:
+            field.randomize(obj, ctx)
+
+    def compare(self, a, b, path: str) -> Iterator[str]:
+        for field in self.fields:
+            yield from field.compare(a, b, path)
+
+    def kept(self, obj) -> list:
+        return [sub for field in self.fields for sub in field.kept(obj)]
+
+
+class Packet(Record):
+    # a Loader, written with its id in front
+    def __init__(self, name: str, id: int, *fields: Field):
+        super().__init__(name, *fields)
+        self.id = id
+        self.header = bytes([id])
+
+
+class Custom:
+    # a Loader whose read/write are written by hand in packets.pyx, listed so verify knows it's not missing
+    def __init__(self, name: str):
+        self.name = name
+
+
+class Emitter:
+    # Turns fields into the lines of a read or write function, collecting the structs for fixed runs. Reading and
+    # writing walk the same fields in the same order, so they share the structs.
+    def __init__(self, name: str):
+        self.name = name
+        self.structs: List[Tuple[str, List[Tuple[str, str]]]] = []
+        self.count = 0
+
+    def body(self, fields: Sequence[Field], reading: bool) -> Tuple[List[str], List[str]]:
+        self.count = 0
+        decls: List[str] = []
+        lines = self.emit(fields, reading, decls)
+        return list(dict.fromkeys(decls)), lines
+
+    def emit(self, fields: Sequence[Field], reading: bool, decls: List[str]) -> List[str]:
+        lines: List[str] = []
+        run: List[Tuple[Field, str, str]] = []
+
+        def flush():
+            for leaf, target, prefix in run:
+                lines.extend(leaf.before_read(target) if reading else leaf.before_write(target))
+            members = [member for leaf, target, prefix in run for member in leaf.members(prefix)]
+            if members:
+                struct_name, var = f"{self.name}Fields{self.count}", f"fields{self.count}"
+                if self.count == len(self.structs):
+                    self.structs.append((struct_name, members))
+                self.count += 1
+                decls.append(f"cdef {struct_name} {var}")
+                if reading:
+                    lines.append(f"reader.read_into(&{var}, sizeof({var}))")
+                for leaf, target, prefix in run:
+                    lines.extend(leaf.unpack(var, target, prefix) if reading else leaf.pack(var, target, prefix))
+                if not reading:
+                    lines.append(f"writer.write_buf(<const char *>&{var}, sizeof({var}))")
+            run.clear()
+
+        for field in fields:
+            if field.fixed:
+                run.extend(field.leaves("self", ""))
+                continue
+            flush()
+            if isinstance(field, When):
+                lines.append(f"if {field.condition}:")
+                lines.extend(f"    {line}" for line in self.emit(field.fields, reading, decls) or ["pass"])
+            else:
+                decls.extend(field.declare("self"))
+                lines.extend(field.read("self") if reading else field.write("self"))
+        flush()
+        return lines
+
+
+def random_float(ctx: Context) -> float:
+    if ctx.rng.random() < 0.2:
+        return math.nan
+    # something a float32 holds exactly, so it survives the trip
+    return struct.unpack("<f", struct.pack("<f", ctx.rng.uniform(-1e4, 1e4)))[0]
+
+
+def same_float(a: float, b: float) -> bool:
+    return a == b or (math.isnan(a) and math.isnan(b))
+
+
+# the contents of each generated file by path
+def generate(schema) -> Dict[str, str]:
+    structs = [HEADER, "from libc.stdint cimport *", "", ""]
+    lines = [HEADER, "# Included at the end of packets.pyx.", "from acelib.packets_codec cimport *", "", ""]
+    for record in schema:
+        if isinstance(record, Record):
+            record_structs, record_lines = record.generate()
+            structs.extend(record_structs)
+            lines.extend(record_lines)
+    return {STRUCTS_PATH: join_lines(structs), CODEC_PATH: join_lines(lines)}
+
+
+def join_lines(lines: List[str]) -> str:
+    while lines[-1] == "":
+        lines.pop()
+    return "\n".join(lines) + "\n"
+
+
+def round_trip(schema, packets, rounds: int, seed: int) -> List[str]:
+    from acelib.bytes import ByteReader, ByteWriter
+
+    errors = []
+    ctx = Context(packets, random.Random(seed))
+    loaders = {cls.__name__ for cls in packets.LOADERS}
+    for record in schema:
+        if not hasattr(packets, record.name):
+            errors.append(f"{record.name}: not in acelib.packets")
+            continue
+        loaders.discard(record.name)
+        if isinstance(record, Custom):
+            continue
+        cls = getattr(packets, record.name)
+        if isinstance(record, Packet) and cls.id != record.id:
+            errors.append(f"{record.name}: id is {cls.id}, the schema says {record.id}")
+
+        # one instance is decoded into over and over, it has to keep its sub-objects
+        reused, kept = cls(), None
+        for _ in range(rounds):
+            original = cls()
+            record.randomize(original, ctx)
+            expected = record.encode(original)
+            if isinstance(record, Packet):
+                data = bytes(original.generate())
+            else:
+                writer = ByteWriter()
+                original.write(writer)
+                data = writer.get()
+            if data != expected:
+                errors.append(f"{record.name}: wrote {data!r}, expected {expected!r}")
+                break
+            if not data:
+                continue
+
+            reader = ByteReader(data)
+            if record.header:
+                reader.read_uint8()
+            reused.read(reader)
+            problems = list(record.compare(original, reused, record.name))
+            if reader.data_left() and not any(isinstance(field, Rest) for field in record.fields):
+                problems.append(f"{record.name}: {len(reader.get())} bytes left over")
+            if kept is not None and any(a is not b for a, b in zip(kept, record.kept(reused))):
+                problems.append(f"{record.name}: reading replaced objects it should have reused")
+            kept = record.kept(reused)
+            if problems:
+                errors.extend(problems)
+                break
+    for name in sorted(loaders):
+        errors.append(f"{name}: loader missing from the schema")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m acelib.packetgen", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("command", choices=("generate", "verify"))
+    parser.add_argument("--rounds", type=int, default=200, help="random packets per layout when verifying")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from acelib.packets_schema import SCHEMA
+    files = generate(SCHEMA)
+
+    if args.command == "generate":
+        for path, code in files.items():
+            with open(path, "w", encoding="utf8", newline="\n") as f:
+                f.write(code)
+            print(f"wrote {path}")
+        return 0
+
+    errors = []
+    for path, code in files.items():
+        try:
+            with open(path, encoding="utf8") as f:
+                if f.read() != code:
+                    errors.append(f"{path} is out of date, run `python -m acelib.packetgen generate` and rebuild")
+        except FileNotFoundError:
+            errors.append(f"{path} is missing, run `python -m acelib.packetgen generate`")
+
+    try:
+        from acelib import packets
+    except ImportError as e:
+        print(f"acelib.packets isn't built ({e}), only checked that the codec is up to date")
+    else:
+        errors.extend(round_trip(SCHEMA, packets, args.rounds, args.seed))
+
+    for error in errors:
+        print(error, file=sys.stderr)
+    if not errors:
+        print(f"{len(SCHEMA)} layouts ok")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    # the schema imports its field types from acelib.packetgen, run that rather than this copy of the module
+    from acelib.packetgen import main
+    sys.exit(main())
@@ -74,8 +74,9 @@ cdef class Loader:
     cpdef write(self, ByteWriter reader):
         raise NotImplementedError
 
+    # The writer comes from the pool, whoever sends it can release() it once the packet is made.
     cpdef ByteWriter generate(self):
-        cdef ByteWriter writer = ByteWriter()
+        cdef ByteWriter writer = ByteWriter.acquire()
         self.write(writer)
         return writer
 
@@ -87,14 +88,10 @@ cdef class InitialInfo(Loader):
         str mode_name, mode_description
 
     cpdef read(self, ByteReader reader):
-        # apparently these are unicode, which means everything else probably is too.
-        self.mode_name = reader.read_bytes().decode("utf8")
-        self.mode_description = reader.read_bytes().decode("utf8")
+        read_initial_info(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_bytes(self.mode_name.encode("utf8"))
-        writer.write_bytes(self.mode_description.encode("utf8"))
+        write_initial_info(self, writer)
 
 cdef class PositionData(Loader):
     id: int = 1
@@ -106,11 +103,10 @@ cdef class PositionData(Loader):
         self.data = Pos3f()
 
     cpdef read(self, ByteReader reader):
-        self.data.read(reader)
+        read_position_data(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        self.data.write(writer)
+        write_position_data(self, writer)
 
 
 cdef class ClientUpdateData:
@@ -122,12 +118,10 @@ cdef class ClientUpdateData:
         self.o = Pos3f(ox, oy, oz)
 
     cpdef read(self, ByteReader reader):
-        self.p.read(reader)
-        self.o.read(reader)
+        read_client_update_data(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        self.p.write(writer)
-        self.o.write(writer)
+        write_client_update_data(self, writer)
 
 
 cdef class PositionOrientationData(Loader):
@@ -140,11 +134,10 @@ cdef class PositionOrientationData(Loader):
         self.data = ClientUpdateData()
 
     cpdef read(self, ByteReader reader):
-        self.data.read(reader)
+        read_position_orientation_data(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        self.data.write(writer)
+        write_position_orientation_data(self, writer)
 
 
 cdef class WorldUpdate(Loader):
@@ -188,33 +181,10 @@ cdef class InputData(Loader):
         bint up, down, left, right, jump, crouch, sneak, sprint
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-
-        cdef uint8_t flags = reader.read_uint8()
-        self.up     = flags & (1 << 0)
-        self.down   = flags & (1 << 1)
-        self.left   = flags & (1 << 2)
-        self.right  = flags & (1 << 3)
-        self.jump   = flags & (1 << 4)
-        self.crouch = flags & (1 << 5)
-        self.sneak  = flags & (1 << 6)
-        self.sprint = flags & (1 << 7)
+        read_input_data(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-
-        cdef uint8_t flags = (
-            <bool>self.up     << 0 |
-            <bool>self.down   << 1 |
-            <bool>self.left   << 2 |
-            <bool>self.right  << 3 |
-            <bool>self.jump   << 4 |
-            <bool>self.crouch << 5 |
-            <bool>self.sneak  << 6 |
-            <bool>self.sprint << 7
-        )
-        writer.write_uint8(flags)
+        write_input_data(self, writer)
 
 
 cdef class WeaponInput(Loader):
@@ -225,18 +195,10 @@ cdef class WeaponInput(Loader):
         bint primary, secondary
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-
-        cdef uint8_t flags = reader.read_uint8()
-        self.primary   = flags & (1 << 0)
-        self.secondary = flags & (1 << 1)
-
-    cpdef write(self, ByteWriter reader):
-        reader.write_uint8(self.id)
-        reader.write_uint8(self.player_id)
+        read_weapon_input(self, reader)
 
-        cdef uint8_t flags = <bool>self.primary << 0 | <bool>self.secondary << 1
-        reader.write_uint8(flags)
+    cpdef write(self, ByteWriter writer):
+        write_weapon_input(self, writer)
 
 
 cdef class HitPacket(Loader):
@@ -246,13 +208,10 @@ cdef class HitPacket(Loader):
         uint8_t player_id, value
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.value = reader.read_uint8()
+        read_hit_packet(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.value)
+        write_hit_packet(self, writer)
 
 
 cdef class SetHP(Loader):
@@ -266,15 +225,10 @@ cdef class SetHP(Loader):
         self.source = Pos3f()
 
     cpdef read(self, ByteReader reader):
-        self.hp = reader.read_uint8()
-        self.type = reader.read_uint8()
-        self.source.read(reader)
+        read_set_hp(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.hp)
-        writer.write_uint8(self.type)
-        self.source.write(writer)
+        write_set_hp(self, writer)
 
 
 cdef class UseOrientedItem(Loader):
@@ -290,19 +244,10 @@ cdef class UseOrientedItem(Loader):
         self.velocity = Pos3f()
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.tool = reader.read_uint8()
-        self.value = reader.read_float()
-        self.position.read(reader)
-        self.velocity.read(reader)
+        read_use_oriented_item(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.tool)
-        writer.write_float(self.value)
-        self.position.write(writer)
-        self.velocity.write(writer)
+        write_use_oriented_item(self, writer)
 
 
 cdef class SetTool(Loader):
@@ -312,13 +257,10 @@ cdef class SetTool(Loader):
         uint8_t player_id, value
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.value = reader.read_uint8()
+        read_set_tool(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.value)
+        write_set_tool(self, writer)
 
 
 cdef class SetColor(Loader):
@@ -332,13 +274,10 @@ cdef class SetColor(Loader):
         self.color = Color()
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.color.read(reader)
+        read_set_color(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        self.color.write(writer)
+        write_set_color(self, writer)
 
 
 cdef class ExistingPlayer(Loader):
@@ -355,23 +294,10 @@ cdef class ExistingPlayer(Loader):
         self.color = Color()
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.team = reader.read_int8()
-        self.weapon = reader.read_uint8()
-        self.tool = reader.read_uint8()
-        self.kills = reader.read_uint32()
-        self.color.read(reader)
-        self.name = reader.read_bytes().decode("utf8")
+        read_existing_player(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_int8(self.team)
-        writer.write_uint8(self.weapon)
-        writer.write_uint8(self.tool)
-        writer.write_uint32(self.kills)
-        self.color.write(writer)
-        writer.write_bytes(self.name.encode("utf8"))
+        write_existing_player(self, writer)
 
 
 cdef class ShortPlayerData(Loader):
@@ -382,15 +308,10 @@ cdef class ShortPlayerData(Loader):
         int8_t team
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.team = reader.read_int8()
-        self.weapon = reader.read_uint8()
+        read_short_player_data(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_int8(self.team)
-        writer.write_uint8(self.weapon)
+        write_short_player_data(self, writer)
 
 
 cdef class Entity(Loader):
@@ -404,20 +325,10 @@ cdef class Entity(Loader):
         self.position = Pos3f()
 
     cpdef read(self, ByteReader reader):
-        self.id = reader.read_uint8()
-        self.type = reader.read_uint8()
-        self.state = reader.read_uint8()
-        self.carrier = reader.read_int8()
-        self.position.read(reader)
-        self.yaw = reader.read_float()
+        read_entity(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.type)
-        writer.write_uint8(self.state)
-        writer.write_int8(self.carrier)
-        self.position.write(writer)
-        writer.write_float(self.yaw)
+        write_entity(self, writer)
 
 
 cdef class ChangeEntity(Loader):
@@ -435,25 +346,10 @@ cdef class ChangeEntity(Loader):
         self.position = Pos3f()
 
     cpdef read(self, ByteReader reader):
-        self.entity_id = reader.read_uint8()
-        self.type = reader.read_uint8()
-        if self.type == constants.SET.POSITION.value:
-            self.position.read(reader)
-        elif self.type == constants.SET.CARRIER.value:
-            self.carrier = reader.read_int8()
-        elif self.type == constants.SET.STATE.value:
-            self.state = reader.read_uint8()
+        read_change_entity(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.entity_id)
-        writer.write_uint8(self.type)
-        if self.type == constants.SET.POSITION.value:
-            self.position.write(writer)
-        elif self.type == constants.SET.CARRIER.value:
-            writer.write_int8(self.carrier)
-        elif self.type == constants.SET.STATE.value:
-            writer.write_uint8(self.state)
+        write_change_entity(self, writer)
 
 
 cdef class DestroyEntity(Loader):
@@ -463,11 +359,10 @@ cdef class DestroyEntity(Loader):
         uint8_t entity_id
 
     cpdef read(self, ByteReader reader):
-        self.entity_id = reader.read_uint8()
+        read_destroy_entity(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.entity_id)
+        write_destroy_entity(self, writer)
 
     def set_entity(self, entity):
         self.entity_id = entity.id
@@ -480,12 +375,10 @@ cdef class CreateEntity(Loader):
         Entity entity
 
     cpdef read(self, ByteReader reader):
-        self.entity = Entity()
-        self.entity.read(reader)
+        read_create_entity(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        self.entity.write(writer)
+        write_create_entity(self, writer)
 
     def set_entity(self, entity):
         self.entity = entity
@@ -508,28 +401,10 @@ cdef class PlaySound(Loader):
         self.position = Pos3f()
 
     cpdef read(self, ByteReader reader):
-        self.name = reader.read_bytes().decode("utf8")
-
-        cdef uint8_t flags = reader.read_uint8()
-        self.looping    = flags & (1 << 0)
-        self.positioned = flags & (1 << 1)
-
-        if self.looping:
-            self.loop_id = reader.read_uint8()
-        if self.positioned:
-            self.position.read(reader)
+        read_play_sound(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_bytes(self.name.encode("utf8"))
-
-        cdef int sound_flags = <bool>self.looping << 0 | <bool>self.positioned << 1
-        writer.write_uint8(sound_flags)
-
-        if self.looping:
-            writer.write_uint8(self.loop_id)
-        if self.positioned:
-            self.position.write(writer)
+        write_play_sound(self, writer)
 
 
 cdef class StopSound(Loader):
@@ -539,11 +414,10 @@ cdef class StopSound(Loader):
         uint8_t loop_id
 
     cpdef read(self, ByteReader reader):
-        self.loop_id = reader.read_uint8()
+        read_stop_sound(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.loop_id)
+        write_stop_sound(self, writer)
 
 
 cdef class CreatePlayer(Loader):
@@ -559,19 +433,10 @@ cdef class CreatePlayer(Loader):
         self.position = Pos3f()
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.weapon = reader.read_uint8()
-        self.team = reader.read_int8()
-        self.position.read(reader)
-        self.name = reader.read_bytes().decode("utf8")
+        read_create_player(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.weapon)
-        writer.write_int8(self.team)
-        self.position.write(writer)
-        writer.write_bytes(self.name.encode("utf8"))
+        write_create_player(self, writer)
 
 
 cdef class BlockAction(Loader):
@@ -582,19 +447,10 @@ cdef class BlockAction(Loader):
         int32_t x, y, z
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.value = reader.read_uint8()
-        self.x = reader.read_int32()
-        self.y = reader.read_int32()
-        self.z = reader.read_int32()
+        read_block_action(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.value)
-        writer.write_int32(self.x)
-        writer.write_int32(self.y)
-        writer.write_int32(self.z)
+        write_block_action(self, writer)
 
     @property
     def xyz(self):
@@ -683,23 +539,10 @@ cdef class BlockLine(Loader):
         int32_t x1, y1, z1, x2, y2, z2
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.x1 = reader.read_int32()
-        self.y1 = reader.read_int32()
-        self.z1 = reader.read_int32()
-        self.x2 = reader.read_int32()
-        self.y2 = reader.read_int32()
-        self.z2 = reader.read_int32()
+        read_block_line(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_int32(self.x1)
-        writer.write_int32(self.y1)
-        writer.write_int32(self.z1)
-        writer.write_int32(self.x2)
-        writer.write_int32(self.y2)
-        writer.write_int32(self.z2)
+        write_block_line(self, writer)
 
     @property
     def xyz1(self):
@@ -735,33 +578,10 @@ cdef class StateData(Loader):
         self.entities = []
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.fog_color.read(reader)
-        self.team1_color.read(reader)
-        self.team2_color.read(reader)
-        self.team1_score = reader.read_uint8()
-        self.team2_score = reader.read_uint8()
-        self.score_limit = reader.read_uint8()
-        self.team1_name = reader.read_bytes().decode("utf8")
-        self.team2_name = reader.read_bytes().decode("utf8")
-        self.mode_name = reader.read_bytes().decode("utf8")
-        while reader.data_left():
-            self.entities.append(Entity(reader))
+        read_state_data(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        self.fog_color.write(writer)
-        self.team1_color.write(writer)
-        self.team2_color.write(writer)
-        writer.write_uint8(self.team1_score)
-        writer.write_uint8(self.team2_score)
-        writer.write_uint8(self.score_limit)
-        writer.write_bytes(self.team1_name.encode("utf8"))
-        writer.write_bytes(self.team2_name.encode("utf8"))
-        writer.write_bytes(self.mode_name.encode("utf8"))
-        for ent in self.entities:
-            ent.write(writer)
+        write_state_data(self, writer)
 
     def set_entities(self, entities):
         for ent in entities:
@@ -777,17 +597,10 @@ cdef class KillAction(Loader):
         uint8_t player_id, killer_id, kill_type, respawn_time
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.killer_id = reader.read_uint8()
-        self.kill_type = reader.read_uint8()
-        self.respawn_time = reader.read_uint8()
+        read_kill_action(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.killer_id)
-        writer.write_uint8(self.kill_type)
-        writer.write_uint8(self.respawn_time)
+        write_kill_action(self, writer)
 
 
 cdef class ChatMessage(Loader):
@@ -798,15 +611,10 @@ cdef class ChatMessage(Loader):
         str value
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.chat_type = reader.read_uint8()
-        self.value = reader.read_bytes().decode("utf8")
+        read_chat_message(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.chat_type)
-        writer.write_bytes(self.value.encode("utf8"))
+        write_chat_message(self, writer)
 
 
 cdef class MapStart(Loader):
@@ -816,11 +624,10 @@ cdef class MapStart(Loader):
         uint32_t size
 
     cpdef read(self, ByteReader reader):
-        self.size = reader.read_uint32()
+        read_map_start(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint32(self.size)
+        write_map_start(self, writer)
 
 
 cdef class MapChunk(Loader):
@@ -830,11 +637,10 @@ cdef class MapChunk(Loader):
         bytes data
 
     cpdef read(self, ByteReader reader):
-        self.data = reader.get()
+        read_map_chunk(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write(self.data)
+        write_map_chunk(self, writer)
 
 
 cdef class PackStart(Loader):
@@ -844,13 +650,10 @@ cdef class PackStart(Loader):
         uint32_t size, checksum
 
     cpdef read(self, ByteReader reader):
-        self.size = reader.read_uint32()
-        self.checksum = reader.read_uint32()
+        read_pack_start(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint32(self.size)
-        writer.write_uint32(self.checksum)
+        write_pack_start(self, writer)
 
 
 cdef class PackResponse(Loader):
@@ -860,11 +663,10 @@ cdef class PackResponse(Loader):
         bint value
 
     cpdef read(self, ByteReader reader):
-        self.value = reader.read_uint8()
+        read_pack_response(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.value)
+        write_pack_response(self, writer)
 
 
 cdef class PackChunk(Loader):
@@ -874,11 +676,10 @@ cdef class PackChunk(Loader):
         bytes data
 
     cpdef read(self, ByteReader reader):
-        self.data = reader.get()
+        read_pack_chunk(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write(self.data)
+        write_pack_chunk(self, writer)
 
 
 cdef class PlayerLeft(Loader):
@@ -888,11 +689,10 @@ cdef class PlayerLeft(Loader):
         uint8_t player_id
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
+        read_player_left(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
+        write_player_left(self, writer)
 
 
 cdef class ProgressBar(Loader):
@@ -907,21 +707,10 @@ cdef class ProgressBar(Loader):
         self.color2 = Color()
 
     cpdef read(self, ByteReader reader):
-        self.progress = reader.read_float()
-        if isnan(self.progress):
-            return
-        self.rate = reader.read_float()
-        self.color1.read(reader)
-        self.color2.read(reader)
+        read_progress_bar(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_float(self.progress)
-        if isnan(self.progress):
-            return
-        writer.write_float(self.rate)
-        self.color1.write(writer)
-        self.color2.write(writer)
+        write_progress_bar(self, writer)
 
     def set(self, float progress, float rate):
         self.progress = progress
@@ -946,11 +735,10 @@ cdef class Restock(Loader):
         uint8_t player_id
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
+        read_restock(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
+        write_restock(self, writer)
 
 
 cdef class FogColor(Loader):
@@ -963,13 +751,10 @@ cdef class FogColor(Loader):
         self.color = Color()
 
     cpdef read(self, ByteReader reader):
-        reader.read_uint8()
-        self.color.read(reader)
+        read_fog_color(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(0xFF)
-        self.color.write(writer)
+        write_fog_color(self, writer)
 
 
 cdef class WeaponReload(Loader):
@@ -979,15 +764,10 @@ cdef class WeaponReload(Loader):
         uint8_t player_id, clip_ammo, reserve_ammo
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.clip_ammo = reader.read_uint8()
-        self.reserve_ammo = reader.read_uint8()
+        read_weapon_reload(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_uint8(self.clip_ammo)
-        writer.write_uint8(self.reserve_ammo)
+        write_weapon_reload(self, writer)
 
 
 cdef class ChangeTeam(Loader):
@@ -998,13 +778,10 @@ cdef class ChangeTeam(Loader):
         int8_t team
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.team = reader.read_int8()
+        read_change_team(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint8(self.player_id)
-        writer.write_int8(self.team)
+        write_change_team(self, writer)
 
 
 cdef class ChangeClass(Loader):
@@ -1014,13 +791,10 @@ cdef class ChangeClass(Loader):
         uint8_t player_id, class_id
 
     cpdef read(self, ByteReader reader):
-        self.player_id = reader.read_uint8()
-        self.class_id = reader.read_uint8()
+        read_change_class(self, reader)
 
-    cpdef write(self, ByteWriter reader):
-        reader.write_uint8(self.id)
-        reader.write_uint8(self.player_id)
-        reader.write_uint8(self.class_id)
+    cpdef write(self, ByteWriter writer):
+        write_change_class(self, writer)
 
 
 cdef class SetScore(Loader):
@@ -1031,25 +805,20 @@ cdef class SetScore(Loader):
         uint16_t value
 
     cpdef read(self, ByteReader reader):
-        self.type = reader.read_uint8()
-        self.specifier = reader.read_uint8()
-        self.value = reader.read_uint16()
+        read_set_score(self, reader)
 
-    cpdef write(self, ByteWriter reader):
-        reader.write_uint8(self.id)
-        reader.write_uint8(self.type)
-        reader.write_uint8(self.specifier)
-        reader.write_uint16(self.value)
+    cpdef write(self, ByteWriter writer):
+        write_set_score(self, writer)
 
 
 cdef class UseCommand(Loader):
     id: int = 37
 
     cpdef read(self, ByteReader reader):
-        pass
+        read_use_command(self, reader)
 
-    cpdef write(self, ByteWriter reader):
-        reader.write_uint8(self.id)
+    cpdef write(self, ByteWriter writer):
+        write_use_command(self, writer)
 
 
 cdef class PlaceMG(Loader):
@@ -1060,17 +829,10 @@ cdef class PlaceMG(Loader):
         float yaw
 
     cpdef read(self, ByteReader reader):
-        self.x = reader.read_uint32()
-        self.y = reader.read_uint32()
-        self.z = reader.read_uint32()
-        self.yaw = reader.read_float()
+        read_place_mg(self, reader)
 
     cpdef write(self, ByteWriter writer):
-        writer.write_uint8(self.id)
-        writer.write_uint32(self.x)
-        writer.write_uint32(self.y)
-        writer.write_uint32(self.z)
-        writer.write_float(self.yaw)
+        write_place_mg(self, writer)
 
     @property
     def xyz(self):
@@ -1081,6 +843,9 @@ cdef class PlaceMG(Loader):
         self.x, self.y, self.z = value
 
 
+include "packets_codec.pxi"
+
+
 LOADERS = Loader.__subclasses__()
 
 cdef set SERVER_ONLY_LOADERS = {SetHP}
@@ -0,0 +1,279 @@
+# Generated by acelib/packetgen.py from acelib/packets_schema.py, don't edit it by hand.
+from libc.stdint cimport *
+
+
+cdef packed struct PositionDataFields0:
+    float data_x
+    float data_y
+    float data_z
+
+
+cdef packed struct ClientUpdateDataFields0:
+    float p_x
+    float p_y
+    float p_z
+    float o_x
+    float o_y
+    float o_z
+
+
+cdef packed struct PositionOrientationDataFields0:
+    float data_p_x
+    float data_p_y
+    float data_p_z
+    float data_o_x
+    float data_o_y
+    float data_o_z
+
+
+cdef packed struct InputDataFields0:
+    uint8_t player_id
+    uint8_t up_flags
+
+
+cdef packed struct WeaponInputFields0:
+    uint8_t player_id
+    uint8_t primary_flags
+
+
+cdef packed struct HitPacketFields0:
+    uint8_t player_id
+    uint8_t value
+
+
+cdef packed struct SetHPFields0:
+    uint8_t hp
+    uint8_t type
+    float source_x
+    float source_y
+    float source_z
+
+
+cdef packed struct UseOrientedItemFields0:
+    uint8_t player_id
+    uint8_t tool
+    float value
+    float position_x
+    float position_y
+    float position_z
+    float velocity_x
+    float velocity_y
+    float velocity_z
+
+
+cdef packed struct SetToolFields0:
+    uint8_t player_id
+    uint8_t value
+
+
+cdef packed struct SetColorFields0:
+    uint8_t player_id
+    uint8_t color_b
+    uint8_t color_g
+    uint8_t color_r
+
+
+cdef packed struct ExistingPlayerFields0:
+    uint8_t player_id
+    int8_t team
+    uint8_t weapon
+    uint8_t tool
+    uint32_t kills
+    uint8_t color_b
+    uint8_t color_g
+    uint8_t color_r
+
+
+cdef packed struct ShortPlayerDataFields0:
+    uint8_t player_id
+    int8_t team
+    uint8_t weapon
+
+
+cdef packed struct EntityFields0:
+    uint8_t id
+    uint8_t type
+    uint8_t state
+    int8_t carrier
+    float position_x
+    float position_y
+    float position_z
+    float yaw
+
+
+cdef packed struct ChangeEntityFields0:
+    uint8_t entity_id
+    uint8_t type
+
+
+cdef packed struct ChangeEntityFields1:
+    float position_x
+    float position_y
+    float position_z
+
+
+cdef packed struct ChangeEntityFields2:
+    int8_t carrier
+
+
+cdef packed struct ChangeEntityFields3:
+    uint8_t state
+
+
+cdef packed struct DestroyEntityFields0:
+    uint8_t entity_id
+
+
+cdef packed struct CreateEntityFields0:
+    uint8_t entity_id
+    uint8_t entity_type
+    uint8_t entity_state
+    int8_t entity_carrier
+    float entity_position_x
+    float entity_position_y
+    float entity_position_z
+    float entity_yaw
+
+
+cdef packed struct PlaySoundFields0:
+    uint8_t looping_flags
+
+
+cdef packed struct PlaySoundFields1:
+    uint8_t loop_id
+
+
+cdef packed struct PlaySoundFields2:
+    float position_x
+    float position_y
+    float position_z
+
+
+cdef packed struct StopSoundFields0:
+    uint8_t loop_id
+
+
+cdef packed struct CreatePlayerFields0:
+    uint8_t player_id
+    uint8_t weapon
+    int8_t team
+    float position_x
+    float position_y
+    float position_z
+
+
+cdef packed struct BlockActionFields0:
+    uint8_t player_id
+    uint8_t value
+    int32_t x
+    int32_t y
+    int32_t z
+
+
+cdef packed struct BlockLineFields0:
+    uint8_t player_id
+    int32_t x1
+    int32_t y1
+    int32_t z1
+    int32_t x2
+    int32_t y2
+    int32_t z2
+
+
+cdef packed struct StateDataFields0:
+    uint8_t player_id
+    uint8_t fog_color_b
+    uint8_t fog_color_g
+    uint8_t fog_color_r
+    uint8_t team1_color_b
+    uint8_t team1_color_g
+    uint8_t team1_color_r
+    uint8_t team2_color_b
+    uint8_t team2_color_g
+    uint8_t team2_color_r
+    uint8_t team1_score
+    uint8_t team2_score
+    uint8_t score_limit
+
+
+cdef packed struct KillActionFields0:
+    uint8_t player_id
+    uint8_t killer_id
+    uint8_t kill_type
+    uint8_t respawn_time
+
+
+cdef packed struct ChatMessageFields0:
+    uint8_t player_id
+    uint8_t chat_type
+
+
+cdef packed struct MapStartFields0:
+    uint32_t size
+
+
+cdef packed struct PackStartFields0:
+    uint32_t size
+    uint32_t checksum
+
+
+cdef packed struct PackResponseFields0:
+    uint8_t value
+
+
+cdef packed struct PlayerLeftFields0:
+    uint8_t player_id
+
+
+cdef packed struct ProgressBarFields0:
+    float progress
+
+
+cdef packed struct ProgressBarFields1:
+    float rate
+    uint8_t color1_b
+    uint8_t color1_g
+    uint8_t color1_r
+    uint8_t color2_b
+    uint8_t color2_g
+    uint8_t color2_r
+
+
+cdef packed struct RestockFields0:
+    uint8_t player_id
+
+
+cdef packed struct FogColorFields0:
+    uint8_t constant
+    uint8_t color_b
+    uint8_t color_g
+    uint8_t color_r
+
+
+cdef packed struct WeaponReloadFields0:
+    uint8_t player_id
+    uint8_t clip_ammo
+    uint8_t reserve_ammo
+
+
+cdef packed struct ChangeTeamFields0:
+    uint8_t player_id
+    int8_t team
+
+
+cdef packed struct ChangeClassFields0:
+    uint8_t player_id
+    uint8_t class_id
+
+
+cdef packed struct SetScoreFields0:
+    uint8_t type
+    uint8_t specifier
+    uint16_t value
+
+
+cdef packed struct PlaceMGFields0:
+    uint32_t x
+    uint32_t y
+    uint32_t z
+    float yaw
@@ -0,0 +1,890 @@
+# Generated by acelib/packetgen.py from acelib/packets_schema.py, don't edit it by hand.
+# Included at the end of packets.pyx.
+from acelib.packets_codec cimport *
+
+
+cdef int read_initial_info(InitialInfo self, ByteReader reader) except -1:
+    self.mode_name = reader.read_bytes().decode("utf8")
+    self.mode_description = reader.read_bytes().decode("utf8")
+    return 0
+
+
+cdef int write_initial_info(InitialInfo self, ByteWriter writer) except -1:
+    writer.write_uint8(0)
+    writer.write_bytes(self.mode_name.encode("utf8"))
+    writer.write_bytes(self.mode_description.encode("utf8"))
+    return 0
+
+
+cdef int read_position_data(PositionData self, ByteReader reader) except -1:
+    cdef PositionDataFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.data.x = fields0.data_x
+    self.data.y = fields0.data_y
+    self.data.z = fields0.data_z
+    return 0
+
+
+cdef int write_position_data(PositionData self, ByteWriter writer) except -1:
+    cdef PositionDataFields0 fields0
+    writer.write_uint8(1)
+    fields0.data_x = self.data.x
+    fields0.data_y = self.data.y
+    fields0.data_z = self.data.z
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_client_update_data(ClientUpdateData self, ByteReader reader) except -1:
+    cdef ClientUpdateDataFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.p.x = fields0.p_x
+    self.p.y = fields0.p_y
+    self.p.z = fields0.p_z
+    self.o.x = fields0.o_x
+    self.o.y = fields0.o_y
+    self.o.z = fields0.o_z
+    return 0
+
+
+cdef int write_client_update_data(ClientUpdateData self, ByteWriter writer) except -1:
+    cdef ClientUpdateDataFields0 fields0
+    fields0.p_x = self.p.x
+    fields0.p_y = self.p.y
+    fields0.p_z = self.p.z
+    fields0.o_x = self.o.x
+    fields0.o_y = self.o.y
+    fields0.o_z = self.o.z
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_position_orientation_data(PositionOrientationData self, ByteReader reader) except -1:
+    cdef PositionOrientationDataFields0 fields0
+    if self.data is None:
+        self.data = ClientUpdateData()
+    reader.read_into(&fields0, sizeof(fields0))
+    self.data.p.x = fields0.data_p_x
+    self.data.p.y = fields0.data_p_y
+    self.data.p.z = fields0.data_p_z
+    self.data.o.x = fields0.data_o_x
+    self.data.o.y = fields0.data_o_y
+    self.data.o.z = fields0.data_o_z
+    return 0
+
+
+cdef int write_position_orientation_data(PositionOrientationData self, ByteWriter writer) except -1:
+    cdef PositionOrientationDataFields0 fields0
+    writer.write_uint8(2)
+    if self.data is None:
+        raise ValueError("data isn't set")
+    fields0.data_p_x = self.data.p.x
+    fields0.data_p_y = self.data.p.y
+    fields0.data_p_z = self.data.p.z
+    fields0.data_o_x = self.data.o.x
+    fields0.data_o_y = self.data.o.y
+    fields0.data_o_z = self.data.o.z
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_input_data(InputData self, ByteReader reader) except -1:
+    cdef InputDataFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.up = fields0.up_flags & (1 << 0)
+    self.down = fields0.up_flags & (1 << 1)
+    self.left = fields0.up_flags & (1 << 2)
+    self.right = fields0.up_flags & (1 << 3)
+    self.jump = fields0.up_flags & (1 << 4)
+    self.crouch = fields0.up_flags & (1 << 5)
+    self.sneak = fields0.up_flags & (1 << 6)
+    self.sprint = fields0.up_flags & (1 << 7)
+    return 0
+
+
+cdef int write_input_data(InputData self, ByteWriter writer) except -1:
+    cdef InputDataFields0 fields0
+    writer.write_uint8(4)
+    fields0.player_id = self.player_id
+    fields0.up_flags = <bool>self.up << 0 | <bool>self.down << 1 | <bool>self.left << 2 | <bool>self.right << 3 | <bool>self.jump << 4 | <bool>self.crouch << 5 | <bool>self.sneak << 6 | <bool>self.sprint << 7
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_weapon_input(WeaponInput self, ByteReader reader) except -1:
+    cdef WeaponInputFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.primary = fields0.primary_flags & (1 << 0)
+    self.secondary = fields0.primary_flags & (1 << 1)
+    return 0
+
+
+cdef int write_weapon_input(WeaponInput self, ByteWriter writer) except -1:
+    cdef WeaponInputFields0 fields0
+    writer.write_uint8(5)
+    fields0.player_id = self.player_id
+    fields0.primary_flags = <bool>self.primary << 0 | <bool>self.secondary << 1
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_hit_packet(HitPacket self, ByteReader reader) except -1:
+    cdef HitPacketFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.value = fields0.value
+    return 0
+
+
+cdef int write_hit_packet(HitPacket self, ByteWriter writer) except -1:
+    cdef HitPacketFields0 fields0
+    writer.write_uint8(6)
+    fields0.player_id = self.player_id
+    fields0.value = self.value
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_set_hp(SetHP self, ByteReader reader) except -1:
+    cdef SetHPFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.hp = fields0.hp
+    self.type = fields0.type
+    self.source.x = fields0.source_x
+    self.source.y = fields0.source_y
+    self.source.z = fields0.source_z
+    return 0
+
+
+cdef int write_set_hp(SetHP self, ByteWriter writer) except -1:
+    cdef SetHPFields0 fields0
+    writer.write_uint8(6)
+    fields0.hp = self.hp
+    fields0.type = self.type
+    fields0.source_x = self.source.x
+    fields0.source_y = self.source.y
+    fields0.source_z = self.source.z
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_use_oriented_item(UseOrientedItem self, ByteReader reader) except -1:
+    cdef UseOrientedItemFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.tool = fields0.tool
+    self.value = fields0.value
+    self.position.x = fields0.position_x
+    self.position.y = fields0.position_y
+    self.position.z = fields0.position_z
+    self.velocity.x = fields0.velocity_x
+    self.velocity.y = fields0.velocity_y
+    self.velocity.z = fields0.velocity_z
+    return 0
+
+
+cdef int write_use_oriented_item(UseOrientedItem self, ByteWriter writer) except -1:
+    cdef UseOrientedItemFields0 fields0
+    writer.write_uint8(7)
+    fields0.player_id = self.player_id
+    fields0.tool = self.tool
+    fields0.value = self.value
+    fields0.position_x = self.position.x
+    fields0.position_y = self.position.y
+    fields0.position_z = self.position.z
+    fields0.velocity_x = self.velocity.x
+    fields0.velocity_y = self.velocity.y
+    fields0.velocity_z = self.velocity.z
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_set_tool(SetTool self, ByteReader reader) except -1:
+    cdef SetToolFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.value = fields0.value
+    return 0
+
+
+cdef int write_set_tool(SetTool self, ByteWriter writer) except -1:
+    cdef SetToolFields0 fields0
+    writer.write_uint8(8)
+    fields0.player_id = self.player_id
+    fields0.value = self.value
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_set_color(SetColor self, ByteReader reader) except -1:
+    cdef SetColorFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.color.b = fields0.color_b
+    self.color.g = fields0.color_g
+    self.color.r = fields0.color_r
+    return 0
+
+
+cdef int write_set_color(SetColor self, ByteWriter writer) except -1:
+    cdef SetColorFields0 fields0
+    writer.write_uint8(9)
+    fields0.player_id = self.player_id
+    fields0.color_b = self.color.b
+    fields0.color_g = self.color.g
+    fields0.color_r = self.color.r
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_existing_player(ExistingPlayer self, ByteReader reader) except -1:
+    cdef ExistingPlayerFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.team = fields0.team
+    self.weapon = fields0.weapon
+    self.tool = fields0.tool
+    self.kills = fields0.kills
+    self.color.b = fields0.color_b
+    self.color.g = fields0.color_g
+    self.color.r = fields0.color_r
+    self.name = reader.read_bytes().decode("utf8")
+    return 0
+
+
+cdef int write_existing_player(ExistingPlayer self, ByteWriter writer) except -1:
+    cdef ExistingPlayerFields0 fields0
+    writer.write_uint8(10)
+    fields0.player_id = self.player_id
+    fields0.team = self.team
+    fields0.weapon = self.weapon
+    fields0.tool = self.tool
+    fields0.kills = self.kills
+    fields0.color_b = self.color.b
+    fields0.color_g = self.color.g
+    fields0.color_r = self.color.r
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    writer.write_bytes(self.name.encode("utf8"))
+    return 0
+
+
+cdef int read_short_player_data(ShortPlayerData self, ByteReader reader) except -1:
+    cdef ShortPlayerDataFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.team = fields0.team
+    self.weapon = fields0.weapon
+    return 0
+
+
+cdef int write_short_player_data(ShortPlayerData self, ByteWriter writer) except -1:
+    cdef ShortPlayerDataFields0 fields0
+    writer.write_uint8(11)
+    fields0.player_id = self.player_id
+    fields0.team = self.team
+    fields0.weapon = self.weapon
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_entity(Entity self, ByteReader reader) except -1:
+    cdef EntityFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.id = fields0.id
+    self.type = fields0.type
+    self.state = fields0.state
+    self.carrier = fields0.carrier
+    self.position.x = fields0.position_x
+    self.position.y = fields0.position_y
+    self.position.z = fields0.position_z
+    self.yaw = fields0.yaw
+    return 0
+
+
+cdef int write_entity(Entity self, ByteWriter writer) except -1:
+    cdef EntityFields0 fields0
+    fields0.id = self.id
+    fields0.type = self.type
+    fields0.state = self.state
+    fields0.carrier = self.carrier
+    fields0.position_x = self.position.x
+    fields0.position_y = self.position.y
+    fields0.position_z = self.position.z
+    fields0.yaw = self.yaw
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_change_entity(ChangeEntity self, ByteReader reader) except -1:
+    cdef ChangeEntityFields0 fields0
+    cdef ChangeEntityFields1 fields1
+    cdef ChangeEntityFields2 fields2
+    cdef ChangeEntityFields3 fields3
+    reader.read_into(&fields0, sizeof(fields0))
+    self.entity_id = fields0.entity_id
+    self.type = fields0.type
+    if self.type == constants.SET.POSITION.value:
+        reader.read_into(&fields1, sizeof(fields1))
+        self.position.x = fields1.position_x
+        self.position.y = fields1.position_y
+        self.position.z = fields1.position_z
+    if self.type == constants.SET.CARRIER.value:
+        reader.read_into(&fields2, sizeof(fields2))
+        self.carrier = fields2.carrier
+    if self.type == constants.SET.STATE.value:
+        reader.read_into(&fields3, sizeof(fields3))
+        self.state = fields3.state
+    return 0
+
+
+cdef int write_change_entity(ChangeEntity self, ByteWriter writer) except -1:
+    cdef ChangeEntityFields0 fields0
+    cdef ChangeEntityFields1 fields1
+    cdef ChangeEntityFields2 fields2
+    cdef ChangeEntityFields3 fields3
+    writer.write_uint8(12)
+    fields0.entity_id = self.entity_id
+    fields0.type = self.type
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    if self.type == constants.SET.POSITION.value:
+        fields1.position_x = self.position.x
+        fields1.position_y = self.position.y
+        fields1.position_z = self.position.z
+        writer.write_buf(<const char *>&fields1, sizeof(fields1))
+    if self.type == constants.SET.CARRIER.value:
+        fields2.carrier = self.carrier
+        writer.write_buf(<const char *>&fields2, sizeof(fields2))
+    if self.type == constants.SET.STATE.value:
+        fields3.state = self.state
+        writer.write_buf(<const char *>&fields3, sizeof(fields3))
+    return 0
+
+
+cdef int read_destroy_entity(DestroyEntity self, ByteReader reader) except -1:
+    cdef DestroyEntityFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.entity_id = fields0.entity_id
+    return 0
+
+
+cdef int write_destroy_entity(DestroyEntity self, ByteWriter writer) except -1:
+    cdef DestroyEntityFields0 fields0
+    writer.write_uint8(13)
+    fields0.entity_id = self.entity_id
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_create_entity(CreateEntity self, ByteReader reader) except -1:
+    cdef CreateEntityFields0 fields0
+    if self.entity is None:
+        self.entity = Entity()
+    reader.read_into(&fields0, sizeof(fields0))
+    self.entity.id = fields0.entity_id
+    self.entity.type = fields0.entity_type
+    self.entity.state = fields0.entity_state
+    self.entity.carrier = fields0.entity_carrier
+    self.entity.position.x = fields0.entity_position_x
+    self.entity.position.y = fields0.entity_position_y
+    self.entity.position.z = fields0.entity_position_z
+    self.entity.yaw = fields0.entity_yaw
+    return 0
+
+
+cdef int write_create_entity(CreateEntity self, ByteWriter writer) except -1:
+    cdef CreateEntityFields0 fields0
+    writer.write_uint8(14)
+    if self.entity is None:
+        raise ValueError("entity isn't set")
+    fields0.entity_id = self.entity.id
+    fields0.entity_type = self.entity.type
+    fields0.entity_state = self.entity.state
+    fields0.entity_carrier = self.entity.carrier
+    fields0.entity_position_x = self.entity.position.x
+    fields0.entity_position_y = self.entity.position.y
+    fields0.entity_position_z = self.entity.position.z
+    fields0.entity_yaw = self.entity.yaw
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_play_sound(PlaySound self, ByteReader reader) except -1:
+    cdef PlaySoundFields0 fields0
+    cdef PlaySoundFields1 fields1
+    cdef PlaySoundFields2 fields2
+    self.name = reader.read_bytes().decode("utf8")
+    reader.read_into(&fields0, sizeof(fields0))
+    self.looping = fields0.looping_flags & (1 << 0)
+    self.positioned = fields0.looping_flags & (1 << 1)
+    if self.looping:
+        reader.read_into(&fields1, sizeof(fields1))
+        self.loop_id = fields1.loop_id
+    if self.positioned:
+        reader.read_into(&fields2, sizeof(fields2))
+        self.position.x = fields2.position_x
+        self.position.y = fields2.position_y
+        self.position.z = fields2.position_z
+    return 0
+
+
+cdef int write_play_sound(PlaySound self, ByteWriter writer) except -1:
+    cdef PlaySoundFields0 fields0
+    cdef PlaySoundFields1 fields1
+    cdef PlaySoundFields2 fields2
+    writer.write_uint8(15)
+    writer.write_bytes(self.name.encode("utf8"))
+    fields0.looping_flags = <bool>self.looping << 0 | <bool>self.positioned << 1
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    if self.looping:
+        fields1.loop_id = self.loop_id
+        writer.write_buf(<const char *>&fields1, sizeof(fields1))
+    if self.positioned:
+        fields2.position_x = self.position.x
+        fields2.position_y = self.position.y
+        fields2.position_z = self.position.z
+        writer.write_buf(<const char *>&fields2, sizeof(fields2))
+    return 0
+
+
+cdef int read_stop_sound(StopSound self, ByteReader reader) except -1:
+    cdef StopSoundFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.loop_id = fields0.loop_id
+    return 0
+
+
+cdef int write_stop_sound(StopSound self, ByteWriter writer) except -1:
+    cdef StopSoundFields0 fields0
+    writer.write_uint8(16)
+    fields0.loop_id = self.loop_id
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_create_player(CreatePlayer self, ByteReader reader) except -1:
+    cdef CreatePlayerFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.weapon = fields0.weapon
+    self.team = fields0.team
+    self.position.x = fields0.position_x
+    self.position.y = fields0.position_y
+    self.position.z = fields0.position_z
+    self.name = reader.read_bytes().decode("utf8")
+    return 0
+
+
+cdef int write_create_player(CreatePlayer self, ByteWriter writer) except -1:
+    cdef CreatePlayerFields0 fields0
+    writer.write_uint8(17)
+    fields0.player_id = self.player_id
+    fields0.weapon = self.weapon
+    fields0.team = self.team
+    fields0.position_x = self.position.x
+    fields0.position_y = self.position.y
+    fields0.position_z = self.position.z
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    writer.write_bytes(self.name.encode("utf8"))
+    return 0
+
+
+cdef int read_block_action(BlockAction self, ByteReader reader) except -1:
+    cdef BlockActionFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.value = fields0.value
+    self.x = fields0.x
+    self.y = fields0.y
+    self.z = fields0.z
+    return 0
+
+
+cdef int write_block_action(BlockAction self, ByteWriter writer) except -1:
+    cdef BlockActionFields0 fields0
+    writer.write_uint8(18)
+    fields0.player_id = self.player_id
+    fields0.value = self.value
+    fields0.x = self.x
+    fields0.y = self.y
+    fields0.z = self.z
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_block_line(BlockLine self, ByteReader reader) except -1:
+    cdef BlockLineFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.x1 = fields0.x1
+    self.y1 = fields0.y1
+    self.z1 = fields0.z1
+    self.x2 = fields0.x2
+    self.y2 = fields0.y2
+    self.z2 = fields0.z2
+    return 0
+
+
+cdef int write_block_line(BlockLine self, ByteWriter writer) except -1:
+    cdef BlockLineFields0 fields0
+    writer.write_uint8(20)
+    fields0.player_id = self.player_id
+    fields0.x1 = self.x1
+    fields0.y1 = self.y1
+    fields0.z1 = self.z1
+    fields0.x2 = self.x2
+    fields0.y2 = self.y2
+    fields0.z2 = self.z2
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_state_data(StateData self, ByteReader reader) except -1:
+    cdef StateDataFields0 fields0
+    cdef Entity entities_item
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.fog_color.b = fields0.fog_color_b
+    self.fog_color.g = fields0.fog_color_g
+    self.fog_color.r = fields0.fog_color_r
+    self.team1_color.b = fields0.team1_color_b
+    self.team1_color.g = fields0.team1_color_g
+    self.team1_color.r = fields0.team1_color_r
+    self.team2_color.b = fields0.team2_color_b
+    self.team2_color.g = fields0.team2_color_g
+    self.team2_color.r = fields0.team2_color_r
+    self.team1_score = fields0.team1_score
+    self.team2_score = fields0.team2_score
+    self.score_limit = fields0.score_limit
+    self.team1_name = reader.read_bytes().decode("utf8")
+    self.team2_name = reader.read_bytes().decode("utf8")
+    self.mode_name = reader.read_bytes().decode("utf8")
+    self.entities = []
+    while reader.data_left():
+        entities_item = Entity()
+        read_entity(entities_item, reader)
+        self.entities.append(entities_item)
+    return 0
+
+
+cdef int write_state_data(StateData self, ByteWriter writer) except -1:
+    cdef StateDataFields0 fields0
+    cdef Entity entities_item
+    writer.write_uint8(21)
+    fields0.player_id = self.player_id
+    fields0.fog_color_b = self.fog_color.b
+    fields0.fog_color_g = self.fog_color.g
+    fields0.fog_color_r = self.fog_color.r
+    fields0.team1_color_b = self.team1_color.b
+    fields0.team1_color_g = self.team1_color.g
+    fields0.team1_color_r = self.team1_color.r
+    fields0.team2_color_b = self.team2_color.b
+    fields0.team2_color_g = self.team2_color.g
+    fields0.team2_color_r = self.team2_color.r
+    fields0.team1_score = self.team1_score
+    fields0.team2_score = self.team2_score
+    fields0.score_limit = self.score_limit
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    writer.write_bytes(self.team1_name.encode("utf8"))
+    writer.write_bytes(self.team2_name.encode("utf8"))
+    writer.write_bytes(self.mode_name.encode("utf8"))
+    for entities_item in self.entities:
+        write_entity(entities_item, writer)
+    return 0
+
+
+cdef int read_kill_action(KillAction self, ByteReader reader) except -1:
+    cdef KillActionFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.killer_id = fields0.killer_id
+    self.kill_type = fields0.kill_type
+    self.respawn_time = fields0.respawn_time
+    return 0
+
+
+cdef int write_kill_action(KillAction self, ByteWriter writer) except -1:
+    cdef KillActionFields0 fields0
+    writer.write_uint8(22)
+    fields0.player_id = self.player_id
+    fields0.killer_id = self.killer_id
+    fields0.kill_type = self.kill_type
+    fields0.respawn_time = self.respawn_time
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_chat_message(ChatMessage self, ByteReader reader) except -1:
+    cdef ChatMessageFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.chat_type = fields0.chat_type
+    self.value = reader.read_bytes().decode("utf8")
+    return 0
+
+
+cdef int write_chat_message(ChatMessage self, ByteWriter writer) except -1:
+    cdef ChatMessageFields0 fields0
+    writer.write_uint8(23)
+    fields0.player_id = self.player_id
+    fields0.chat_type = self.chat_type
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    writer.write_bytes(self.value.encode("utf8"))
+    return 0
+
+
+cdef int read_map_start(MapStart self, ByteReader reader) except -1:
+    cdef MapStartFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.size = fields0.size
+    return 0
+
+
+cdef int write_map_start(MapStart self, ByteWriter writer) except -1:
+    cdef MapStartFields0 fields0
+    writer.write_uint8(24)
+    fields0.size = self.size
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_map_chunk(MapChunk self, ByteReader reader) except -1:
+    self.data = reader.get()
+    return 0
+
+
+cdef int write_map_chunk(MapChunk self, ByteWriter writer) except -1:
+    writer.write_uint8(25)
+    writer.write(self.data)
+    return 0
+
+
+cdef int read_pack_start(PackStart self, ByteReader reader) except -1:
+    cdef PackStartFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.size = fields0.size
+    self.checksum = fields0.checksum
+    return 0
+
+
+cdef int write_pack_start(PackStart self, ByteWriter writer) except -1:
+    cdef PackStartFields0 fields0
+    writer.write_uint8(26)
+    fields0.size = self.size
+    fields0.checksum = self.checksum
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_pack_response(PackResponse self, ByteReader reader) except -1:
+    cdef PackResponseFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.value = fields0.value
+    return 0
+
+
+cdef int write_pack_response(PackResponse self, ByteWriter writer) except -1:
+    cdef PackResponseFields0 fields0
+    writer.write_uint8(27)
+    fields0.value = self.value
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_pack_chunk(PackChunk self, ByteReader reader) except -1:
+    self.data = reader.get()
+    return 0
+
+
+cdef int write_pack_chunk(PackChunk self, ByteWriter writer) except -1:
+    writer.write_uint8(28)
+    writer.write(self.data)
+    return 0
+
+
+cdef int read_player_left(PlayerLeft self, ByteReader reader) except -1:
+    cdef PlayerLeftFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    return 0
+
+
+cdef int write_player_left(PlayerLeft self, ByteWriter writer) except -1:
+    cdef PlayerLeftFields0 fields0
+    writer.write_uint8(29)
+    fields0.player_id = self.player_id
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_progress_bar(ProgressBar self, ByteReader reader) except -1:
+    cdef ProgressBarFields0 fields0
+    cdef ProgressBarFields1 fields1
+    reader.read_into(&fields0, sizeof(fields0))
+    self.progress = fields0.progress
+    if not isnan(self.progress):
+        reader.read_into(&fields1, sizeof(fields1))
+        self.rate = fields1.rate
+        self.color1.b = fields1.color1_b
+        self.color1.g = fields1.color1_g
+        self.color1.r = fields1.color1_r
+        self.color2.b = fields1.color2_b
+        self.color2.g = fields1.color2_g
+        self.color2.r = fields1.color2_r
+    return 0
+
+
+cdef int write_progress_bar(ProgressBar self, ByteWriter writer) except -1:
+    cdef ProgressBarFields0 fields0
+    cdef ProgressBarFields1 fields1
+    writer.write_uint8(30)
+    fields0.progress = self.progress
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    if not isnan(self.progress):
+        fields1.rate = self.rate
+        fields1.color1_b = self.color1.b
+        fields1.color1_g = self.color1.g
+        fields1.color1_r = self.color1.r
+        fields1.color2_b = self.color2.b
+        fields1.color2_g = self.color2.g
+        fields1.color2_r = self.color2.r
+        writer.write_buf(<const char *>&fields1, sizeof(fields1))
+    return 0
+
+
+cdef int read_restock(Restock self, ByteReader reader) except -1:
+    cdef RestockFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    return 0
+
+
+cdef int write_restock(Restock self, ByteWriter writer) except -1:
+    cdef RestockFields0 fields0
+    writer.write_uint8(31)
+    fields0.player_id = self.player_id
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_fog_color(FogColor self, ByteReader reader) except -1:
+    cdef FogColorFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.color.b = fields0.color_b
+    self.color.g = fields0.color_g
+    self.color.r = fields0.color_r
+    return 0
+
+
+cdef int write_fog_color(FogColor self, ByteWriter writer) except -1:
+    cdef FogColorFields0 fields0
+    writer.write_uint8(32)
+    fields0.constant = 255
+    fields0.color_b = self.color.b
+    fields0.color_g = self.color.g
+    fields0.color_r = self.color.r
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_weapon_reload(WeaponReload self, ByteReader reader) except -1:
+    cdef WeaponReloadFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.clip_ammo = fields0.clip_ammo
+    self.reserve_ammo = fields0.reserve_ammo
+    return 0
+
+
+cdef int write_weapon_reload(WeaponReload self, ByteWriter writer) except -1:
+    cdef WeaponReloadFields0 fields0
+    writer.write_uint8(33)
+    fields0.player_id = self.player_id
+    fields0.clip_ammo = self.clip_ammo
+    fields0.reserve_ammo = self.reserve_ammo
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_change_team(ChangeTeam self, ByteReader reader) except -1:
+    cdef ChangeTeamFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.team = fields0.team
+    return 0
+
+
+cdef int write_change_team(ChangeTeam self, ByteWriter writer) except -1:
+    cdef ChangeTeamFields0 fields0
+    writer.write_uint8(34)
+    fields0.player_id = self.player_id
+    fields0.team = self.team
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_change_class(ChangeClass self, ByteReader reader) except -1:
+    cdef ChangeClassFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.player_id = fields0.player_id
+    self.class_id = fields0.class_id
+    return 0
+
+
+cdef int write_change_class(ChangeClass self, ByteWriter writer) except -1:
+    cdef ChangeClassFields0 fields0
+    writer.write_uint8(35)
+    fields0.player_id = self.player_id
+    fields0.class_id = self.class_id
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_set_score(SetScore self, ByteReader reader) except -1:
+    cdef SetScoreFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.type = fields0.type
+    self.specifier = fields0.specifier
+    self.value = fields0.value
+    return 0
+
+
+cdef int write_set_score(SetScore self, ByteWriter writer) except -1:
+    cdef SetScoreFields0 fields0
+    writer.write_uint8(36)
+    fields0.type = self.type
+    fields0.specifier = self.specifier
+    fields0.value = self.value
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
+
+
+cdef int read_use_command(UseCommand self, ByteReader reader) except -1:
+    return 0
+
+
+cdef int write_use_command(UseCommand self, ByteWriter writer) except -1:
+    writer.write_uint8(37)
+    return 0
+
+
+cdef int read_place_mg(PlaceMG self, ByteReader reader) except -1:
+    cdef PlaceMGFields0 fields0
+    reader.read_into(&fields0, sizeof(fields0))
+    self.x = fields0.x
+    self.y = fields0.y
+    self.z = fields0.z
+    self.yaw = fields0.yaw
+    return 0
+
+
+cdef int write_place_mg(PlaceMG self, ByteWriter writer) except -1:
+    cdef PlaceMGFields0 fields0
+    writer.write_uint8(38)
+    fields0.x = self.x
+    fields0.y = self.y
+    fields0.z = self.z
+    fields0.yaw = self.yaw
+    writer.write_buf(<const char *>&fields0, sizeof(fields0))
+    return 0
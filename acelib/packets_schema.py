@@ -0,0 +1,69 @@
+"""
+Wire layout of every loader in acelib/packets.pyx, in order. acelib/packetgen.py generates packets_codec.pxi from
+this: after changing a layout run `python -m acelib.packetgen generate`, rebuild, then `python -m acelib.packetgen
+verify`.
+
+Fields are uint8_t unless given a type. Pos is a Pos3f, Rgb a Color, Nested another record.
+"""
+from acelib.packetgen import Bool, Const, Custom, Flags, Float, Int, Nested, Packet, Pos, Record, Records, Rest, Rgb, \
+    Str, When
+
+SCHEMA = [
+    Packet("InitialInfo", 0, Str("mode_name"), Str("mode_description")),
+    Packet("PositionData", 1, Pos("data")),
+    Record("ClientUpdateData", Pos("p"), Pos("o")),
+    Packet("PositionOrientationData", 2, Nested("data", "ClientUpdateData")),
+    # encoded per recipient from pre-packed records
+    Custom("WorldUpdate"),
+    Packet("InputData", 4, Int("player_id"), Flags("up", "down", "left", "right", "jump", "crouch", "sneak", "sprint")),
+    Packet("WeaponInput", 5, Int("player_id"), Flags("primary", "secondary")),
+    Packet("HitPacket", 6, Int("player_id"), Int("value")),
+    Packet("SetHP", 6, Int("hp"), Int("type"), Pos("source")),
+    Packet("UseOrientedItem", 7, Int("player_id"), Int("tool"), Float("value"), Pos("position"), Pos("velocity")),
+    Packet("SetTool", 8, Int("player_id"), Int("value")),
+    Packet("SetColor", 9, Int("player_id"), Rgb("color")),
+    Packet("ExistingPlayer", 10, Int("player_id"), Int("team", "int8_t"), Int("weapon"), Int("tool"),
+           Int("kills", "uint32_t"), Rgb("color"), Str("name")),
+    Packet("ShortPlayerData", 11, Int("player_id"), Int("team", "int8_t"), Int("weapon")),
+    Record("Entity", Int("id"), Int("type"), Int("state"), Int("carrier", "int8_t"), Pos("position"), Float("yaw")),
+    Packet("ChangeEntity", 12, Int("entity_id"), Int("type"),
+           When("self.type == constants.SET.POSITION.value", Pos("position")),
+           When("self.type == constants.SET.CARRIER.value", Int("carrier", "int8_t")),
+           When("self.type == constants.SET.STATE.value", Int("state"))),
+    Packet("DestroyEntity", 13, Int("entity_id")),
+    Packet("CreateEntity", 14, Nested("entity", "Entity")),
+    Packet("PlaySound", 15, Str("name"), Flags("looping", "positioned"),
+           When("self.looping", Int("loop_id")),
+           When("self.positioned", Pos("position"))),
+    Packet("StopSound", 16, Int("loop_id")),
+    Packet("CreatePlayer", 17, Int("player_id"), Int("weapon"), Int("team", "int8_t"), Pos("position"), Str("name")),
+    Packet("BlockAction", 18, Int("player_id"), Int("value"), Int("x", "int32_t"), Int("y", "int32_t"),
+           Int("z", "int32_t")),
+    # an optional color behind a presence byte, and a counted list of those
+    Custom("ServerBlockItem"),
+    Custom("ServerBlockAction"),
+    Packet("BlockLine", 20, Int("player_id"), Int("x1", "int32_t"), Int("y1", "int32_t"), Int("z1", "int32_t"),
+           Int("x2", "int32_t"), Int("y2", "int32_t"), Int("z2", "int32_t")),
+    Packet("StateData", 21, Int("player_id"), Rgb("fog_color"), Rgb("team1_color"), Rgb("team2_color"),
+           Int("team1_score"), Int("team2_score"), Int("score_limit"),
+           Str("team1_name"), Str("team2_name"), Str("mode_name"), Records("entities", "Entity")),
+    Packet("KillAction", 22, Int("player_id"), Int("killer_id"), Int("kill_type"), Int("respawn_time")),
+    Packet("ChatMessage", 23, Int("player_id"), Int("chat_type"), Str("value")),
+    Packet("MapStart", 24, Int("size", "uint32_t")),
+    Packet("MapChunk", 25, Rest("data")),
+    Packet("PackStart", 26, Int("size", "uint32_t"), Int("checksum", "uint32_t")),
+    Packet("PackResponse", 27, Bool("value")),
+    Packet("PackChunk", 28, Rest("data")),
+    Packet("PlayerLeft", 29, Int("player_id")),
+    Packet("ProgressBar", 30, Float("progress"),
+           When("not isnan(self.progress)", Float("rate"), Rgb("color1"), Rgb("color2"))),
+    Packet("Restock", 31, Int("player_id")),
+    # the client ignores the first byte
+    Packet("FogColor", 32, Const(0xFF), Rgb("color")),
+    Packet("WeaponReload", 33, Int("player_id"), Int("clip_ammo"), Int("reserve_ammo")),
+    Packet("ChangeTeam", 34, Int("player_id"), Int("team", "int8_t")),
+    Packet("ChangeClass", 35, Int("player_id"), Int("class_id")),
+    Packet("SetScore", 36, Int("type"), Int("specifier"), Int("value", "uint16_t")),
+    Packet("UseCommand", 37),
+    Packet("PlaceMG", 38, Int("x", "uint32_t"), Int("y", "uint32_t"), Int("z", "uint32_t"), Float("yaw")),
+]
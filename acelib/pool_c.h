@@ -0,0 +1,114 @@
+#pragma once
+
+#include <algorithm>
+#include <atomic>
+#include <condition_variable>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+// A handful of worker threads for splitting big batches (rays, hitscans, ...) across cores.
+// The calling thread works on the batch too. Batches run one at a time, and `fn` must not start another batch.
+// Only call this without the GIL held, fn has to be pure C++.
+class ThreadPool {
+public:
+    explicit ThreadPool(size_t threads) : count(0), grain(1), next(0), pending(0), active(0), generation(0), stopping(false) {
+        for (size_t i = 0; i < threads; i++)
+            this->workers.emplace_back([this] { this->work(); });
+    }
+
+    ~ThreadPool() {
+        {
+            std::lock_guard<std::mutex> lock(this->mutex);
+            this->stopping = true;
+        }
+        this->wake.notify_all();
+        for (std::thread &worker : this->workers)
+            worker.join();
+    }
+
+    ThreadPool(const ThreadPool &) = delete;
+    ThreadPool &operator=(const ThreadPool &) = delete;
+
+    // Calls fn(begin, end) over [0, count) in chunks of `grain` and returns once all of them are done.
+    void parallel_for(size_t count, size_t grain, const std::function<void(size_t, size_t)> &fn) {
+        grain = std::max<size_t>(grain, 1);
+        const size_t chunks = (count + grain - 1) / grain;
+        if (chunks <= 1 || this->workers.empty()) {
+            if (count)
+                fn(0, count);
+            return;
+        }
+
+        std::lock_guard<std::mutex> batch(this->batch_mutex);
+        {
+            std::unique_lock<std::mutex> lock(this->mutex);
+            // stragglers from the last batch might still be looking at it
+            this->done.wait(lock, [this] { return this->active == 0; });
+            this->job = &fn;
+            this->count = count;
+            this->grain = grain;
+            this->next = 0;
+            this->pending = chunks;
+            this->generation++;
+        }
+        this->wake.notify_all();
+
+        this->run_chunks();
+
+        std::unique_lock<std::mutex> lock(this->mutex);
+        this->done.wait(lock, [this] { return this->pending == 0; });
+    }
+
+    size_t size() const {
+        return this->workers.size() + 1;
+    }
+
+private:
+    void run_chunks() {
+        size_t begin;
+        while ((begin = this->next.fetch_add(this->grain)) < this->count) {
+            (*this->job)(begin, std::min(begin + this->grain, this->count));
+            if (--this->pending == 0) {
+                std::lock_guard<std::mutex> lock(this->mutex);
+                this->done.notify_all();
+            }
+        }
+    }
+
+    void work() {
+        size_t seen = 0;
+        std::unique_lock<std::mutex> lock(this->mutex);
+        while (true) {
+            this->wake.wait(lock, [&] { return this->stopping || this->generation != seen; });
+            if (this->stopping)
+                return;
+            seen = this->generation;
+            this->active++;
+            lock.unlock();
+
+            this->run_chunks();
+
+            lock.lock();
+            if (--this->active == 0)
+                this->done.notify_all();
+        }
+    }
+
+    std::vector<std::thread> workers;
+    std::mutex mutex, batch_mutex;
+    std::condition_variable wake, done;
+
+    const std::function<void(size_t, size_t)> *job = nullptr;
+    size_t count, grain;
+    std::atomic<size_t> next, pending;
+    size_t active, generation;
+    bool stopping;
+};
+
+// Shared by everything in the module, started on first use. Small on purpose: the server loop keeps a core busy.
+inline ThreadPool &thread_pool() {
+    static ThreadPool pool(std::max(1u, std::min(4u, std::thread::hardware_concurrency())) - 1);
+    return pool;
+}
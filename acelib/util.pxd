@@ -3,15 +3,18 @@ from libc.stdint cimport *
 from .bytes cimport ByteReader, ByteWriter
 
 
-cdef inline void read_position(ByteReader reader, float *x, float *y, float *z):
-    x[0] = reader.read_float()
-    y[0] = reader.read_float()
-    z[0] = reader.read_float()
+cdef inline int read_position(ByteReader reader, float *x, float *y, float *z) except -1:
+    cdef float xyz[3]
+    reader.read_float_array(xyz, 3)
+    x[0] = xyz[0]
+    y[0] = xyz[1]
+    z[0] = xyz[2]
+    return 0
 
-cdef inline void write_position(ByteWriter writer, float x, float y, float z):
-    writer.write_float(x)
-    writer.write_float(y)
-    writer.write_float(z)
+cdef inline void write_position(ByteWriter writer, float x, float y, float z) except *:
+    cdef float xyz[3]
+    xyz[:] = [x, y, z]
+    writer.write_float_array(xyz, 3)
 
 cdef inline void read_color(ByteReader reader, uint8_t *r, uint8_t *g, uint8_t *b):
     b[0] = reader.read_uint8()
@@ -7,8 +7,15 @@ cdef extern from "vxl_c.h" nogil:
     struct Pos3:
         int x, y, z
 
+    struct MapImage:
+        uint32_t magic, version
+        uint32_t map_x, map_y, map_z
+        uint32_t source_size, source_checksum
+
     cdef cppclass AceMap:
         AceMap(uint8_t *buf) except +
+        AceMap(MapImage *image) except +
+        MapImage *image
         void read(uint8_t *buf) except +
         vector[uint8_t] write() except +
         size_t write(vector[uint8_t] &v, int *sx, int *sy, int columns);
@@ -30,12 +37,14 @@ cdef extern from "vxl_c.h" nogil:
     int get_pos(int x, int y, int z)
     bool is_valid_pos(int x, int y, int z)
     bool is_valid_pos(int pos)
+    bool is_valid_image(const MapImage *image, size_t size)
     # int check_node(int x, int y, int z, AceMap *map, int destroy)
 
     enum: MAP_X, MAP_Y, MAP_Z, DEFAULT_COLOR
 
 cdef class VXLMap:
     cdef AceMap *map_data
+    cdef object image # keeps the mapping a shared image was attached from alive
     cdef public:
         int estimated_size
         dict map_info
@@ -1,4 +1,6 @@
 # distutils: sources = acelib/vxl_c.cpp
+import mmap
+import os
 import zlib
 
 VXL_MAP_X = MAP_X
@@ -12,18 +14,66 @@ cpdef inline block_color(int r, int g, int b):
 
 
 cdef class VXLMap:
-    def __cinit__(self, uint8_t *buffer=NULL, dict map_info=None):
-        self.map_data = new AceMap(buffer)
-        self.estimated_size = len(buffer)
+    def __cinit__(self, bytes buffer=None, dict map_info=None, image=None):
+        cdef uint8_t[::1] view
+        if image is not None:
+            view = image
+            if not is_valid_image(<MapImage *>&view[0], view.shape[0]):
+                raise ValueError("Not a valid map image")
+            self.image = view
+            self.map_data = new AceMap(<MapImage *>&view[0])
+            self.estimated_size = self.map_data.image.source_size
+        elif buffer is not None:
+            self.map_data = new AceMap(<uint8_t *><char *>buffer)
+            self.map_data.image.source_size = len(buffer)
+            self.map_data.image.source_checksum = zlib.crc32(buffer)
+            self.estimated_size = len(buffer)
+        else:
+            self.map_data = new AceMap(<uint8_t *>NULL)
+            self.estimated_size = 0
         self.map_info = map_info or {}
 
     def __dealloc__(self):
         del self.map_data
 
-    def __init__(self, uint8_t *buffer=NULL, dict map_info=None):
+    def __init__(self, bytes buffer=None, dict map_info=None, image=None):
         # just to make my ide happy LUL
         pass
 
+    @staticmethod
+    def from_image(str path, dict map_info=None, checksum=None):
+        """
+        Attaches to a map image written by `VXLMap.publish`.
+
+        The image is mapped copy-on-write, so every process attached to it shares the same physical memory
+        and only pages that are actually edited get copied.
+
+        Args:
+            path (str): Image path, ideally on a tmpfs such as /dev/shm
+            map_info (dict)
+            checksum (int): crc32 of the source .vxl. If given and it doesn't match, ValueError is raised.
+
+        Returns:
+            VXLMap
+        """
+        with open(path, "rb") as f:
+            image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        cdef VXLMap map = VXLMap(image=image, map_info=map_info)
+        if checksum is not None and map.map_data.image.source_checksum != checksum:
+            raise ValueError("Map image is stale")
+        return map
+
+    def publish(self, str path):
+        """
+        Writes the decoded map image to `path` so other processes can attach to it with `VXLMap.from_image`.
+        The file is replaced atomically, so processes racing to publish the same map won't see a partial image.
+        """
+        cdef uint8_t[::1] view = <uint8_t[:sizeof(MapImage)]><uint8_t *>self.map_data.image
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(view)
+        os.replace(tmp, path)
+
     def __iter__(self):
         cdef:
             int x = 0, y = 0, size
@@ -1,6 +1,7 @@
 #include <random>
 #include <chrono> 
 #include <unordered_set>
+#include <algorithm>
 
 #include "vxl_c.h"
 
@@ -14,11 +15,32 @@ void write_bytes(std::vector<uint8_t> &vec, T item) {
     vec.push_back(static_cast<uint8_t>(item >> 24));
 }
 
-AceMap::AceMap(uint8_t *buf) : eng(std::chrono::system_clock::now().time_since_epoch().count()) {
+AceMap::AceMap(uint8_t *buf) : image(new MapImage()), owns_image(true),
+    revisions(REGIONS_X * REGIONS_Y), occupancy4(BRICK4_X * BRICK4_Y * BRICK4_Z),
+    occupancy16(BRICK16_X * BRICK16_Y * BRICK16_Z),
+    eng(std::chrono::system_clock::now().time_since_epoch().count()) {
+    this->image->magic = MAP_IMAGE_MAGIC;
+    this->image->version = MAP_IMAGE_VERSION;
+    this->image->map_x = MAP_X;
+    this->image->map_y = MAP_Y;
+    this->image->map_z = MAP_Z;
     nodes.reserve(512);
     this->read(buf);
 }
 
+AceMap::AceMap(MapImage *image) : image(image), owns_image(false),
+    revisions(REGIONS_X * REGIONS_Y), occupancy4(BRICK4_X * BRICK4_Y * BRICK4_Z),
+    occupancy16(BRICK16_X * BRICK16_Y * BRICK16_Z),
+    eng(std::chrono::system_clock::now().time_since_epoch().count()) {
+    nodes.reserve(512);
+    this->rebuild_occupancy();
+}
+
+AceMap::~AceMap() {
+    if (this->owns_image)
+        delete this->image;
+}
+
 void AceMap::read(uint8_t *buf) {
     if (!buf) return;
 
@@ -26,8 +48,8 @@ void AceMap::read(uint8_t *buf) {
         for (int x = 0; x < MAP_X; ++x) {
             int z;
             for (z = 0; z < MAP_Z; ++z) {
-                this->geometry[get_pos(x, y, z)] = true;
-                this->colors[get_pos(x, y, z)] = DEFAULT_COLOR;
+                this->set_solid(get_pos(x, y, z), true);
+                this->image->colors[get_pos(x, y, z)] = DEFAULT_COLOR;
             }
 
 
@@ -38,11 +60,11 @@ void AceMap::read(uint8_t *buf) {
                 int top_color_end = buf[2]; // inclusive
 
                 for (int i = z; i < top_color_start; i++)
-                    this->geometry[get_pos(x, y, i)] = false;
+                    this->set_solid(get_pos(x, y, i), false);
 
                 uint32_t *color = reinterpret_cast<uint32_t *>(&buf[4]);
                 for (z = top_color_start; z <= top_color_end; z++)
-                    this->colors[get_pos(x, y, z)] = *(color++);
+                    this->image->colors[get_pos(x, y, z)] = *(color++);
 
                 int len_bottom = top_color_end - top_color_start + 1;
 
@@ -63,11 +85,44 @@ void AceMap::read(uint8_t *buf) {
                 int bottom_color_start = bottom_color_end - len_top;
 
                 for (z = bottom_color_start; z < bottom_color_end; ++z) {
-                    this->colors[get_pos(x, y, z)] = *color++;
+                    this->image->colors[get_pos(x, y, z)] = *color++;
                 }
             }
         }
     }
+    this->rebuild_occupancy();
+}
+
+void AceMap::rebuild_occupancy() {
+    static const uint8_t NIBBLE_BITS[16] = { 0, 1, 1, 2, 1, 2, 2, 3, 1, 2, 2, 3, 2, 3, 3, 4 };
+
+    std::fill(this->occupancy4.begin(), this->occupancy4.end(), 0);
+    std::fill(this->occupancy16.begin(), this->occupancy16.end(), 0);
+    // each geometry word is a run of 64 voxels along x, i.e. 4 bits for each of 16 bricks
+    for (size_t word = 0; word < MAP_SIZE / 64; word++) {
+        uint64_t bits = this->image->geometry[word];
+        if (!bits) continue;
+        const size_t pos = word * 64;
+        const size_t x = pos % MAP_X, y = (pos / MAP_X) % MAP_Y, z = pos / (MAP_X * MAP_Y);
+        uint8_t *brick = &this->occupancy4[(x >> 2) + (y >> 2) * BRICK4_X + (z >> 2) * BRICK4_X * BRICK4_Y];
+        for (; bits; bits >>= 4, brick++)
+            *brick += NIBBLE_BITS[bits & 15];
+    }
+    for (size_t z = 0; z < BRICK4_Z; z++) {
+        for (size_t y = 0; y < BRICK4_Y; y++) {
+            for (size_t x = 0; x < BRICK4_X; x++) {
+                this->occupancy16[(x >> 2) + (y >> 2) * BRICK16_X + (z >> 2) * BRICK16_X * BRICK16_Y] +=
+                    this->occupancy4[x + y * BRICK4_X + z * BRICK4_X * BRICK4_Y];
+            }
+        }
+    }
+}
+
+void AceMap::update_occupancy(const size_t pos, const int delta) {
+    const size_t x = pos % MAP_X, y = (pos / MAP_X) % MAP_Y, z = pos / (MAP_X * MAP_Y);
+    this->occupancy4[(x >> 2) + (y >> 2) * BRICK4_X + (z >> 2) * BRICK4_X * BRICK4_Y] += delta;
+    this->occupancy16[(x >> 4) + (y >> 4) * BRICK16_X + (z >> 4) * BRICK16_X * BRICK16_Y] += delta;
+    this->revisions[region_of(x, y)]++;
 }
 
 std::vector<uint8_t> AceMap::write() {
@@ -93,7 +148,7 @@ size_t AceMap::write(std::vector<uint8_t> &v, int *sx, int *sy, int columns) {
             while (z < MAP_Z) {
                 // find the air region
                 int air_start = z;
-                while (z < MAP_Z && !this->geometry[get_pos(x, y, z)])
+                while (z < MAP_Z && !this->solid(get_pos(x, y, z)))
                     ++z;
 
                 // find the top region
@@ -103,7 +158,7 @@ size_t AceMap::write(std::vector<uint8_t> &v, int *sx, int *sy, int columns) {
                 int top_colors_end = z;
 
                 // now skip past the solid voxels
-                while (z < MAP_Z && this->geometry[get_pos(x, y, z)] && !this->is_surface(x, y, z))
+                while (z < MAP_Z && this->solid(get_pos(x, y, z)) && !this->is_surface(x, y, z))
                     ++z;
 
                 // at the end of the solid voxels, we have colored voxels.
@@ -141,10 +196,10 @@ size_t AceMap::write(std::vector<uint8_t> &v, int *sx, int *sy, int columns) {
                 v.push_back(air_start);
 
                 for (i = 0; i < top_colors_len; ++i)
-                    write_bytes(v, this->colors[get_pos(x, y, top_colors_start + i)]);
+                    write_bytes(v, this->image->colors[get_pos(x, y, top_colors_start + i)]);
                     
                 for (i = 0; i < bottom_colors_len; ++i)
-                    write_bytes(v, this->colors[get_pos(x, y, bottom_colors_start + i)]);
+                    write_bytes(v, this->image->colors[get_pos(x, y, bottom_colors_start + i)]);
             }
             column++;
         }
@@ -157,13 +212,13 @@ done:
 }
 
 bool AceMap::is_surface(const int x, const int y, const int z) {
-    if (!this->geometry[get_pos(x, y, z)]) return false;
-    if (x     >     0 && !this->geometry[get_pos(x - 1, y, z)]) return true;
-    if (x + 1 < MAP_X && !this->geometry[get_pos(x + 1, y, z)]) return true;
-    if (y     >     0 && !this->geometry[get_pos(x, y - 1, z)]) return true;
-    if (y + 1 < MAP_Y && !this->geometry[get_pos(x, y + 1, z)]) return true;
-    if (z     >     0 && !this->geometry[get_pos(x, y, z - 1)]) return true;
-    if (z + 1 < MAP_Z && !this->geometry[get_pos(x, y, z + 1)]) return true;
+    if (!this->solid(get_pos(x, y, z))) return false;
+    if (x     >     0 && !this->solid(get_pos(x - 1, y, z))) return true;
+    if (x + 1 < MAP_X && !this->solid(get_pos(x + 1, y, z))) return true;
+    if (y     >     0 && !this->solid(get_pos(x, y - 1, z))) return true;
+    if (y + 1 < MAP_Y && !this->solid(get_pos(x, y + 1, z))) return true;
+    if (z     >     0 && !this->solid(get_pos(x, y, z - 1))) return true;
+    if (z + 1 < MAP_Z && !this->solid(get_pos(x, y, z + 1))) return true;
     return false;
 }
 
@@ -174,7 +229,7 @@ bool AceMap::get_solid(int x, int y, int z, bool wrapped) {
     }
     if (!is_valid_pos(x, y, z))
         return false;
-    return this->geometry[get_pos(x, y, z)];
+    return this->solid(get_pos(x, y, z));
 }
 
 uint32_t AceMap::get_color(int x, int y, int z, bool wrapped) {
@@ -183,7 +238,7 @@ uint32_t AceMap::get_color(int x, int y, int z, bool wrapped) {
         y &= (MAP_Y - 1);
     }
     if (!is_valid_pos(x, y, z)) return 0;
-    return this->colors[get_pos(x, y, z)];
+    return this->image->colors[get_pos(x, y, z)];
 }
 
 int AceMap::get_z(const int x, const int y, const int start) {
@@ -299,8 +354,10 @@ bool AceMap::set_point(const int x, const int y, const int z, const bool solid,
 bool AceMap::set_point(const size_t pos, const bool solid, const uint32_t color) {
     if (!is_valid_pos(pos)) return false;
 
-    this->geometry[pos] = solid;
-    this->colors[pos] = solid ? color : DEFAULT_COLOR;
+    if (this->solid(pos) != solid)
+        this->update_occupancy(pos, solid ? 1 : -1);
+    this->set_solid(pos, solid);
+    this->image->colors[pos] = solid ? color : DEFAULT_COLOR;
     return true;
 }
 
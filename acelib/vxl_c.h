@@ -1,5 +1,4 @@
 #pragma once
-#include <bitset>
 #include <stdint.h>
 #include <vector>
 #include <unordered_set>
@@ -12,8 +11,19 @@ struct Pos3 {
 constexpr size_t MAP_X = 512;
 constexpr size_t MAP_Y = 512;
 constexpr size_t MAP_Z = 64;
+constexpr size_t MAP_SIZE = MAP_X * MAP_Y * MAP_Z;
 constexpr uint32_t DEFAULT_COLOR = 0xFF674028;
 
+// occupancy pyramid brick sizes, see AceMap::is_empty4/is_empty16
+constexpr size_t BRICK4_X = MAP_X / 4, BRICK4_Y = MAP_Y / 4, BRICK4_Z = MAP_Z / 4;
+constexpr size_t BRICK16_X = MAP_X / 16, BRICK16_Y = MAP_Y / 16, BRICK16_Z = MAP_Z / 16;
+// geometry edits are counted per column of REGION_SIZE x REGION_SIZE, see AceMap::region_revision
+constexpr size_t REGION_SIZE = 16;
+constexpr size_t REGIONS_X = MAP_X / REGION_SIZE, REGIONS_Y = MAP_Y / REGION_SIZE;
+
+constexpr uint32_t MAP_IMAGE_MAGIC = 0x4C58564D; // "MVXL"
+constexpr uint32_t MAP_IMAGE_VERSION = 1;
+
 constexpr size_t get_pos(const int x, const int y, const int z) {
     return x + (y * MAP_Y) + (z * MAP_X * MAP_Y);
 }
@@ -26,10 +36,37 @@ constexpr bool is_valid_pos(const int pos) {
     return pos >= get_pos(0, 0, 0) && pos <= get_pos(MAP_X - 1, MAP_Y - 1, MAP_Z - 1);
 }
 
+// A fully decoded map, laid out so it can be written to a file once and mmap'd by other processes.
+// Everything the map needs lives in here, so a copy-on-write mapping only duplicates the pages that get edited.
+struct MapImage {
+    uint32_t magic;
+    uint32_t version;
+    uint32_t map_x, map_y, map_z;
+    uint32_t source_size; // size of the .vxl this image was decoded from
+    uint32_t source_checksum; // crc32 of said .vxl, so stale images can be detected
+    uint32_t reserved[9];
+
+    uint64_t geometry[MAP_SIZE / 64];
+    uint32_t colors[MAP_SIZE];
+};
+
+static_assert(sizeof(MapImage) % 64 == 0, "MapImage should keep geometry/colors cacheline aligned");
+
+inline bool is_valid_image(const MapImage *image, size_t size) {
+    return size == sizeof(MapImage) && image->magic == MAP_IMAGE_MAGIC && image->version == MAP_IMAGE_VERSION &&
+           image->map_x == MAP_X && image->map_y == MAP_Y && image->map_z == MAP_Z;
+}
+
 
 class AceMap {
 public:
     AceMap(uint8_t *buf = nullptr);
+    // Use an existing image (i.e. a private mapping of a shared one) instead of decoding a .vxl. Not owned.
+    explicit AceMap(MapImage *image);
+    ~AceMap();
+    AceMap(const AceMap &) = delete;
+    AceMap &operator=(const AceMap &) = delete;
+
     void read(uint8_t *buf);
     std::vector<uint8_t> write();
     size_t write(std::vector<uint8_t> &v, int *sx, int *sy, int columns=-1);
@@ -48,9 +85,43 @@ public:
 //    void set_column_color(const size_t x, const size_t y, const size_t z_start, const size_t z_end, const uint32_t color);
     bool check_node(int x, int y, int z, bool destroy=true);
 
+    // Whether the 4^3 / 16^3 brick holding a (valid) voxel has nothing solid in it, so rays can skip over it.
+    bool is_empty4(const int x, const int y, const int z) const {
+        return !this->occupancy4[(x >> 2) + (y >> 2) * BRICK4_X + (z >> 2) * BRICK4_X * BRICK4_Y];
+    }
+    bool is_empty16(const int x, const int y, const int z) const {
+        return !this->occupancy16[(x >> 4) + (y >> 4) * BRICK16_X + (z >> 4) * BRICK16_X * BRICK16_Y];
+    }
+
+    // Bumped every time a voxel in the region turns solid or empty, so results traced through the map can be cached.
+    uint32_t region_revision(const size_t region) const {
+        return this->revisions[region];
+    }
+    static size_t region_of(const int x, const int y) {
+        return (x / REGION_SIZE) + (y / REGION_SIZE) * REGIONS_X;
+    }
+
+    MapImage *image;
+
 private:
-    std::bitset<MAP_X * MAP_Y * MAP_Z> geometry;
-    uint32_t colors[MAP_X * MAP_Y * MAP_Z];
+    bool owns_image;
+    std::vector<uint32_t> revisions;
+    // solid voxel count of every brick. Not part of the image: it's cheap to rebuild and would only add pages to share
+    std::vector<uint8_t> occupancy4;
+    std::vector<uint16_t> occupancy16;
+
+    void rebuild_occupancy();
+    void update_occupancy(const size_t pos, const int delta);
+
+    bool solid(const size_t pos) const {
+        return (this->image->geometry[pos >> 6] >> (pos & 63)) & 1;
+    }
+
+    void set_solid(const size_t pos, const bool value) {
+        const uint64_t bit = uint64_t(1) << (pos & 63);
+        if (value) this->image->geometry[pos >> 6] |= bit;
+        else this->image->geometry[pos >> 6] &= ~bit;
+    }
 
     std::vector<Pos3> nodes;
     std::unordered_set<size_t> marked;
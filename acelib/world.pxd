@@ -1,17 +1,31 @@
 # from .vxl cimport VXLMap, AceMap
 from acelib cimport math3d_c, math3d, vxl
 from libcpp cimport bool
+from libcpp.vector cimport vector
+from libc.stdint cimport uint8_t, uint32_t
 
 cdef extern from "world_c.cpp" nogil:
+    enum MovementResult:
+        MOVEMENT_ACCEPTED, MOVEMENT_TOO_FAR, MOVEMENT_DIVERGED
+
+    struct MovementCheck:
+        math3d_c.Vector3[double] origin, report
+        bool pending
+        double last_time, divergence, max_divergence, error_sum, max_error
+        size_t reports, corrections
+
     cdef cppclass AcePlayer:
         AcePlayer(vxl.AceMap *map) except +
         long update(double dt, double time)
         void set_orientation(double x, double y, double z)
+        MovementResult reconcile(double time)
 
         vxl.AceMap *map
         bool mf, mb, ml, mr, jump, crouch, sneak, sprint, primary_fire, secondary_fire, airborne, wade, alive, weapon
+        int team, id
         float lastclimb
         math3d_c.Vector3[double] p, e, v, f, s, h
+        MovementCheck movement
 
     cdef cppclass AceGrenade:
         AceGrenade(vxl.AceMap *map, math3d_c.Vector3[double] position, math3d_c.Vector3[double] velocity) except +
@@ -22,10 +36,154 @@ cdef extern from "world_c.cpp" nogil:
         vxl.AceMap *map
         math3d_c.Vector3[double] p, v
 
+    cdef cppclass AceRocket:
+        AceRocket(vxl.AceMap *map, double px, double py, double pz, double ox, double oy, double oz) except +
+        bool update(double dt, double time)
+        void set_orientation(double x, double y, double z)
+        math3d_c.Vector3[double] get_orientation()
+
+        vxl.AceMap *map
+        math3d_c.Vector3[double] p
+        double pitch, yaw
+
+    cdef cppclass AceEntity:
+        AceEntity(vxl.AceMap *map, double px, double py, double pz, float radius) except +
+        bool update()
+
+        vxl.AceMap *map
+        math3d_c.Vector3[double] p
+        int team, carrier
+        float radius
+
+    const int TRIGGER_TEAMS
+
+    enum TriggerShape:
+        TRIGGER_SPHERE, TRIGGER_BOX, TRIGGER_CYLINDER
+
+    cdef cppclass AceTrigger:
+        AceTrigger(int shape, double px, double py, double pz, double sx, double sy, double sz) except +
+        bool contains(const math3d_c.Vector3[double] &point)
+
+        int shape
+        math3d_c.Vector3[double] p, size
+        vector[size_t] occupants
+        int counts[2]  # TRIGGER_TEAMS
+
+    enum WorldEventType:
+        WORLD_EVENT_LANDED, WORLD_EVENT_FALL_DAMAGE, WORLD_EVENT_ENTERED_WATER, WORLD_EVENT_BOUNCED, WORLD_EVENT_HIT,
+        WORLD_EVENT_MOVED, WORLD_EVENT_CONTACT, WORLD_EVENT_CORRECTED, WORLD_EVENT_ENTERED, WORLD_EVENT_LEFT
+
+    enum WorldObjectKind:
+        WORLD_PLAYER, WORLD_GRENADE, WORLD_ROCKET, WORLD_ENTITY, WORLD_TRIGGER
+
+    struct WorldEvent:
+        int type, kind
+        size_t index
+        long value
+
+    const int WORLD_ANY_TEAM
+
+    enum HitboxPart:
+        HITBOX_NONE, HITBOX_TORSO, HITBOX_HEAD, HITBOX_LEGS
+
+    struct HitscanShot:
+        math3d_c.Vector3[double] origin, direction
+        long shooter, target
+        double spread, time
+
+    struct PlayerState:
+        double time
+        math3d_c.Vector3[double] p, e, f
+        bool crouch, alive
+
+    struct HitscanResult:
+        long player
+        int part
+        double distance
+
+    cdef cppclass AceWorld:
+        AceWorld(vxl.AceMap *map) except +
+        size_t update(double dt, double time)
+        size_t query_radius(const math3d_c.Vector3[double] &pos, double radius, int kind, vector[size_t] &out)
+        size_t query_box(const math3d_c.Vector3[double] &start, const math3d_c.Vector3[double] &end, int kind,
+                         vector[size_t] &out)
+        long nearest(const math3d_c.Vector3[double] &pos, int kind, int team, double max_distance)
+        void hitscan(const HitscanShot *shots, size_t count, double max_distance, double tolerance,
+                     HitscanResult *results)
+        bool rewind(size_t player, double time, PlayerState *out)
+        void rewind_all(double time, PlayerState *out)
+        void clear_history(size_t player)
+        void forget_player(size_t player)
+
+        vxl.AceMap *map
+        vector[AcePlayer *] players
+        vector[AceGrenade *] grenades
+        vector[AceRocket *] rockets
+        vector[AceEntity *] entities
+        vector[AceTrigger *] triggers
+        vector[WorldEvent] events
+        bool dirty
+
+    const size_t WORLD_UPDATE_MAX_SIZE
+
+    cdef cppclass WorldUpdateEncoder:
+        void record(const AceWorld &world)
+        size_t assemble(uint32_t mask, char *out)
+
+        uint32_t recorded
+
+    cdef cppclass AceVisibility:
+        AceVisibility(vxl.AceMap *map, size_t budget) except +
+        bool submit(const AceWorld &world, double time)
+        bool visible(const AceWorld &world, size_t viewer, size_t target, double time)
+        uint32_t interest(const AceWorld &world, size_t viewer, double time, size_t tick, double near,
+                          size_t far_interval)
+
+        size_t budget
+
+    struct GrenadeBounce:
+        double time
+        math3d_c.Vector3[double] p, v
+
+    struct GrenadePath:
+        vector[GrenadeBounce] bounces
+        math3d_c.Vector3[double] end
+
+    cdef cppclass GrenadePathCache:
+        GrenadePathCache(vxl.AceMap *map, size_t capacity) except +
+        const GrenadePath &get(const math3d_c.Vector3[double] &p, const math3d_c.Vector3[double] &v, double fuse,
+                               double dt)
+        const vector[GrenadePath] &get_many(const math3d_c.Vector3[double] *p, const math3d_c.Vector3[double] *v,
+                                            size_t count, double fuse, double dt)
+
+        size_t capacity, hits, misses
+
+    struct NavPoint:
+        int x, y, z
+
+    cdef cppclass AceNavigation:
+        AceNavigation(vxl.AceMap *map, size_t capacity) except +
+        void sync()
+        bool cell_below(const math3d_c.Vector3[double] &p, NavPoint *out)
+        bool find_path(const math3d_c.Vector3[double] &start, const math3d_c.Vector3[double] &goal, size_t max_nodes,
+                       double weight, vector[NavPoint] *out)
+        void find_paths(const math3d_c.Vector3[double] *starts, const math3d_c.Vector3[double] *goals, size_t count,
+                        size_t max_nodes, double weight, vector[NavPoint] *out, uint8_t *found)
+        void distances(const math3d_c.Vector3[double] *sources, size_t source_count,
+                       const math3d_c.Vector3[double] *targets, size_t count, double max_cost, bool nearest,
+                       double *out)
+        size_t reachable(const math3d_c.Vector3[double] &p, size_t limit)
+
+        size_t capacity, hits, misses
+
     bool c_cast_ray "cast_ray" (vxl.AceMap *map,
                                 const math3d_c.Vector3[double] &position, const math3d_c.Vector3[double] &direction,
                                 long *x, long *y, long *z, float length, bool isdirection)
 
+    void c_cast_rays "cast_rays" (vxl.AceMap *map, const math3d_c.Vector3[double] *origins,
+                                  const math3d_c.Vector3[double] *targets, size_t count, float length, bool isdirection,
+                                  uint8_t *hits, long *voxels)
+
     bool clipbox(vxl.AceMap *map, float x, float y, float z)
 
 
@@ -37,18 +195,92 @@ cdef class WorldObject:
     cdef long update(self, double dt, double time)
 
 
+cdef class World:
+    cdef AceWorld *world
+    cdef public:
+        vxl.VXLMap map
+    cdef:
+        # owners (or the objects themselves) of each native slot, so events can be handed back as Python objects
+        list players, grenades, rockets, entities, triggers
+        vector[size_t] query_result
+
+    cdef list owners(self, int kind)
+    cdef long player_slot(self, player) except -2
+    cdef tuple player_state(self, PlayerState &state)
+
+
+cdef class Visibility:
+    cdef AceVisibility *visibility
+    cdef World world
+    cdef double time
+
+
+cdef class WorldUpdates:
+    cdef WorldUpdateEncoder encoder
+    cdef World world
+    cdef object make_packet
+    # packets made since the last update() by the mask of records they hold, recipients that get the same
+    # records share one
+    cdef dict packets
+    cdef char *buffer
+
+
+cdef class GrenadePaths:
+    cdef GrenadePathCache *cache
+    cdef public:
+        vxl.VXLMap map
+
+    cdef tuple make_path(self, const GrenadePath &path)
+
+
+cdef class Navigation:
+    cdef AceNavigation *nav
+    cdef public:
+        vxl.VXLMap map
+
+
 cdef class Player:
     cdef AcePlayer *ply
+    cdef World world
+    cdef size_t world_index
     cdef public:
         math3d.Vector3 position, velocity, orientation, eye
 
+    cdef void apply_crouch(self, bint value)
+
 
 cdef class Grenade:
     cdef AceGrenade *grenade
+    cdef World world
+    cdef size_t world_index
     cdef public:
         math3d.Vector3 position, velocity
 
 
+cdef class Rocket:
+    cdef AceRocket *rocket
+    cdef World world
+    cdef size_t world_index
+    cdef public:
+        math3d.Vector3 position
+
+
+cdef class Entity:
+    cdef AceEntity *entity
+    cdef World world
+    cdef size_t world_index
+    cdef public:
+        math3d.Vector3 position
+
+
+cdef class Trigger:
+    cdef AceTrigger *trigger
+    cdef World world
+    cdef size_t world_index
+    cdef public:
+        math3d.Vector3 position
+
+
 cdef class GenericMovement:
     cdef public:
         vxl.VXLMap map
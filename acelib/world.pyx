@@ -1,5 +1,52 @@
+from enum import IntEnum
+
+from cpython.buffer cimport PyObject_CheckBuffer
+from libc.math cimport isfinite
+from libc.stdlib cimport malloc, free
+
+from acelib.bytes cimport ByteReader
+from acelib.packets_codec cimport PositionOrientationDataFields0, InputDataFields0, WeaponInputFields0
+
+from acelib.constants import HIT
+
 cdef extern from "math.h":
     double floor(double x)
+    const double INFINITY
+    const double NAN
+
+
+class WORLD_EVENT(IntEnum):
+    LANDED = WORLD_EVENT_LANDED
+    FALL_DAMAGE = WORLD_EVENT_FALL_DAMAGE
+    ENTERED_WATER = WORLD_EVENT_ENTERED_WATER
+    BOUNCED = WORLD_EVENT_BOUNCED
+    HIT = WORLD_EVENT_HIT
+    MOVED = WORLD_EVENT_MOVED
+    CONTACT = WORLD_EVENT_CONTACT
+    CORRECTED = WORLD_EVENT_CORRECTED
+    ENTERED = WORLD_EVENT_ENTERED
+    LEFT = WORLD_EVENT_LEFT
+
+
+class MOVEMENT(IntEnum):
+    ACCEPTED = MOVEMENT_ACCEPTED
+    TOO_FAR = MOVEMENT_TOO_FAR
+    DIVERGED = MOVEMENT_DIVERGED
+
+
+class WORLD_OBJECT(IntEnum):
+    PLAYER = WORLD_PLAYER
+    GRENADE = WORLD_GRENADE
+    ROCKET = WORLD_ROCKET
+    ENTITY = WORLD_ENTITY
+    TRIGGER = WORLD_TRIGGER
+
+
+class TRIGGER(IntEnum):
+    SPHERE = TRIGGER_SPHERE
+    BOX = TRIGGER_BOX
+    CYLINDER = TRIGGER_CYLINDER
+
 
 def cast_ray(vxl.VXLMap map, math3d.Vector3 pos, math3d.Vector3 dir, double length=32, bint isdirection=True):
     cdef long x, y, z
@@ -9,6 +56,63 @@ def cast_ray(vxl.VXLMap map, math3d.Vector3 pos, math3d.Vector3 dir, double leng
         return False
 
 
+cdef size_t read_points(points, vector[math3d_c.Vector3[double]] &out) except? 0:
+    cdef const double[:, :] view
+    cdef size_t i
+    if PyObject_CheckBuffer(points):
+        view = points
+        if view.shape[1] != 3:
+            raise ValueError("expected an Nx3 array")
+        out.resize(view.shape[0])
+        for i in range(view.shape[0]):
+            out[i].set(view[i, 0], view[i, 1], view[i, 2])
+        return out.size()
+
+    cdef double x, y, z
+    for point in points:
+        if isinstance(point, math3d.Vector3):
+            out.push_back((<math3d.Vector3>point).c_vec[0])
+        else:
+            x, y, z = point
+            out.push_back(math3d_c.Vector3[double](x, y, z))
+    return out.size()
+
+
+def cast_rays(vxl.VXLMap map, origins, targets, double length=32, bint isdirection=False):
+    """
+    cast_ray for a batch of rays at once. The GIL is released and big batches are split across a few threads.
+
+    Args:
+        origins: Vector3s, (x, y, z) tuples or an Nx3 float64 buffer.
+        targets: Same as origins, the ray end points (or directions with isdirection)
+
+    Returns:
+        list: For each ray, the (x, y, z) of the voxel hit or False, like cast_ray.
+    """
+    cdef vector[math3d_c.Vector3[double]] c_origins, c_targets
+    read_points(origins, c_origins)
+    read_points(targets, c_targets)
+    if c_origins.size() != c_targets.size():
+        raise ValueError("origins and targets must be the same length")
+
+    cdef size_t count = c_origins.size()
+    cdef vector[uint8_t] hits = vector[uint8_t](count)
+    cdef vector[long] voxels = vector[long](count * 3)
+    if count:
+        with nogil:
+            c_cast_rays(map.map_data, c_origins.data(), c_targets.data(), count, length, isdirection,
+                        hits.data(), voxels.data())
+
+    cdef size_t i
+    cdef list results = []
+    for i in range(count):
+        if hits[i]:
+            results.append((voxels[i * 3], voxels[i * 3 + 1], voxels[i * 3 + 2]))
+        else:
+            results.append(False)
+    return results
+
+
 cdef class WorldObject:
     def __init__(self, vxl.VXLMap map, *arg, **kwargs):
         self.map = map
@@ -17,6 +121,670 @@ cdef class WorldObject:
         return 0
 
 
+cdef inline size_t find_slot(list objects):
+    cdef size_t index
+    for index in range(len(objects)):
+        if objects[index] is None:
+            return index
+    objects.append(None)
+    return len(objects) - 1
+
+
+cdef class World:
+    """
+    Holds every simulated object and steps them all in a single native call, so per-object work in Python
+    only happens for the (rare) events the step produces.
+    """
+    def __cinit__(self, vxl.VXLMap map):
+        self.world = new AceWorld(map.map_data)
+        self.map = map
+        self.players = []
+        self.grenades = []
+        self.rockets = []
+        self.entities = []
+        self.triggers = []
+
+    def __init__(self, vxl.VXLMap map):
+        pass
+
+    def __dealloc__(self):
+        del self.world
+
+    def add(self, obj, owner=None):
+        """
+        Adds a Player, Grenade, Rocket, Entity or Trigger to the world. The world keeps it alive until it's removed.
+
+        Args:
+            obj (Player | Grenade | Rocket | Entity | Trigger)
+            owner: Reported in events for this object instead of the object itself.
+        """
+        cdef size_t index
+        cdef Player ply
+        cdef Grenade grenade
+        cdef Rocket rocket
+        cdef Entity entity
+        cdef Trigger trigger
+        if isinstance(obj, Player):
+            ply = <Player>obj
+            if ply.world is not None:
+                raise ValueError("object is already in a world")
+            index = find_slot(self.players)
+            self.world.players.resize(len(self.players))
+            self.world.players[index] = ply.ply
+            self.world.clear_history(index)
+            self.players[index] = (ply, obj if owner is None else owner)
+            ply.world = self
+            ply.world_index = index
+        elif isinstance(obj, Grenade):
+            grenade = <Grenade>obj
+            if grenade.world is not None:
+                raise ValueError("object is already in a world")
+            index = find_slot(self.grenades)
+            self.world.grenades.resize(len(self.grenades))
+            self.world.grenades[index] = grenade.grenade
+            self.grenades[index] = (grenade, obj if owner is None else owner)
+            grenade.world = self
+            grenade.world_index = index
+        elif isinstance(obj, Rocket):
+            rocket = <Rocket>obj
+            if rocket.world is not None:
+                raise ValueError("object is already in a world")
+            index = find_slot(self.rockets)
+            self.world.rockets.resize(len(self.rockets))
+            self.world.rockets[index] = rocket.rocket
+            self.rockets[index] = (rocket, obj if owner is None else owner)
+            rocket.world = self
+            rocket.world_index = index
+        elif isinstance(obj, Entity):
+            entity = <Entity>obj
+            if entity.world is not None:
+                raise ValueError("object is already in a world")
+            index = find_slot(self.entities)
+            self.world.entities.resize(len(self.entities))
+            self.world.entities[index] = entity.entity
+            self.entities[index] = (entity, obj if owner is None else owner)
+            entity.world = self
+            entity.world_index = index
+        elif isinstance(obj, Trigger):
+            trigger = <Trigger>obj
+            if trigger.world is not None:
+                raise ValueError("object is already in a world")
+            index = find_slot(self.triggers)
+            self.world.triggers.resize(len(self.triggers))
+            self.world.triggers[index] = trigger.trigger
+            self.triggers[index] = (trigger, obj if owner is None else owner)
+            trigger.world = self
+            trigger.world_index = index
+        else:
+            raise TypeError(f"can't add {type(obj).__name__} to a World")
+        self.world.dirty = True
+
+    def remove(self, obj):
+        cdef Player ply
+        cdef Grenade grenade
+        cdef Rocket rocket
+        cdef Entity entity
+        cdef Trigger trigger
+        if isinstance(obj, Player):
+            ply = <Player>obj
+            if ply.world is not self:
+                raise ValueError("object is not in this world")
+            # the slot is about to mean nothing, so triggers drop it now rather than report it leaving
+            self.world.forget_player(ply.world_index)
+            self.world.players[ply.world_index] = NULL
+            self.players[ply.world_index] = None
+            ply.world = None
+        elif isinstance(obj, Grenade):
+            grenade = <Grenade>obj
+            if grenade.world is not self:
+                raise ValueError("object is not in this world")
+            self.world.grenades[grenade.world_index] = NULL
+            self.grenades[grenade.world_index] = None
+            grenade.world = None
+        elif isinstance(obj, Rocket):
+            rocket = <Rocket>obj
+            if rocket.world is not self:
+                raise ValueError("object is not in this world")
+            self.world.rockets[rocket.world_index] = NULL
+            self.rockets[rocket.world_index] = None
+            rocket.world = None
+        elif isinstance(obj, Entity):
+            entity = <Entity>obj
+            if entity.world is not self:
+                raise ValueError("object is not in this world")
+            self.world.entities[entity.world_index] = NULL
+            self.entities[entity.world_index] = None
+            entity.world = None
+        elif isinstance(obj, Trigger):
+            trigger = <Trigger>obj
+            if trigger.world is not self:
+                raise ValueError("object is not in this world")
+            self.world.triggers[trigger.world_index] = NULL
+            self.triggers[trigger.world_index] = None
+            trigger.trigger.occupants.clear()
+            trigger.world = None
+        else:
+            raise TypeError(f"can't remove {type(obj).__name__} from a World")
+        self.world.dirty = True
+
+    def update(self, double dt, double time):
+        """
+        Steps every object in the world.
+
+        Returns:
+            list: A `(WORLD_EVENT, owner, value)` tuple for everything that happened during the step.
+                For CONTACT, ENTERED and LEFT the value is the owner of the player touching the entity or
+                going in or out of the trigger.
+        """
+        cdef size_t count
+        with nogil:
+            count = self.world.update(dt, time)
+
+        cdef list events = []
+        if not count:
+            return events
+
+        cdef WorldEvent event
+        cdef list kinds = [self.players, self.grenades, self.rockets, self.entities, self.triggers]
+        for event in self.world.events:
+            objects = kinds[event.kind]
+            if event.type == WORLD_EVENT_CONTACT or event.type == WORLD_EVENT_ENTERED or event.type == WORLD_EVENT_LEFT:
+                events.append((event.type, objects[event.index][1], self.players[event.value][1]))
+            else:
+                events.append((event.type, objects[event.index][1], event.value))
+        return events
+
+    cdef list owners(self, int kind):
+        cdef list objects = [self.players, self.grenades, self.rockets, self.entities][kind]
+        return [objects[index][1] for index in self.query_result]
+
+    def query_radius(self, math3d.Vector3 position, double radius, int kind=WORLD_PLAYER):
+        """
+        Finds everything of one kind within `radius` of a point. Only nearby grid cells are looked at.
+
+        Args:
+            position (Vector3)
+            radius (float)
+            kind (WORLD_OBJECT): Dead players are never returned.
+
+        Returns:
+            list: The owners of the objects found.
+        """
+        self.query_result.clear()
+        self.world.query_radius(position.c_vec[0], radius, kind, self.query_result)
+        return self.owners(kind)
+
+    def query_box(self, math3d.Vector3 start, math3d.Vector3 end, int kind=WORLD_PLAYER):
+        """
+        Same as query_radius, for everything inside the box spanned by the two corners.
+        """
+        self.query_result.clear()
+        self.world.query_box(start.c_vec[0], end.c_vec[0], kind, self.query_result)
+        return self.owners(kind)
+
+    def nearest(self, math3d.Vector3 position, int kind=WORLD_PLAYER, team=None, double max_distance=INFINITY):
+        """
+        Finds the closest object of one kind, optionally only players/entities of `team` (a team id, -1 for neutral).
+
+        Returns:
+            The owner of the closest object, or None if there's nothing within max_distance.
+        """
+        cdef list objects = [self.players, self.grenades, self.rockets, self.entities][kind]
+        cdef long index = self.world.nearest(position.c_vec[0], kind, WORLD_ANY_TEAM if team is None else team,
+                                             max_distance)
+        return None if index == -1 else objects[index][1]
+
+
+    cdef long player_slot(self, player) except -2:
+        if player is None:
+            return -1
+        if not isinstance(player, Player) or (<Player>player).world is not self:
+            raise ValueError(f"{player!r} is not a Player in this world")
+        return (<Player>player).world_index
+
+    def hitscan(self, origins, directions, shooters=None, double max_distance=128, double tolerance=0, spread=0,
+                times=None, targets=None):
+        """
+        Traces a batch of shots against the head, torso and leg boxes of every live player and the map.
+        The GIL is released while tracing and big batches are split across a few threads.
+
+        Args:
+            origins: Vector3s, (x, y, z) tuples or an Nx3 float64 buffer.
+            directions: Same as origins.
+            shooters: A Player in this world the shots can't hit, or a sequence with one (or None) per shot.
+            tolerance (float): Padding added to every hitbox, or only to the target's if a shot has one.
+            spread (float | sequence): Extra padding per block travelled, for shots that only roughly follow their
+                direction (pellets, orientation lagging behind the shot). One for all shots or one per shot.
+            times (float | sequence): Trace against where players were at this time (see rewind) instead of where
+                they are now. One for all shots or one per shot, None for now.
+            targets: A Player in this world the shots are said to have hit, or a sequence with one (or None) per shot.
+                Only a target's hitbox is padded, and another player only gets in the way if the shot goes through
+                their unpadded one. The shooter's teammates never do.
+
+        Returns:
+            list: For each shot, `(owner, HIT, distance)` for the first player hit, or None if it missed or hit the map
+                first.
+        """
+        cdef vector[math3d_c.Vector3[double]] c_origins, c_directions
+        read_points(origins, c_origins)
+        read_points(directions, c_directions)
+        cdef size_t count = c_origins.size()
+        if c_directions.size() != count:
+            raise ValueError("origins and directions must be the same length")
+
+        cdef vector[HitscanShot] shots = vector[HitscanShot](count)
+        cdef size_t i
+        for i in range(count):
+            shots[i].origin = c_origins[i]
+            shots[i].direction = c_directions[i]
+        if shooters is None or isinstance(shooters, Player):
+            for i in range(count):
+                shots[i].shooter = self.player_slot(shooters)
+        else:
+            shooters = list(shooters)
+            if len(shooters) != count:
+                raise ValueError("expected one shooter per shot")
+            for i in range(count):
+                shots[i].shooter = self.player_slot(shooters[i])
+        if targets is None or isinstance(targets, Player):
+            for i in range(count):
+                shots[i].target = self.player_slot(targets)
+        else:
+            targets = list(targets)
+            if len(targets) != count:
+                raise ValueError("expected one target per shot")
+            for i in range(count):
+                shots[i].target = self.player_slot(targets[i])
+        if isinstance(spread, (int, float)):
+            for i in range(count):
+                shots[i].spread = spread
+        else:
+            spread = list(spread)
+            if len(spread) != count:
+                raise ValueError("expected one spread per shot")
+            for i in range(count):
+                shots[i].spread = spread[i]
+        if times is None or isinstance(times, (int, float)):
+            for i in range(count):
+                shots[i].time = NAN if times is None else times
+        else:
+            times = list(times)
+            if len(times) != count:
+                raise ValueError("expected one time per shot")
+            for i in range(count):
+                shots[i].time = NAN if times[i] is None else times[i]
+
+        cdef vector[HitscanResult] hits = vector[HitscanResult](count)
+        if count:
+            with nogil:
+                self.world.hitscan(shots.data(), count, max_distance, tolerance, hits.data())
+
+        cdef list results = []
+        for i in range(count):
+            if hits[i].player == -1:
+                results.append(None)
+            else:
+                results.append((self.players[hits[i].player][1], HIT(hits[i].part), hits[i].distance))
+        return results
+
+    cdef tuple player_state(self, PlayerState &state):
+        return (math3d.Vector3(state.p.x, state.p.y, state.p.z), math3d.Vector3(state.e.x, state.e.y, state.e.z),
+                math3d.Vector3(state.f.x, state.f.y, state.f.z), state.crouch)
+
+    def rewind(self, Player player, double time):
+        """
+        Where a player was at `time`, for lag compensation. Every step records each player's state in a ring of the
+        last 64 ticks; times between ticks are interpolated, older/newer ones get the oldest/newest tick.
+
+        Returns:
+            tuple: `(position, eye, orientation, crouch)`, or None if nothing was recorded yet or the player was dead.
+        """
+        if player.world is not self:
+            raise ValueError("player is not in this world")
+        cdef PlayerState state
+        if not self.world.rewind(player.world_index, time, &state) or not state.alive:
+            return None
+        return self.player_state(state)
+
+    def rewind_all(self, double time):
+        """
+        rewind for every player at once.
+
+        Returns:
+            list: `(owner, position, eye, orientation, crouch)` for each player alive at `time`.
+        """
+        cdef vector[PlayerState] states = vector[PlayerState](self.world.players.size())
+        if not states.size():
+            return []
+        self.world.rewind_all(time, states.data())
+
+        cdef size_t i
+        cdef list results = []
+        for i in range(states.size()):
+            if states[i].alive:
+                results.append((self.players[i][1],) + self.player_state(states[i]))
+        return results
+
+cdef class Visibility:
+    """
+    Which players can see each other, so players can be left out of WorldUpdates sent to enemies that can't see them.
+    Traced on a thread of its own from the positions of the last update() it got to, at most `budget` segments per
+    pass. Anything it hasn't traced recently enough counts as visible, so under load everyone sees everyone again.
+    """
+    def __cinit__(self, World world, size_t budget=4096):
+        self.visibility = new AceVisibility(world.map.map_data, budget)
+        self.world = world
+        self.time = 0
+
+    def __init__(self, World world, size_t budget=4096):
+        pass
+
+    def __dealloc__(self):
+        del self.visibility
+
+    @property
+    def budget(self):
+        return self.visibility.budget
+
+    @budget.setter
+    def budget(self, size_t value):
+        self.visibility.budget = value
+
+    def update(self, double time):
+        """
+        Hands the worker this tick's positions and picks up whatever it finished. Never waits for it.
+        Call once per tick after stepping the world.
+
+        Returns:
+            bool: False if the worker was still busy and this tick was skipped.
+        """
+        self.time = time
+        return self.visibility.submit(self.world.world[0], time)
+
+    def can_see(self, Player viewer, Player target):
+        if viewer.world is not self.world or target.world is not self.world:
+            raise ValueError("player is not in this world")
+        return self.visibility.visible(self.world.world[0], viewer.world_index, target.world_index, self.time)
+
+    def interest(self, Player viewer, size_t tick, double near=64, size_t far_interval=3):
+        """
+        Which players `viewer` should get in this tick's WorldUpdate: the live ones it can see, and of those further
+        than `near` blocks only one tick in `far_interval`.
+
+        Returns:
+            int: A bitmask of player ids (see Player.id), for WorldUpdates.packet.
+        """
+        if viewer.world is not self.world:
+            raise ValueError("player is not in this world")
+        return self.visibility.interest(self.world.world[0], viewer.world_index, self.time, tick, near, far_interval)
+
+    def visible_to(self, Player viewer):
+        """
+        Returns:
+            list: The owners of every live player `viewer` can see, itself included.
+        """
+        if viewer.world is not self.world:
+            raise ValueError("player is not in this world")
+        cdef size_t i
+        cdef list results = []
+        for i in range(self.world.world.players.size()):
+            if self.world.world.players[i] == NULL or not self.world.world.players[i].alive:
+                continue
+            if self.visibility.visible(self.world.world[0], viewer.world_index, i, self.time):
+                results.append(self.world.players[i][1])
+        return results
+
+cdef class WorldUpdates:
+    """
+    Encodes WorldUpdate packets straight from the players of a World, without going through Python objects for each
+    player. update() packs every living player's record once, packet() then hands out a WorldUpdate holding some of
+    them, made at most once per set of records between two updates.
+
+    Args:
+        world (World)
+        make_packet: Called with the encoded bytes to make what gets sent, e.g. an enet.Packet
+    """
+    def __cinit__(self, World world, make_packet=bytes):
+        self.world = world
+        self.make_packet = make_packet
+        self.packets = {}
+        self.buffer = <char *>malloc(WORLD_UPDATE_MAX_SIZE)
+        if self.buffer == NULL:
+            raise MemoryError
+
+    def __init__(self, World world, make_packet=bytes):
+        pass
+
+    def __dealloc__(self):
+        free(self.buffer)
+
+    def update(self):
+        """
+        Packs the current position and orientation of every living player with an id under 32.
+        Packets from before this are not handed out again.
+        """
+        self.encoder.record(self.world.world[0])
+        self.packets.clear()
+
+    def packet(self, uint32_t mask=0xFFFFFFFF):
+        """
+        Args:
+            mask (int): Bit n set to include player id n
+
+        Returns:
+            The WorldUpdate with those players' records (that are alive), as made by `make_packet`.
+        """
+        cdef size_t size
+        mask &= self.encoder.recorded
+        packet = self.packets.get(mask)
+        if packet is None:
+            size = self.encoder.assemble(mask, self.buffer)
+            packet = self.packets[mask] = self.make_packet(self.buffer[:size])
+        return packet
+
+
+cdef class GrenadePaths:
+    """
+    Where thrown grenades will bounce and blow up, cached by throw. A path is thrown away as soon as a block changes
+    in any 16x16 column region it went through, so repeated or predictable throws (bots, the grenade command, ...)
+    cost a lookup instead of a full trace.
+    """
+    def __cinit__(self, vxl.VXLMap map, size_t capacity=256):
+        self.cache = new GrenadePathCache(map.map_data, capacity)
+        self.map = map
+
+    def __init__(self, vxl.VXLMap map, size_t capacity=256):
+        pass
+
+    def __dealloc__(self):
+        del self.cache
+
+    @property
+    def hits(self):
+        return self.cache.hits
+
+    @property
+    def misses(self):
+        return self.cache.misses
+
+    cdef tuple make_path(self, const GrenadePath &path):
+        cdef size_t i
+        cdef list bounces = []
+        for i in range(path.bounces.size()):
+            bounces.append((path.bounces[i].time,
+                            (path.bounces[i].p.x, path.bounces[i].p.y, path.bounces[i].p.z)))
+        return bounces, (path.end.x, path.end.y, path.end.z)
+
+    def predict(self, origin, velocity, double fuse=3.0, double dt=1 / 60.0):
+        """
+        Steps a throw the way World.update would until the fuse runs out.
+
+        Args:
+            origin: Vector3 or (x, y, z) where the grenade starts
+            velocity: Vector3 or (x, y, z) it starts with
+            fuse (float): Seconds until it explodes
+            dt (float): Step size, use the server's tick length to match what the world will do
+
+        Returns:
+            tuple: ([(time, (x, y, z)), ...] for every bounce, (x, y, z) where it explodes)
+        """
+        cdef vector[math3d_c.Vector3[double]] p, v
+        read_points((origin,), p)
+        read_points((velocity,), v)
+        return self.make_path(self.cache.get(p[0], v[0], fuse, dt))
+
+    def predict_many(self, origins, velocities, double fuse=3.0, double dt=1 / 60.0):
+        """
+        predict for a batch of throws, tracing the ones that aren't cached without the GIL and across a few threads.
+
+        Args:
+            origins: Vector3s, (x, y, z) tuples or an Nx3 float64 buffer.
+            velocities: Same as origins
+
+        Returns:
+            list: A (bounces, end) tuple per throw, like predict.
+        """
+        cdef vector[math3d_c.Vector3[double]] p, v
+        read_points(origins, p)
+        read_points(velocities, v)
+        if p.size() != v.size():
+            raise ValueError("origins and velocities must be the same length")
+
+        cdef size_t i, count = p.size()
+        cdef const vector[GrenadePath] *paths
+        with nogil:
+            paths = &self.cache.get_many(p.data(), v.data(), count, fuse, dt)
+        return [self.make_path(paths[0][i]) for i in range(count)]
+
+
+cdef inline list nav_points(vector[NavPoint] &points):
+    cdef size_t i
+    return [(points[i].x, points[i].y, points[i].z) for i in range(points.size())]
+
+
+cdef class Navigation:
+    """
+    Where players can walk on a map: cells on top of solid blocks with room to stand (or crouch) above them, linked to
+    the columns around them by walking, stepping up a block, jumping up two or dropping down a few, the way
+    Player.update moves. Map edits are picked up by the next query, and paths are cached until a block changes in any
+    16x16 column region they go through.
+
+    Positions can be anywhere; they're snapped to the first cell at or below them in their column. Cells come back as
+    (x, y, z) with z the block stood on.
+    """
+    def __cinit__(self, vxl.VXLMap map, size_t capacity=1024):
+        self.nav = new AceNavigation(map.map_data, capacity)
+        self.map = map
+
+    def __init__(self, vxl.VXLMap map, size_t capacity=1024):
+        pass
+
+    def __dealloc__(self):
+        del self.nav
+
+    @property
+    def hits(self):
+        return self.nav.hits
+
+    @property
+    def misses(self):
+        return self.nav.misses
+
+    def cell(self, position):
+        """
+        Returns:
+            tuple: The (x, y, z) cell under position, None if there's nothing to stand on there.
+        """
+        cdef vector[math3d_c.Vector3[double]] p
+        cdef NavPoint cell
+        read_points((position,), p)
+        if self.nav.cell_below(p[0], &cell):
+            return cell.x, cell.y, cell.z
+        return None
+
+    def find_path(self, start, goal, size_t max_nodes=50000, double weight=1.0):
+        """
+        Args:
+            start: Vector3 or (x, y, z)
+            goal: Vector3 or (x, y, z)
+            max_nodes (int): Cells to search before giving up
+            weight (float): Above 1, settle for a path up to that many times longer than the shortest one in exchange
+                for searching a lot fewer cells. A cached path is returned whatever weight it was found with.
+
+        Returns:
+            list: The cells from start to goal, both included, or None if there's no way there.
+        """
+        return self.find_paths((start,), (goal,), max_nodes, weight)[0]
+
+    def find_paths(self, starts, goals, size_t max_nodes=50000, double weight=1.0):
+        """
+        find_path for a batch of start and goal pairs. Uncached ones are searched without the GIL, across a few threads.
+
+        Args:
+            starts: Vector3s, (x, y, z) tuples or an Nx3 float64 buffer.
+            goals: Same as starts
+
+        Returns:
+            list: A list of cells or None per pair, like find_path.
+        """
+        cdef vector[math3d_c.Vector3[double]] c_starts, c_goals
+        read_points(starts, c_starts)
+        read_points(goals, c_goals)
+        if c_starts.size() != c_goals.size():
+            raise ValueError("starts and goals must be the same length")
+
+        cdef size_t i, count = c_starts.size()
+        cdef vector[vector[NavPoint]] paths = vector[vector[NavPoint]](count)
+        cdef vector[uint8_t] found = vector[uint8_t](count)
+        with nogil:
+            self.nav.find_paths(c_starts.data(), c_goals.data(), count, max_nodes, weight, paths.data(), found.data())
+        return [nav_points(paths[i]) if found[i] else None for i in range(count)]
+
+    def distances(self, sources, targets, double max_cost=INFINITY, bint nearest=False):
+        """
+        How far each target is from the closest source, walking. One search covers every target.
+
+        Args:
+            sources: Vector3s, (x, y, z) tuples or an Nx3 float64 buffer.
+            targets: Same as sources
+            max_cost (float): Stop looking this far out, roughly in blocks walked
+            nearest (bool): Stop at the first target reached, the others (unless just as close) come back as inf.
+                Much cheaper when only the closest one matters.
+
+        Returns:
+            list: A cost per target, inf if it can't be reached (within max_cost).
+        """
+        cdef vector[math3d_c.Vector3[double]] c_sources, c_targets
+        read_points(sources, c_sources)
+        read_points(targets, c_targets)
+
+        cdef size_t count = c_targets.size()
+        cdef vector[double] costs = vector[double](count)
+        with nogil:
+            self.nav.distances(c_sources.data(), c_sources.size(), c_targets.data(), count, max_cost, nearest,
+                               costs.data())
+        return list(costs)
+
+    def reachable(self, position, size_t limit=64):
+        """
+        Returns:
+            int: How many cells can be walked to from position, counting up to limit. 0 if it's inside a wall.
+        """
+        cdef vector[math3d_c.Vector3[double]] p
+        cdef size_t count
+        read_points((position,), p)
+        with nogil:
+            count = self.nav.reachable(p[0], limit)
+        return count
+
+    def is_stuck(self, position, size_t min_area=16):
+        """
+        Whether a player at position (its eye) is boxed in: inside a wall, or with fewer than min_area cells it can
+        walk to.
+        """
+        return self.reachable(position, min_area) < min_area
+
+
 cdef class Player:
     def __cinit__(self, vxl.VXLMap map):
         self.ply = new AcePlayer(map.map_data)
@@ -32,6 +800,9 @@ cdef class Player:
         del self.ply
 
     def set_crouch(self, bint value):
+        self.apply_crouch(value)
+
+    cdef void apply_crouch(self, bint value):
         if value == self.ply.crouch:
             return
         if value:
@@ -44,7 +815,7 @@ cdef class Player:
         if self.ply.airborne:
             jump = False
         self.ply.jump = jump
-        self.set_crouch(crouch)
+        self.apply_crouch(crouch)
         self.ply.sneak = sneak
         self.ply.sprint = sprint
 
@@ -64,6 +835,11 @@ cdef class Player:
     def set_position(self, double x, double y, double z, bint reset=False):
         self.ply.p.set(x, y, z)
         self.ply.e.set(x, y, z)
+        # the server moved the player, whatever the client said before that is moot
+        self.ply.movement.origin.set(x, y, z)
+        self.ply.movement.pending = False
+        if self.world is not None:
+            self.world.world.dirty = True
         if reset:
             self.ply.v.set(0, 0, 0)
             self.set_walk(False, False, False, False)
@@ -73,6 +849,24 @@ cdef class Player:
 
     def set_dead(self, bint dead):
         self.ply.alive = not dead
+        if self.world is not None:
+            self.world.world.dirty = True
+
+    @property
+    def team(self):
+        return self.ply.team
+
+    @team.setter
+    def team(self, int value):
+        self.ply.team = value
+
+    @property
+    def id(self):
+        return self.ply.id
+
+    @id.setter
+    def id(self, int value):
+        self.ply.id = value
 
     @property
     def mf(self):
@@ -143,11 +937,91 @@ cdef class Player:
         return not self.ply.alive
     @dead.setter
     def dead(self, bint val):
-        self.ply.alive = not val
+        self.set_dead(val)
 
     def set_orientation(self, double x, double y, double z):
         self.ply.set_orientation(x, y, z)
 
+    def report_position(self, double x, double y, double z):
+        """
+        Hands over a position the client says it's at. It's checked against the server's own simulation of the player
+        on the next World.update, which only takes it if it agrees and sends a CORRECTED event otherwise.
+        Only the latest report before a step counts.
+        """
+        self.ply.movement.report.set(x, y, z)
+        self.ply.movement.pending = True
+
+    # The packets a client keeps sending about itself, read straight into the player rather than through a loader.
+    # `reader` has to be past the packet id, the layouts are PositionOrientationData etc. in packets_schema.
+
+    def receive_client_update(self, ByteReader reader):
+        """
+        Reads a PositionOrientationData: the position is reported like report_position does, and the orientation set.
+        Nothing is applied if any of it isn't finite.
+
+        Returns:
+            bool: False if the packet had a NaN or infinity in it.
+        """
+        cdef PositionOrientationDataFields0 fields
+        reader.read_into(&fields, sizeof(fields))
+        if not (isfinite(fields.data_p_x) and isfinite(fields.data_p_y) and isfinite(fields.data_p_z) and
+                isfinite(fields.data_o_x) and isfinite(fields.data_o_y) and isfinite(fields.data_o_z)):
+            return False
+        self.ply.movement.report.set(fields.data_p_x, fields.data_p_y, fields.data_p_z)
+        self.ply.movement.pending = True
+        self.ply.set_orientation(fields.data_o_x, fields.data_o_y, fields.data_o_z)
+        return True
+
+    def receive_input_data(self, ByteReader reader):
+        """
+        Reads an InputData and sets the player's walk and animation from it, like set_walk and set_animation.
+
+        Returns:
+            int: The flags as sent, bits 0 to 7 are up, down, left, right, jump, crouch, sneak and sprint.
+        """
+        cdef InputDataFields0 fields
+        reader.read_into(&fields, sizeof(fields))
+        cdef uint8_t flags = fields.up_flags
+        self.ply.mf = flags & (1 << 0)
+        self.ply.mb = flags & (1 << 1)
+        self.ply.ml = flags & (1 << 2)
+        self.ply.mr = flags & (1 << 3)
+        self.ply.jump = flags & (1 << 4) and not self.ply.airborne
+        self.apply_crouch(flags & (1 << 5))
+        self.ply.sneak = flags & (1 << 6)
+        self.ply.sprint = flags & (1 << 7)
+        return flags
+
+    def receive_weapon_input(self, ByteReader reader):
+        """
+        Reads a WeaponInput. Whether the player actually fires is up to its tool, so this doesn't touch it, see
+        set_fire.
+
+        Returns:
+            int: The flags as sent, bit 0 is primary and bit 1 secondary.
+        """
+        cdef WeaponInputFields0 fields
+        reader.read_into(&fields, sizeof(fields))
+        return fields.primary_flags
+
+    @property
+    def movement_stats(self):
+        """
+        Returns:
+            dict: How this player's reported positions compared to the simulation: reports and corrections made,
+                mean and max distance between the two, and how far ahead of the simulation the client is (currently
+                and at most) in blocks.
+        """
+        cdef MovementCheck *m = &self.ply.movement
+        return {
+            "reports": m.reports,
+            "corrections": m.corrections,
+            "mean_error": m.error_sum / m.reports if m.reports else 0.0,
+            "max_error": m.max_error,
+            "divergence": m.divergence,
+            "max_divergence": m.max_divergence,
+        }
+
     def update(self, double dt, double time):
         return self.ply.update(dt, time)
 
@@ -178,6 +1052,149 @@ cdef class Grenade:
             return False, pos
 
 
+cdef class Rocket:
+    def __cinit__(self, vxl.VXLMap map, double px, double py, double pz, double ox, double oy, double oz):
+        self.rocket = new AceRocket(map.map_data, px, py, pz, ox, oy, oz)
+        self.position = math3d.new_proxy_vector(&self.rocket.p)
+
+    def __init__(self, vxl.VXLMap map, double px, double py, double pz, double ox, double oy, double oz):
+        pass
+
+    def __dealloc__(self):
+        del self.rocket
+
+    def update(self, double dt, double time):
+        return self.rocket.update(dt, time)
+
+    def set_orientation(self, double x, double y, double z):
+        self.rocket.set_orientation(x, y, z)
+
+    def get_orientation(self):
+        cdef math3d_c.Vector3[double] orientation = self.rocket.get_orientation()
+        return orientation.x, orientation.y, orientation.z
+
+    @property
+    def pitch(self):
+        return self.rocket.pitch
+
+    @property
+    def yaw(self):
+        return self.rocket.yaw
+
+
+cdef class Entity:
+    def __cinit__(self, vxl.VXLMap map, double px, double py, double pz, float radius=0):
+        self.entity = new AceEntity(map.map_data, px, py, pz, radius)
+        self.position = math3d.new_proxy_vector(&self.entity.p)
+
+    def __init__(self, vxl.VXLMap map, double px, double py, double pz, float radius=0):
+        pass
+
+    def __dealloc__(self):
+        del self.entity
+
+    def update(self):
+        return self.entity.update()
+
+    def set_position(self, double x, double y, double z):
+        self.entity.p.set(x, y, z)
+        if self.world is not None:
+            self.world.world.dirty = True
+
+    @property
+    def team(self):
+        return self.entity.team
+
+    @team.setter
+    def team(self, int value):
+        self.entity.team = value
+
+    @property
+    def carrier(self):
+        return self.entity.carrier
+
+    @carrier.setter
+    def carrier(self, int value):
+        self.entity.carrier = value
+
+    @property
+    def radius(self):
+        return self.entity.radius
+
+    @radius.setter
+    def radius(self, float value):
+        self.entity.radius = value
+
+
+cdef class Trigger:
+    """
+    A zone players are tracked going in and out of. Once added to a World, every step checks it against the players
+    near it and only reports ENTERED/LEFT events, dead players count as having left.
+
+    Args:
+        shape (TRIGGER)
+        px, py, pz: The middle of the volume
+        sx, sy, sz: The radius for spheres (sx) and cylinders (sx, sz is half the height), otherwise half the
+            size of the box on each axis
+    """
+    def __cinit__(self, int shape, double px, double py, double pz, double sx, double sy=0, double sz=0):
+        if shape not in (TRIGGER_SPHERE, TRIGGER_BOX, TRIGGER_CYLINDER):
+            raise ValueError(f"unknown trigger shape {shape}")
+        self.trigger = new AceTrigger(shape, px, py, pz, sx, sy, sz)
+        self.position = math3d.new_proxy_vector(&self.trigger.p)
+
+    def __init__(self, int shape, double px, double py, double pz, double sx, double sy=0, double sz=0):
+        pass
+
+    def __dealloc__(self):
+        del self.trigger
+
+    @staticmethod
+    def sphere(double x, double y, double z, double radius):
+        return Trigger(TRIGGER_SPHERE, x, y, z, radius)
+
+    @staticmethod
+    def box(double x1, double y1, double z1, double x2, double y2, double z2):
+        return Trigger(TRIGGER_BOX, (x1 + x2) / 2, (y1 + y2) / 2, (z1 + z2) / 2,
+                       abs(x2 - x1) / 2, abs(y2 - y1) / 2, abs(z2 - z1) / 2)
+
+    @staticmethod
+    def cylinder(double x, double y, double z, double radius, double height):
+        """
+        Upright cylinder `height` blocks tall with (x, y, z) in the middle.
+        """
+        return Trigger(TRIGGER_CYLINDER, x, y, z, radius, 0, height / 2)
+
+    def set_position(self, double x, double y, double z):
+        self.trigger.p.set(x, y, z)
+
+    def contains(self, math3d.Vector3 point):
+        return self.trigger.contains(point.c_vec[0])
+
+    def count(self, int team):
+        """
+        Returns:
+            int: Occupants of `team` as of the last step, 0 for teams other than the two playing ones.
+        """
+        if not 0 <= team < TRIGGER_TEAMS:
+            return 0
+        return self.trigger.counts[team]
+
+    @property
+    def occupants(self):
+        """
+        Returns:
+            list: The owners of the players inside as of the last step.
+        """
+        if self.world is None:
+            return []
+        cdef list players = self.world.players
+        return [players[index][1] for index in self.trigger.occupants]
+
+    def __len__(self):
+        return self.trigger.occupants.size()
+
+
 # A generic object with collision detection
 cdef class GenericMovement:
     def __init__(self, vxl.VXLMap map, double x, double y, double z):
@@ -1,11 +1,54 @@
+#include <algorithm>
+#include <climits>
 #include <cmath>
+#include <cstdint>
+#include <cstring>
+#include <queue>
+#include <unordered_map>
+#include <unordered_set>
+#include <vector>
 
 #include "vxl_c.h"
 #include "math3d_c.h"
+#include "pool_c.h"
 
 constexpr float FALL_SLOW_DOWN = 0.24f;
 constexpr float FALL_DAMAGE_VELOCITY = 0.58f;
 constexpr int FALL_DAMAGE_SCALAR = 4096;
+constexpr double ROCKET_SPEED = 45.0;
+constexpr double ROCKET_FALLOFF = 25.0 * (detail::PI / 180.0); // radians per second
+// side of a spatial index cell; the index only buckets on x/y since the map is flat compared to its size
+constexpr int GRID_CELL = 16;
+constexpr int GRID_X = MAP_X / GRID_CELL;
+constexpr int GRID_Y = MAP_Y / GRID_CELL;
+constexpr int WORLD_ANY_TEAM = -2;
+// hitboxes only exist around players, anything further from a player's middle than this can't touch them
+constexpr double HITBOX_REACH = 1.6;
+// ticks of position history kept per player for lag compensation, a second at 60 Hz
+constexpr size_t HISTORY_SIZE = 64;
+// player slots the line of sight matrix covers, later ones are always visible
+constexpr size_t VISIBILITY_SLOTS = 32;
+// fog is at 128, players further apart than this (on x/y) can't see each other
+constexpr double VISIBILITY_RANGE = 136.0;
+// free voxels a player needs above what it stands on to crouch, stand, and jump up two blocks
+constexpr int NAV_CROUCH_ROOM = 2, NAV_STAND_ROOM = 3, NAV_JUMP_ROOM = 4;
+// the furthest a player can drop without fall damage
+constexpr int NAV_MAX_DROP = 5;
+// path costs, relative to walking a block
+constexpr double NAV_CROUCH_COST = 1.5, NAV_CLIMB_COST = 1.5, NAV_JUMP_COST = 3.0, NAV_DROP_COST = 0.25,
+    NAV_WATER_COST = 2.0;
+// a reported position further than this from where the server has the player is never taken
+constexpr double MOVEMENT_MAX_ERROR = 3.0;
+// blocks a client may get ahead of the server's simulation over time before its reports stop being taken, and how
+// much of that is forgiven per second, since client and server never step over exactly the same time
+constexpr double MOVEMENT_MAX_DIVERGENCE = 4.0;
+constexpr double MOVEMENT_SLACK = 0.5;
+// players stay visible to each other this long after losing sight, so peeking doesn't flicker
+constexpr double VISIBILITY_HIDE_DELAY = 0.25;
+// line of sight older than this doesn't count and the pair is visible, e.g. when the worker falls behind
+constexpr double VISIBILITY_MAX_AGE = 0.5;
+// teams trigger volumes keep occupancy counts for, players of any other team are only counted as occupants
+constexpr int TRIGGER_TEAMS = 2;
 
 typedef Vector3<double> Vector;
 
@@ -13,6 +56,23 @@ struct Orientation {
     Vector f, s, h;
 };
 
+enum MovementResult {
+    MOVEMENT_ACCEPTED = 0,
+    MOVEMENT_TOO_FAR = 1, // one report was further than MOVEMENT_MAX_ERROR from the server's position
+    MOVEMENT_DIVERGED = 2, // reports kept covering more ground than the inputs could have
+};
+
+// How a client's reported positions compare to the server stepping the same player with the same inputs.
+// Every report is measured from `origin`, the last position both sides agreed on: the client's distance from there
+// against the server's. Timing noise evens out over a few reports, a sped up client keeps adding to `divergence`.
+struct MovementCheck {
+    Vector origin, report;
+    bool pending = false;
+    double last_time = -1;
+    double divergence = 0, max_divergence = 0, error_sum = 0, max_error = 0;
+    size_t reports = 0, corrections = 0;
+};
+
 struct AcePlayer {
     explicit AcePlayer(AceMap *map): f(1, 0, 0), s(0, 1, 0), h(0, 0, 1) {
         this->map = map;
@@ -21,15 +81,22 @@ struct AcePlayer {
         this->primary_fire = this->secondary_fire = this->weapon = false;
         this->airborne = this->wade = false;
         this->alive = true;
+        this->team = -1;
+        this->id = -1;
         this->lastclimb = 0.0;
     }
     long update(double dt, double time);
     void set_orientation(double x, double y, double z);
+    // takes the pending reported position if it agrees with the simulation, see MovementCheck
+    MovementResult reconcile(double time);
 
     AceMap *map;
     bool mf, mb, ml, mr, jump, crouch, sneak, sprint, primary_fire, secondary_fire, airborne, wade, alive, weapon;
+    int team; // only used by the world's spatial queries
+    int id; // network player id, only used to address WorldUpdate records (see AceVisibility::interest)
     double lastclimb;
     Vector p, e, v, f, s, h;
+    MovementCheck movement;
 
 private:
     void boxclipmove(double dt, double time);
@@ -48,6 +115,242 @@ struct AceGrenade {
     Vector p, v;
 };
 
+struct AceRocket {
+    AceRocket(AceMap *map, double px, double py, double pz, double ox, double oy, double oz) : map(map), p(px, py, pz) {
+        this->set_orientation(ox, oy, oz);
+    }
+    bool update(double dt, double time);
+    void set_orientation(double x, double y, double z);
+    Vector get_orientation() const;
+
+    AceMap *map;
+    Vector p;
+    double pitch, yaw;
+};
+
+struct GrenadeBounce {
+    double time;
+    Vector p, v; // right after the bounce
+};
+
+// Where a grenade goes until its fuse runs out, and the map regions (with their revisions) it passed through,
+// which is all that can change it.
+struct GrenadePath {
+    std::vector<GrenadeBounce> bounces;
+    Vector end;
+    std::vector<std::pair<uint32_t, uint32_t>> regions;
+};
+
+// Paths by (origin, velocity, fuse, dt), thrown away once a region they went through changes.
+// Not thread safe; get_many does the tracing itself on the thread pool.
+struct GrenadePathCache {
+    GrenadePathCache(AceMap *map, size_t capacity) : map(map), capacity(capacity), hits(0), misses(0) {}
+    const GrenadePath &get(const Vector &p, const Vector &v, double fuse, double dt);
+    // a path per throw, valid until the next get_many
+    const std::vector<GrenadePath> &get_many(const Vector *p, const Vector *v, size_t count, double fuse, double dt);
+
+    AceMap *map;
+    size_t capacity;
+    size_t hits, misses;
+
+private:
+    struct Key {
+        double values[8];
+        bool operator==(const Key &other) const {
+            return !std::memcmp(this->values, other.values, sizeof(this->values));
+        }
+    };
+    struct KeyHash {
+        size_t operator()(const Key &key) const {
+            uint64_t hash = 14695981039346656037ull;
+            const unsigned char *bytes = reinterpret_cast<const unsigned char *>(key.values);
+            for (size_t i = 0; i < sizeof(key.values); i++)
+                hash = (hash ^ bytes[i]) * 1099511628211ull;
+            return hash;
+        }
+    };
+    std::unordered_map<Key, GrenadePath, KeyHash> paths;
+    std::vector<GrenadePath> batch; // results of the last get_many
+
+    static Key make_key(const Vector &p, const Vector &v, double fuse, double dt) {
+        return { { p.x, p.y, p.z, v.x, v.y, v.z, fuse, dt } };
+    }
+    const GrenadePath *find(const Key &key);
+    const GrenadePath &insert(const Key &key, GrenadePath &&path);
+};
+
+// Intel, tents, crates etc. They only fall and get touched, so the world does both for all of them at once.
+struct AceEntity {
+    AceEntity(AceMap *map, double px, double py, double pz, float radius) :
+        map(map), p(px, py, pz), team(-1), carrier(-1), radius(radius) {}
+    bool update();
+
+    AceMap *map;
+    Vector p;
+    int team; // -1 for neutral
+    int carrier; // player id, -1 if not carried. carried entities can't be touched
+    float radius; // players within this distance touch the entity, 0 to disable
+};
+
+enum TriggerShape {
+    TRIGGER_SPHERE = 0, // size.x is the radius
+    TRIGGER_BOX = 1, // size is half the box's extent on each axis
+    TRIGGER_CYLINDER = 2, // upright, size.x is the radius and size.z half the height
+};
+
+// A zone the world tracks which players are inside of. Unlike entity contacts, which come every tick a player is
+// in range, only players entering and leaving make events.
+struct AceTrigger {
+    AceTrigger(int shape, double px, double py, double pz, double sx, double sy, double sz) :
+        shape(shape), p(px, py, pz), size(sx, sy, sz) {
+        std::fill(this->counts, this->counts + TRIGGER_TEAMS, 0);
+    }
+    bool contains(const Vector &point) const;
+    // half the extent of a box around the volume
+    Vector reach() const;
+
+    int shape;
+    Vector p, size;
+    std::vector<size_t> occupants; // player slots inside, sorted
+    int counts[TRIGGER_TEAMS]; // occupants by team
+};
+
+enum WorldEventType {
+    WORLD_EVENT_LANDED = 0, // value is unused
+    WORLD_EVENT_FALL_DAMAGE = 1, // value is the damage taken
+    WORLD_EVENT_ENTERED_WATER = 2, // value is unused
+    WORLD_EVENT_BOUNCED = 3, // value is unused
+    WORLD_EVENT_HIT = 4, // value is unused
+    WORLD_EVENT_MOVED = 5, // value is unused
+    WORLD_EVENT_CONTACT = 6, // value is the player slot touching the entity
+    WORLD_EVENT_CORRECTED = 7, // value is the MovementResult the reported position was turned down for
+    WORLD_EVENT_ENTERED = 8, // value is the player slot that came into the trigger
+    WORLD_EVENT_LEFT = 9, // value is the player slot that left the trigger, or died in it
+};
+
+enum WorldObjectKind {
+    WORLD_PLAYER = 0,
+    WORLD_GRENADE = 1,
+    WORLD_ROCKET = 2,
+    WORLD_ENTITY = 3,
+    WORLD_TRIGGER = 4, // not part of the spatial index
+};
+
+struct WorldEvent {
+    int type;
+    int kind;
+    size_t index; // slot of the object in its kind's array
+    long value;
+};
+
+// Same values as HIT in the protocol. Arms are part of the torso box.
+enum HitboxPart {
+    HITBOX_NONE = -1,
+    HITBOX_TORSO = 0,
+    HITBOX_HEAD = 1,
+    HITBOX_LEGS = 3,
+};
+
+struct HitscanShot {
+    Vector origin, direction;
+    long shooter; // player slot the shot can't hit, -1 for none
+    // player slot the shot is said to have hit, -1 for none. Only its hitbox is padded; anyone else (bar the shooter's
+    // team) only gets in the way when the shot really goes through them. Without one every hitbox is padded
+    long target;
+    double spread; // extra hitbox padding per block travelled, for shots that only roughly follow `direction`
+    double time; // trace against where players were at this time (see AceWorld::rewind), NAN for where they are now
+};
+
+// What lag compensation needs to know about a player at some point in time
+struct PlayerState {
+    double time;
+    Vector p, e, f;
+    bool crouch, alive;
+};
+
+struct HitscanResult {
+    long player; // slot of the player hit, -1 for a miss (or if the map was in the way)
+    int part;
+    double distance;
+};
+
+// Steps every object in the world in one go, so the caller only has to look at what actually happened.
+// Objects aren't owned; empty slots are nullptr and get reused.
+// Objects are also bucketed into a uniform grid so proximity queries only look at nearby cells.
+// The grid is rebuilt lazily: after a step or add/remove it's marked dirty and rebuilt by the next query.
+struct AceWorld {
+    explicit AceWorld(AceMap *map) : map(map), dirty(true), cell_start(GRID_X * GRID_Y + 1) {
+        this->events.reserve(64);
+    }
+    size_t update(double dt, double time);
+
+    // slots of `kind` objects within `radius` of / inside the box / closest to the position, in `out`
+    size_t query_radius(const Vector &pos, double radius, int kind, std::vector<size_t> &out);
+    size_t query_box(const Vector &start, const Vector &end, int kind, std::vector<size_t> &out);
+    // -1 if nothing (of `team`) is within max_distance
+    long nearest(const Vector &pos, int kind, int team=WORLD_ANY_TEAM, double max_distance=INFINITY);
+    // traces every shot against all player hitboxes and the map, split across the thread pool for big batches
+    void hitscan(const HitscanShot *shots, size_t count, double max_distance, double tolerance, HitscanResult *results);
+
+    // State of a player at `time`, interpolated between the ticks recorded around it (clamped to the oldest and
+    // newest one). False if nothing was recorded for the slot yet.
+    bool rewind(size_t player, double time, PlayerState *out) const;
+    // rewind for every slot, `out` needs room for players.size(). Slots without history come back not alive.
+    void rewind_all(double time, PlayerState *out) const;
+    // forget a slot's history, for when it's given to another player
+    void clear_history(size_t player);
+    // take a player out of every trigger without events, for when it's removed from the world
+    void forget_player(size_t player);
+
+    AceMap *map;
+    std::vector<AcePlayer *> players;
+    std::vector<AceGrenade *> grenades;
+    std::vector<AceRocket *> rockets;
+    std::vector<AceEntity *> entities;
+    std::vector<AceTrigger *> triggers;
+    std::vector<WorldEvent> events;
+    bool dirty;
+
+private:
+    struct GridEntry {
+        int kind;
+        size_t index;
+    };
+    std::vector<uint32_t> cell_start; // entries of cell c are grid[cell_start[c]:cell_start[c + 1]]
+    std::vector<GridEntry> grid;
+    std::vector<size_t> scratch;
+
+    // head, torso and legs of a player in its own yaw-rotated frame (x forward, y right, z down from p)
+    struct Hitbox {
+        long player;
+        Vector p, forward, side;
+        Vector lo[3], hi[3];
+    };
+    std::vector<Hitbox> hitboxes;
+
+    // fixed size ring of the last ticks, oldest at states[(next + HISTORY_SIZE - count) % HISTORY_SIZE]
+    struct PlayerHistory {
+        PlayerState states[HISTORY_SIZE];
+        size_t next = 0, count = 0;
+    };
+    std::vector<PlayerHistory> history;
+
+    void rebuild_index();
+    void record_history(double time);
+    static Hitbox make_hitbox(long player, const PlayerState &state);
+    void build_hitboxes();
+    void test_hitbox(const Hitbox &box, const HitscanShot &shot, const Vector &dir, double tolerance, bool padded,
+                     HitscanResult &result) const;
+    HitscanResult trace_shot(const HitscanShot &shot, double max_distance, double tolerance) const;
+    const Vector *position_of(int kind, size_t index) const;
+    int team_of(int kind, size_t index) const;
+    void update_entities();
+    void update_triggers();
+    void push_event(int type, int kind, size_t index, long value=0) {
+        this->events.push_back({ type, kind, index, value });
+    }
+};
+
 // should these be methods on AceMap ?
 //same as isvoxelsolid but water is empty && out of bounds returns true
 bool clipbox(AceMap *map, float x, float y, float z)
@@ -157,12 +460,52 @@ long AcePlayer::update(double dt, double time) {
 }
 
 void AcePlayer::set_orientation(double x, double y, double z) {
-    float f = sqrtf(x*x + y*y);
+    // f drives acceleration, a longer than unit vector from a client would make the player faster
+    double length = sqrt(x*x + y*y + z*z);
+    if (length < 1e-6)
+        return;
+    x /= length;
+    y /= length;
+    z /= length;
     this->f.set(x, y, z);
-    this->s.set(-y / f, x / f, 0.0);
+    float f = sqrtf(x*x + y*y);
+    if (f > 1e-6f)
+        this->s.set(-y / f, x / f, 0.0);
     this->h.set(-z * this->s.y, z * this->s.x, (x * this->s.y) - (y * this->s.x));
 }
 
+MovementResult AcePlayer::reconcile(double time) {
+    MovementCheck &m = this->movement;
+    m.pending = false;
+    const double elapsed = m.last_time < 0 ? 0 : time - m.last_time;
+    m.last_time = time;
+
+    const double error = m.report.distance(this->p);
+    const double moved = m.report.distance(m.origin), simulated = this->p.distance(m.origin);
+    m.reports++;
+    m.error_sum += error;
+    m.max_error = std::max(m.max_error, error);
+    m.divergence = std::max(0.0, m.divergence + moved - simulated - MOVEMENT_SLACK * elapsed);
+    m.max_divergence = std::max(m.max_divergence, m.divergence);
+    // a client that stops cheating gets its reports taken again after a few seconds
+    m.divergence = std::min(m.divergence, MOVEMENT_MAX_DIVERGENCE * 2);
+
+    MovementResult result = MOVEMENT_ACCEPTED;
+    if (error >= MOVEMENT_MAX_ERROR)
+        result = MOVEMENT_TOO_FAR;
+    else if (m.divergence > MOVEMENT_MAX_DIVERGENCE)
+        result = MOVEMENT_DIVERGED;
+
+    if (result == MOVEMENT_ACCEPTED) {
+        this->p = m.report;
+        this->e = m.report;
+    } else {
+        m.corrections++;
+    }
+    m.origin = this->p;
+    return result;
+}
+
 void AcePlayer::boxclipmove(double dt, double time) {
     float offset, m;
     if (this->crouch)
@@ -310,19 +653,469 @@ bool AceGrenade::next_collision(double dt, double max, double *eta, Vector *pos)
     return collide;
 }
 
-bool cast_ray(AceMap *map, const Vector &position, const Vector &direction, long *x, long *y, long *z, float length=32, bool isdirection=true) {
-    double x0 = position.x; double y0 = position.y; double z0 = position.z;
-    double x1 = direction.x; double y1 = direction.y; double z1 = direction.z;
+// Steps a throw like the world would, recording every bounce until the fuse runs out.
+void trace_grenade(AceMap *map, const Vector &p, const Vector &v, double fuse, double dt, GrenadePath *out) {
+    AceGrenade grenade(map, p, v);
+    out->bounces.clear();
+    out->regions.clear();
+    dt = std::max(dt, 1e-3);
 
-    if (isdirection) {
-        x1 = x0 + x1 * length;
-        y1 = y0 + y1 * length;
-        z1 = z0 + z1 * length;
+    // a step only looks at voxels with x/y taken from where it started and where it would have ended
+    std::vector<uint8_t> touched(REGIONS_X * REGIONS_Y);
+    auto touch = [&](double x, double y) {
+        if (x < 0 || y < 0 || x >= MAP_X || y >= MAP_Y)
+            return;
+        const size_t region = AceMap::region_of(x, y);
+        if (!touched[region]) {
+            touched[region] = true;
+            out->regions.emplace_back(region, map->region_revision(region));
+        }
+    };
+    const size_t steps = std::max(fuse, 0.0) / dt + 0.5;
+    for (size_t step = 1; step <= steps; step++) {
+        const double time = step * dt;
+        const Vector old = grenade.p;
+        // same move update() is about to make
+        const Vector moved = old + Vector(grenade.v.x, grenade.v.y, grenade.v.z + dt) * (dt * 32);
+        touch(old.x, old.y); touch(moved.x, moved.y); touch(old.x, moved.y); touch(moved.x, old.y);
+        const bool bounced = grenade.update(dt, time);
+        if (bounced)
+            out->bounces.push_back({ time, grenade.p, grenade.v });
     }
+    out->end = grenade.p;
+}
+
+const GrenadePath *GrenadePathCache::find(const Key &key) {
+    auto it = this->paths.find(key);
+    if (it == this->paths.end())
+        return nullptr;
+    for (const auto &region : it->second.regions) {
+        if (this->map->region_revision(region.first) != region.second) {
+            this->paths.erase(it);
+            return nullptr;
+        }
+    }
+    return &it->second;
+}
+
+const GrenadePath &GrenadePathCache::insert(const Key &key, GrenadePath &&path) {
+    // no bookkeeping for a proper LRU, anything goes once it's full
+    if (this->paths.size() >= std::max<size_t>(this->capacity, 1))
+        this->paths.erase(this->paths.begin());
+    return this->paths[key] = std::move(path);
+}
+
+const GrenadePath &GrenadePathCache::get(const Vector &p, const Vector &v, double fuse, double dt) {
+    const Key key = make_key(p, v, fuse, dt);
+    if (const GrenadePath *path = this->find(key)) {
+        this->hits++;
+        return *path;
+    }
+    this->misses++;
+    GrenadePath path;
+    trace_grenade(this->map, p, v, fuse, dt, &path);
+    return this->insert(key, std::move(path));
+}
+
+const std::vector<GrenadePath> &GrenadePathCache::get_many(const Vector *p, const Vector *v, size_t count, double fuse,
+                                                           double dt) {
+    // inserting can evict anything, so the whole batch is copied aside
+    this->batch.resize(count);
+    std::vector<size_t> missing;
+    for (size_t i = 0; i < count; i++) {
+        if (const GrenadePath *path = this->find(make_key(p[i], v[i], fuse, dt)))
+            this->batch[i] = *path;
+        else
+            missing.push_back(i);
+    }
+    this->hits += count - missing.size();
+    this->misses += missing.size();
+
+    thread_pool().parallel_for(missing.size(), 8, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; i++)
+            trace_grenade(this->map, p[missing[i]], v[missing[i]], fuse, dt, &this->batch[missing[i]]);
+    });
+    for (size_t i : missing)
+        this->insert(make_key(p[i], v[i], fuse, dt), GrenadePath(this->batch[i]));
+    return this->batch;
+}
+
+bool AceEntity::update() {
+    // drop onto whatever is below, or pop up out of the ground
+    int z = this->map->get_z(this->p.x, this->p.y, this->p.z - 1);
+    if (z == this->p.z)
+        return false;
+    this->p.z = z;
+    return true;
+}
+
+static inline int grid_cell(double v, int cells) {
+    return std::max(0, std::min(cells - 1, int(floor(v / GRID_CELL))));
+}
+
+const Vector *AceWorld::position_of(int kind, size_t index) const {
+    switch (kind) {
+        case WORLD_PLAYER: {
+            AcePlayer *ply = index < this->players.size() ? this->players[index] : nullptr;
+            return ply && ply->alive ? &ply->p : nullptr;
+        }
+        case WORLD_GRENADE: {
+            AceGrenade *grenade = index < this->grenades.size() ? this->grenades[index] : nullptr;
+            return grenade ? &grenade->p : nullptr;
+        }
+        case WORLD_ROCKET: {
+            AceRocket *rocket = index < this->rockets.size() ? this->rockets[index] : nullptr;
+            return rocket ? &rocket->p : nullptr;
+        }
+        case WORLD_ENTITY: {
+            AceEntity *ent = index < this->entities.size() ? this->entities[index] : nullptr;
+            return ent ? &ent->p : nullptr;
+        }
+        default:
+            return nullptr;
+    }
+}
+
+int AceWorld::team_of(int kind, size_t index) const {
+    if (kind == WORLD_PLAYER)
+        return this->players[index]->team;
+    if (kind == WORLD_ENTITY)
+        return this->entities[index]->team;
+    return -1;
+}
+
+// counting sort of every live object into its cell
+void AceWorld::rebuild_index() {
+    const size_t sizes[] = { this->players.size(), this->grenades.size(), this->rockets.size(), this->entities.size() };
+    std::fill(this->cell_start.begin(), this->cell_start.end(), 0);
+    size_t total = 0;
+    for (int kind = 0; kind < 4; kind++) {
+        for (size_t i = 0; i < sizes[kind]; i++) {
+            const Vector *p = this->position_of(kind, i);
+            if (!p) continue;
+            this->cell_start[grid_cell(p->x, GRID_X) + grid_cell(p->y, GRID_Y) * GRID_X + 1]++;
+            total++;
+        }
+    }
+    for (size_t c = 1; c < this->cell_start.size(); c++)
+        this->cell_start[c] += this->cell_start[c - 1];
+
+    this->grid.resize(total);
+    std::vector<uint32_t> fill(this->cell_start.begin(), this->cell_start.end() - 1);
+    for (int kind = 0; kind < 4; kind++) {
+        for (size_t i = 0; i < sizes[kind]; i++) {
+            const Vector *p = this->position_of(kind, i);
+            if (!p) continue;
+            this->grid[fill[grid_cell(p->x, GRID_X) + grid_cell(p->y, GRID_Y) * GRID_X]++] = { kind, i };
+        }
+    }
+    this->dirty = false;
+}
+
+size_t AceWorld::query_box(const Vector &start, const Vector &end, int kind, std::vector<size_t> &out) {
+    if (this->dirty)
+        this->rebuild_index();
+    Vector lo(std::min(start.x, end.x), std::min(start.y, end.y), std::min(start.z, end.z));
+    Vector hi(std::max(start.x, end.x), std::max(start.y, end.y), std::max(start.z, end.z));
+
+    size_t found = 0;
+    for (int cy = grid_cell(lo.y, GRID_Y); cy <= grid_cell(hi.y, GRID_Y); cy++) {
+        for (int cx = grid_cell(lo.x, GRID_X); cx <= grid_cell(hi.x, GRID_X); cx++) {
+            const int cell = cx + cy * GRID_X;
+            for (uint32_t e = this->cell_start[cell]; e < this->cell_start[cell + 1]; e++) {
+                const GridEntry &entry = this->grid[e];
+                if (entry.kind != kind) continue;
+                const Vector *p = this->position_of(kind, entry.index);
+                if (!p || p->x < lo.x || p->x > hi.x || p->y < lo.y || p->y > hi.y || p->z < lo.z || p->z > hi.z)
+                    continue;
+                out.push_back(entry.index);
+                found++;
+            }
+        }
+    }
+    return found;
+}
+
+size_t AceWorld::query_radius(const Vector &pos, double radius, int kind, std::vector<size_t> &out) {
+    if (this->dirty)
+        this->rebuild_index();
+    const double sq_radius = radius * radius;
+
+    size_t found = 0;
+    for (int cy = grid_cell(pos.y - radius, GRID_Y); cy <= grid_cell(pos.y + radius, GRID_Y); cy++) {
+        for (int cx = grid_cell(pos.x - radius, GRID_X); cx <= grid_cell(pos.x + radius, GRID_X); cx++) {
+            const int cell = cx + cy * GRID_X;
+            for (uint32_t e = this->cell_start[cell]; e < this->cell_start[cell + 1]; e++) {
+                const GridEntry &entry = this->grid[e];
+                if (entry.kind != kind) continue;
+                const Vector *p = this->position_of(kind, entry.index);
+                if (!p || p->sq_distance(pos) > sq_radius) continue;
+                out.push_back(entry.index);
+                found++;
+            }
+        }
+    }
+    return found;
+}
+
+long AceWorld::nearest(const Vector &pos, int kind, int team, double max_distance) {
+    if (this->dirty)
+        this->rebuild_index();
+    const int px = grid_cell(pos.x, GRID_X), py = grid_cell(pos.y, GRID_Y);
+
+    long best = -1;
+    double best_distance = max_distance * max_distance;
+    // walk outwards ring by ring; everything in ring k is at least (k - 1) cells away
+    for (int k = 0; k < std::max(GRID_X, GRID_Y); k++) {
+        const double ring_distance = std::max(0, k - 1) * GRID_CELL;
+        if (ring_distance * ring_distance > best_distance)
+            break;
+        for (int cy = py - k; cy <= py + k; cy++) {
+            if (cy < 0 || cy >= GRID_Y) continue;
+            const bool edge = cy == py - k || cy == py + k;
+            for (int cx = px - k; cx <= px + k; cx += edge ? 1 : 2 * k) {
+                if (cx >= 0 && cx < GRID_X) {
+                    const int cell = cx + cy * GRID_X;
+                    for (uint32_t e = this->cell_start[cell]; e < this->cell_start[cell + 1]; e++) {
+                        const GridEntry &entry = this->grid[e];
+                        if (entry.kind != kind) continue;
+                        const Vector *p = this->position_of(kind, entry.index);
+                        if (!p || (team != WORLD_ANY_TEAM && this->team_of(kind, entry.index) != team)) continue;
+                        double distance = p->sq_distance(pos);
+                        if (distance <= best_distance) {
+                            best = entry.index;
+                            best_distance = distance;
+                        }
+                    }
+                }
+            }
+        }
+    }
+    return best;
+}
+
+// Entities go first so contacts are against where players were at the start of the tick.
+void AceWorld::update_entities() {
+    for (size_t i = 0; i < this->entities.size(); i++) {
+        AceEntity *ent = this->entities[i];
+        if (!ent)
+            continue;
+
+        if (ent->update())
+            this->push_event(WORLD_EVENT_MOVED, WORLD_ENTITY, i);
+
+        if (ent->carrier != -1 || ent->radius <= 0)
+            continue;
+        this->scratch.clear();
+        this->query_radius(ent->p, ent->radius, WORLD_PLAYER, this->scratch);
+        for (size_t j : this->scratch)
+            this->push_event(WORLD_EVENT_CONTACT, WORLD_ENTITY, i, j);
+    }
+}
+
+size_t AceWorld::update(double dt, double time) {
+    this->events.clear();
+    // pick up anything moved from outside since the last step
+    this->dirty = true;
+    this->update_entities();
+
+    for (size_t i = 0; i < this->players.size(); i++) {
+        AcePlayer *ply = this->players[i];
+        if (!ply || !ply->alive)
+            continue;
+
+        // positions reported since the last step are checked against it before stepping on from there
+        if (ply->movement.pending) {
+            MovementResult result = ply->reconcile(time);
+            if (result != MOVEMENT_ACCEPTED)
+                this->push_event(WORLD_EVENT_CORRECTED, WORLD_PLAYER, i, result);
+        }
+
+        bool wade = ply->wade;
+        long fall = ply->update(dt, time);
+        if (fall > 0)
+            this->push_event(WORLD_EVENT_FALL_DAMAGE, WORLD_PLAYER, i, fall);
+        else if (fall < 0)
+            this->push_event(WORLD_EVENT_LANDED, WORLD_PLAYER, i);
+        if (ply->wade && !wade)
+            this->push_event(WORLD_EVENT_ENTERED_WATER, WORLD_PLAYER, i);
+    }
+
+    for (size_t i = 0; i < this->grenades.size(); i++) {
+        AceGrenade *grenade = this->grenades[i];
+        if (grenade && grenade->update(dt, time))
+            this->push_event(WORLD_EVENT_BOUNCED, WORLD_GRENADE, i);
+    }
+
+    for (size_t i = 0; i < this->rockets.size(); i++) {
+        AceRocket *rocket = this->rockets[i];
+        if (rocket && rocket->update(dt, time))
+            this->push_event(WORLD_EVENT_HIT, WORLD_ROCKET, i);
+    }
+    this->dirty = true;
+    this->update_triggers();
+    this->record_history(time);
+    return this->events.size();
+}
+
+bool AceTrigger::contains(const Vector &point) const {
+    const Vector d = point - this->p;
+    switch (this->shape) {
+        case TRIGGER_SPHERE:
+            return d.sq_magnitude() <= this->size.x * this->size.x;
+        case TRIGGER_BOX:
+            return std::abs(d.x) <= this->size.x && std::abs(d.y) <= this->size.y && std::abs(d.z) <= this->size.z;
+        case TRIGGER_CYLINDER:
+            return d.x * d.x + d.y * d.y <= this->size.x * this->size.x && std::abs(d.z) <= this->size.z;
+    }
+    return false;
+}
+
+Vector AceTrigger::reach() const {
+    switch (this->shape) {
+        case TRIGGER_SPHERE:
+            return Vector(this->size.x, this->size.x, this->size.x);
+        case TRIGGER_CYLINDER:
+            return Vector(this->size.x, this->size.x, this->size.z);
+    }
+    return this->size;
+}
+
+void AceWorld::update_triggers() {
+    for (size_t i = 0; i < this->triggers.size(); i++) {
+        AceTrigger *trigger = this->triggers[i];
+        if (!trigger)
+            continue;
+
+        // candidates from the spatial index (which leaves out dead players), sorted to diff against last tick
+        this->scratch.clear();
+        const Vector reach = trigger->reach();
+        this->query_box(trigger->p - reach, trigger->p + reach, WORLD_PLAYER, this->scratch);
+        auto inside = std::remove_if(this->scratch.begin(), this->scratch.end(), [this, trigger](size_t j) {
+            return !trigger->contains(this->players[j]->p);
+        });
+        this->scratch.erase(inside, this->scratch.end());
+        std::sort(this->scratch.begin(), this->scratch.end());
+
+        const std::vector<size_t> &old = trigger->occupants;
+        size_t a = 0, b = 0;
+        while (a < old.size() || b < this->scratch.size()) {
+            if (b == this->scratch.size() || (a < old.size() && old[a] < this->scratch[b])) {
+                this->push_event(WORLD_EVENT_LEFT, WORLD_TRIGGER, i, old[a++]);
+            } else if (a == old.size() || this->scratch[b] < old[a]) {
+                this->push_event(WORLD_EVENT_ENTERED, WORLD_TRIGGER, i, this->scratch[b++]);
+            } else {
+                a++;
+                b++;
+            }
+        }
+        trigger->occupants.assign(this->scratch.begin(), this->scratch.end());
+
+        // teams can change while inside, so these are counted over
+        std::fill(trigger->counts, trigger->counts + TRIGGER_TEAMS, 0);
+        for (size_t j : trigger->occupants) {
+            const int team = this->players[j]->team;
+            if (team >= 0 && team < TRIGGER_TEAMS)
+                trigger->counts[team]++;
+        }
+    }
+}
+
+void AceWorld::forget_player(size_t player) {
+    for (AceTrigger *trigger : this->triggers) {
+        if (!trigger)
+            continue;
+        auto it = std::lower_bound(trigger->occupants.begin(), trigger->occupants.end(), player);
+        if (it == trigger->occupants.end() || *it != player)
+            continue;
+        trigger->occupants.erase(it);
+        const int team = this->players[player] ? this->players[player]->team : -1;
+        if (team >= 0 && team < TRIGGER_TEAMS)
+            trigger->counts[team]--;
+    }
+}
+
+// Walks every voxel the segment a -> b passes through, stopping at the first one clipbox() considers solid.
+// `hit` is set to the point the segment enters that voxel.
+bool clip_segment(AceMap *map, const Vector &a, const Vector &b, Vector *hit) {
+    Vector d = b - a;
+    Vector3<long> cell(floor(a.x), floor(a.y), floor(a.z));
+    const Vector3<long> end(floor(b.x), floor(b.y), floor(b.z));
+    if (clipbox(map, cell.x, cell.y, cell.z)) {
+        *hit = a;
+        return true;
+    }
+
+    Vector3<long> step(d.x < 0 ? -1 : 1, d.y < 0 ? -1 : 1, d.z < 0 ? -1 : 1);
+    // t (0..1 along the segment) of the next boundary crossing on each axis, and t between crossings
+    Vector next, delta;
+    next.x = d.x ? ((d.x > 0 ? cell.x + 1 : cell.x) - a.x) / d.x : INFINITY;
+    next.y = d.y ? ((d.y > 0 ? cell.y + 1 : cell.y) - a.y) / d.y : INFINITY;
+    next.z = d.z ? ((d.z > 0 ? cell.z + 1 : cell.z) - a.z) / d.z : INFINITY;
+    delta.x = d.x ? std::abs(1 / d.x) : INFINITY;
+    delta.y = d.y ? std::abs(1 / d.y) : INFINITY;
+    delta.z = d.z ? std::abs(1 / d.z) : INFINITY;
+
+    while (cell != end) {
+        double t;
+        if (next.x <= next.y && next.x <= next.z) {
+            t = next.x; cell.x += step.x; next.x += delta.x;
+        } else if (next.y <= next.z) {
+            t = next.y; cell.y += step.y; next.y += delta.y;
+        } else {
+            t = next.z; cell.z += step.z; next.z += delta.z;
+        }
+        if (t > 1)
+            break;
+        if (clipbox(map, cell.x, cell.y, cell.z)) {
+            *hit = a + d * t;
+            return true;
+        }
+    }
+    return false;
+}
+
+bool AceRocket::update(double dt, double time) {
+    const Vector old = this->p;
+    this->p += this->get_orientation() * (dt * ROCKET_SPEED);
+    this->pitch += ROCKET_FALLOFF * dt;
+
+    // swept, so fast rockets can't tunnel through thin walls between ticks
+    Vector hit;
+    if (clip_segment(this->map, old, this->p, &hit)) {
+        this->p = hit;
+        return true;
+    }
+    return false;
+}
+
+void AceRocket::set_orientation(double x, double y, double z) {
+    this->pitch = std::asin(detail::clamp(z, 1.0, -1.0));
+    this->yaw = std::atan2(x, y);
+}
+
+Vector AceRocket::get_orientation() const {
+    return Vector(std::sin(this->yaw) * std::cos(this->pitch),
+                  std::cos(this->yaw) * std::cos(this->pitch),
+                  std::sin(this->pitch));
+}
+
+// The fixed point voxel walk cast_ray has always used (same as the client's), able to jump across empty space.
+// a is the current voxel, c the last one, p the decision variables and i their increments.
+struct RayWalk {
+    RayWalk(const Vector &start, const Vector &end, float length);
+    void step();
+    bool skip(const Vector3<long> &lo, const Vector3<long> &hi);
 
-    Vector f, g;
     Vector3<long> a, c, d, p, i;
-    long cnt = 0;
+    bool mx, my, mz; // whether the walk moves along the axis at all
+    long cnt; // steps left
+};
+
+RayWalk::RayWalk(const Vector &start, const Vector &end, float length) : d(0, 0, 0), cnt(0) {
+    double x0 = start.x; double y0 = start.y; double z0 = start.z;
+    double x1 = end.x; double y1 = end.y; double z1 = end.z;
+    Vector f, g;
 
     a.set(x0 - .5, y0 - .5, z0 - .5);
     c.set(x1 - .5, y1 - .5, z1 - .5);
@@ -356,28 +1149,148 @@ bool cast_ray(AceMap *map, const Vector &position, const Vector &direction, long
           f.y*g.z - f.z*g.y,
           f.y*g.x - f.x*g.y);
     i.set(g.x, g.y, g.z);
+    mx = c.x != a.x; my = c.y != a.y; mz = c.z != a.z;
 
     if (cnt > length)
         cnt = length;
-    while (cnt)
-    {
-        if (((p.x | p.y) >= 0) && (a.z != c.z)) {
-            a.z += d.z; p.x -= i.x; p.y -= i.y;
+}
+
+void RayWalk::step() {
+    if (((p.x | p.y) >= 0) && (a.z != c.z)) {
+        a.z += d.z; p.x -= i.x; p.y -= i.y;
+    }
+    else if ((p.z >= 0) && (a.x != c.x)) {
+        a.x += d.x; p.x += i.z; p.z -= i.y;
+    }
+    else {
+        a.y += d.y; p.y += i.z; p.z += i.x;
+    }
+}
+
+// Moves the walk to the last voxel before it leaves the box [lo, hi], as if step() had been called for each one.
+// Between z steps the x/y choice only depends on p.z, and a z step is taken as soon as both p.x and p.y allow it,
+// so each z step (and the final stretch) costs a few divisions no matter how many voxels it covers.
+// Returns false if the walk ends inside the box.
+bool RayWalk::skip(const Vector3<long> &lo, const Vector3<long> &hi) {
+    constexpr int64_t NEVER = INT64_MAX / 4;
+    // an axis that moves by less than 1/1024 per voxel doesn't fit the math below
+    if ((mx && !i.x) || (my && !i.y) || (mz && !i.z))
+        return true;
+
+    while (true) {
+        // x and z stop once they reach c, y never does
+        const bool xs = mx && a.x != c.x, ys = my, zs = mz && a.z != c.z;
+        // steps along each axis until it leaves the box. x and z also stop short of their last step,
+        // after which they're done and the rules change
+        const int64_t ex = !xs ? NEVER : std::min<int64_t>(d.x > 0 ? hi.x - a.x + 1 : a.x - lo.x + 1, std::abs(c.x - a.x));
+        const int64_t ey = !ys ? NEVER : d.y > 0 ? hi.y - a.y + 1 : a.y - lo.y + 1;
+        const int64_t ez = !zs ? NEVER : std::min<int64_t>(d.z > 0 ? hi.z - a.z + 1 : a.z - lo.z + 1, std::abs(c.z - a.z));
+
+        // x steps taken before the (ny + 1)th y step
+        auto x_steps = [&](int64_t ny) -> int64_t {
+            if (!xs) return 0;
+            if (!ys) return NEVER;
+            const int64_t v = p.z + ny * i.x;
+            return v < 0 ? 0 : v / i.y + 1;
+        };
+        // y steps done by the time x has taken n steps
+        auto y_at = [&](int64_t n) -> int64_t {
+            if (n <= 0 || !ys) return 0;
+            if (!xs) return NEVER;
+            const int64_t need = (n - 1) * i.y - p.z;
+            return need <= 0 ? 0 : (need + i.x - 1) / i.x;
+        };
+
+        // the x/y steps taken right before the step that leaves the box, and how many xy steps in that is
+        int64_t nx = NEVER, ny = NEVER, k = NEVER;
+        if (xs) {
+            ny = y_at(ex);
+            nx = ex - 1;
+            k = nx + ny;
         }
-        else if ((p.z >= 0) && (a.x != c.x)) {
-            a.x += d.x; p.x += i.z; p.z -= i.y;
+        if (ys) {
+            const int64_t before = x_steps(ey - 1);
+            if (before + ey - 1 < k) {
+                nx = before;
+                ny = ey - 1;
+                k = nx + ny;
+            }
         }
-        else {
-            a.y += d.y; p.y += i.z; p.z += i.x;
+
+        // unless a z step comes first, which happens as soon as both p.x and p.y allow it
+        bool z_first = false;
+        if (zs) {
+            const int64_t need_x = p.x >= 0 ? 0 : (-p.x + i.z - 1) / i.z;
+            const int64_t need_y = p.y >= 0 ? 0 : (-p.y + i.z - 1) / i.z;
+            if ((!need_x || xs) && (!need_y || ys)) {
+                int64_t zx = need_y ? x_steps(need_y - 1) : 0, zy = need_y;
+                if (zx < need_x) {
+                    zx = need_x;
+                    zy = y_at(need_x);
+                }
+                if (zx + zy <= k) {
+                    nx = zx;
+                    ny = zy;
+                    k = zx + zy;
+                    z_first = true;
+                }
+            }
         }
 
-        if (map->get_solid(a.x, a.y, a.z, true)) {
+        // everything up to here is inside the box, so running out of steps means nothing was hit
+        if (k >= NEVER / 2 || k + (z_first && ez > 1) >= cnt)
+            return false;
+
+        a.x += d.x * nx; a.y += d.y * ny;
+        p.x += nx * i.z; p.y += ny * i.z; p.z += ny * i.x - nx * i.y;
+        cnt -= k;
+
+        if (!z_first || ez == 1)
+            return true;
+        a.z += d.z; p.x -= i.x; p.y -= i.y;
+        cnt--;
+    }
+}
+
+bool cast_ray(AceMap *map, const Vector &position, const Vector &direction, long *x, long *y, long *z, float length=32, bool isdirection=true) {
+    Vector end = direction;
+    if (isdirection)
+        end.set(position.x + direction.x * length, position.y + direction.y * length, position.z + direction.z * length);
+    RayWalk walk(position, end, length);
+
+    // empty bricks (and everything above/below the map) are jumped across instead of walked voxel by voxel
+    Vector3<long> lo, hi;
+    while (walk.cnt)
+    {
+        walk.step();
+
+        const Vector3<long> &a = walk.a;
+        const int wx = a.x & (MAP_X - 1), wy = a.y & (MAP_Y - 1);
+        long size = 0;
+        if (a.z < 0 || a.z >= long(MAP_Z)) {
+            lo.set(a.x - 1024, a.y - 1024, a.z < 0 ? a.z - 1024 : MAP_Z);
+            hi.set(a.x + 1024, a.y + 1024, a.z < 0 ? -1 : a.z + 1024);
+        }
+        else if (map->is_empty16(wx, wy, a.z))
+            size = 16;
+        else if (map->is_empty4(wx, wy, a.z))
+            size = 4;
+        else if (map->get_solid(wx, wy, a.z)) {
             *x = a.x;
             *y = a.y;
             *z = a.z;
             return true;
         }
-        cnt--;
+        walk.cnt--;
+
+        if (size) {
+            lo.set(a.x & ~(size - 1), a.y & ~(size - 1), a.z & ~(size - 1));
+            hi.set(lo.x + size - 1, lo.y + size - 1, lo.z + size - 1);
+        }
+        else if (a.z >= 0 && a.z < long(MAP_Z))
+            continue;
+        if (!walk.skip(lo, hi))
+            return false;
     }
     return false;
 }
@@ -400,3 +1313,959 @@ bool cast_ray(AceMap *map, const Vector &position, const Vector &direction, long
 //    h->y = z*s->x;
 //    h->z = x*s->y - y*s->x;
 //}
+
+// cast_ray for a whole batch, split across the thread pool when it's big enough to be worth it.
+// voxels gets 3 longs per ray, only meaningful where hits is true.
+void cast_rays(AceMap *map, const Vector *origins, const Vector *targets, size_t count, float length, bool isdirection,
+               uint8_t *hits, long *voxels) {
+    thread_pool().parallel_for(count, 64, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; i++) {
+            long *voxel = voxels + i * 3;
+            hits[i] = cast_ray(map, origins[i], targets[i], voxel, voxel + 1, voxel + 2, length, isdirection);
+        }
+    });
+}
+
+// slab test of the ray o + d * t against an axis aligned box, t of entry (0 if starting inside) or -1 for a miss
+static inline double ray_box(const Vector &o, const Vector &d, const Vector &lo, const Vector &hi) {
+    double near = 0.0, far = INFINITY;
+    const double os[] = { o.x, o.y, o.z }, ds[] = { d.x, d.y, d.z };
+    const double los[] = { lo.x, lo.y, lo.z }, his[] = { hi.x, hi.y, hi.z };
+    for (int axis = 0; axis < 3; axis++) {
+        if (ds[axis] == 0.0) {
+            if (os[axis] < los[axis] || os[axis] > his[axis])
+                return -1.0;
+            continue;
+        }
+        double t0 = (los[axis] - os[axis]) / ds[axis], t1 = (his[axis] - os[axis]) / ds[axis];
+        if (t0 > t1)
+            std::swap(t0, t1);
+        near = std::max(near, t0);
+        far = std::min(far, t1);
+        if (near > far)
+            return -1.0;
+    }
+    return near;
+}
+
+AceWorld::Hitbox AceWorld::make_hitbox(long player, const PlayerState &state) {
+    Hitbox box;
+    box.player = player;
+    box.p = state.p;
+    box.forward.set(state.f.x, state.f.y, 0.0);
+    box.forward.normalize();
+    if (box.forward.x == 0.0 && box.forward.y == 0.0)
+        box.forward.set(1.0, 0.0, 0.0);
+    box.side.set(-box.forward.y, box.forward.x, 0.0);
+
+    // p is at eye height; feet are 2.25 below it standing and 1.35 crouched
+    const double waist = state.crouch ? 0.9 : 1.25, feet = state.crouch ? 1.35 : 2.25;
+    box.lo[0].set(-0.35, -0.35, -0.45); box.hi[0].set(0.35, 0.35, 0.25); // HITBOX_HEAD
+    box.lo[1].set(-0.3, -0.5, 0.25); box.hi[1].set(0.3, 0.5, waist); // HITBOX_TORSO
+    box.lo[2].set(-0.3, -0.4, waist); box.hi[2].set(0.3, 0.4, feet); // HITBOX_LEGS
+    return box;
+}
+
+void AceWorld::build_hitboxes() {
+    this->hitboxes.clear();
+    for (size_t i = 0; i < this->players.size(); i++) {
+        AcePlayer *ply = this->players[i];
+        if (ply && ply->alive)
+            this->hitboxes.push_back(make_hitbox(i, { 0.0, ply->p, ply->e, ply->f, ply->crouch, true }));
+    }
+}
+
+void AceWorld::test_hitbox(const Hitbox &box, const HitscanShot &shot, const Vector &dir, double tolerance,
+                           bool padded, HitscanResult &result) const {
+    static const int PARTS[] = { HITBOX_HEAD, HITBOX_TORSO, HITBOX_LEGS };
+    // padding grows with distance, so the test is against a cone around the shot
+    const Vector to = Vector(box.p.x, box.p.y, box.p.z + 0.9) - shot.origin;
+    const double along = to.dot(dir);
+    const double pad = padded ? tolerance + shot.spread * std::max(0.0, along) : 0.0;
+    const double reach = HITBOX_REACH + pad;
+    if (along < -reach || along - reach > result.distance || (to - dir * along).sq_magnitude() > reach * reach)
+        return;
+
+    // the shot in the player's frame
+    const Vector rel = shot.origin - box.p;
+    const Vector o(rel.dot(box.forward), rel.dot(box.side), rel.z);
+    const Vector d(dir.dot(box.forward), dir.dot(box.side), dir.z);
+    const Vector padding(pad, pad, pad);
+    double entry = INFINITY;
+    for (int part = 0; part < 3; part++) {
+        const double t = ray_box(o, d, box.lo[part] - padding, box.hi[part] + padding);
+        if (t >= 0)
+            entry = std::min(entry, t);
+    }
+    if (entry >= result.distance)
+        return;
+
+    // padded boxes overlap, so the part is the one really hit (ties go to the head),
+    // or failing that the one the shot passes closest to
+    int hit = -1;
+    double best = INFINITY;
+    for (int part = 0; part < 3; part++) {
+        const double t = ray_box(o, d, box.lo[part], box.hi[part]);
+        if (t >= 0 && t < best) {
+            hit = part;
+            best = t;
+        }
+    }
+    if (hit == -1) {
+        for (int part = 0; part < 3; part++) {
+            const Vector to_part = (box.lo[part] + box.hi[part]) * 0.5 - o;
+            const double miss = (to_part - d * std::max(0.0, to_part.dot(d))).sq_magnitude();
+            if (miss < best) {
+                hit = part;
+                best = miss;
+            }
+        }
+        best = entry;
+    }
+    result.player = box.player;
+    result.part = PARTS[hit];
+    result.distance = best;
+}
+
+HitscanResult AceWorld::trace_shot(const HitscanShot &shot, double max_distance, double tolerance) const {
+    HitscanResult result = { -1, HITBOX_NONE, max_distance };
+    Vector dir = shot.direction;
+    dir.normalize();
+    if (dir.x == 0.0 && dir.y == 0.0 && dir.z == 0.0)
+        return result;
+
+    const AcePlayer *shooter = shot.shooter >= 0 && size_t(shot.shooter) < this->players.size() ?
+        this->players[shot.shooter] : nullptr;
+    auto test = [&](const Hitbox &box) {
+        if (box.player == shot.shooter)
+            return;
+        if (shot.target == -1 || box.player == shot.target)
+            this->test_hitbox(box, shot, dir, tolerance, true, result);
+        else if (!shooter || this->players[box.player]->team != shooter->team)
+            this->test_hitbox(box, shot, dir, tolerance, false, result);
+    };
+    if (std::isnan(shot.time)) {
+        for (const Hitbox &box : this->hitboxes)
+            test(box);
+    } else {
+        PlayerState state;
+        for (size_t i = 0; i < this->players.size(); i++) {
+            if (!this->players[i] || !this->rewind(i, shot.time, &state) || !state.alive)
+                continue;
+            test(make_hitbox(i, state));
+        }
+    }
+
+    if (result.player == -1)
+        return result;
+    // exact walk rather than cast_ray's, which is half a voxel off and can slip past thin walls
+    Vector hit;
+    if (clip_segment(this->map, shot.origin, shot.origin + dir * result.distance, &hit)) {
+        // padded boxes can reach into walls, only count the map if the shot gets there first
+        const double t = hit.distance(shot.origin);
+        if (t < result.distance) {
+            result.player = -1;
+            result.part = HITBOX_NONE;
+            result.distance = t;
+        }
+    }
+    return result;
+}
+
+void AceWorld::hitscan(const HitscanShot *shots, size_t count, double max_distance, double tolerance,
+                       HitscanResult *results) {
+    this->build_hitboxes();
+    thread_pool().parallel_for(count, 16, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; i++)
+            results[i] = this->trace_shot(shots[i], max_distance, tolerance);
+    });
+}
+
+// Only allocates when a new slot shows up, every other tick just overwrites the oldest state
+void AceWorld::record_history(double time) {
+    if (this->history.size() < this->players.size())
+        this->history.resize(this->players.size());
+    for (size_t i = 0; i < this->players.size(); i++) {
+        AcePlayer *ply = this->players[i];
+        if (!ply)
+            continue;
+        PlayerHistory &history = this->history[i];
+        history.states[history.next] = { time, ply->p, ply->e, ply->f, ply->crouch, ply->alive };
+        history.next = (history.next + 1) % HISTORY_SIZE;
+        history.count = std::min(history.count + 1, HISTORY_SIZE);
+    }
+}
+
+bool AceWorld::rewind(size_t player, double time, PlayerState *out) const {
+    if (player >= this->history.size() || !this->history[player].count)
+        return false;
+    const PlayerHistory &history = this->history[player];
+    const size_t oldest = (history.next + HISTORY_SIZE - history.count) % HISTORY_SIZE;
+    auto at = [&](size_t i) -> const PlayerState & { return history.states[(oldest + i) % HISTORY_SIZE]; };
+
+    if (time <= at(0).time) {
+        *out = at(0);
+        return true;
+    }
+    if (time >= at(history.count - 1).time) {
+        *out = at(history.count - 1);
+        return true;
+    }
+    // first state after `time`
+    size_t lo = 1, hi = history.count - 1;
+    while (lo < hi) {
+        const size_t mid = (lo + hi) / 2;
+        if (at(mid).time <= time)
+            lo = mid + 1;
+        else
+            hi = mid;
+    }
+    const PlayerState &a = at(lo - 1), &b = at(lo);
+    const double t = (time - a.time) / (b.time - a.time);
+    // crouching, dying and respawning don't interpolate, take whichever tick is closer
+    *out = t < 0.5 ? a : b;
+    out->time = time;
+    if (a.alive && b.alive) {
+        out->p = a.p.lerp(b.p, t);
+        out->e = a.e.lerp(b.e, t);
+        out->f = a.f.lerp(b.f, t);
+        out->f.normalize();
+    }
+    return true;
+}
+
+void AceWorld::rewind_all(double time, PlayerState *out) const {
+    for (size_t i = 0; i < this->players.size(); i++) {
+        if (!this->players[i] || !this->rewind(i, time, &out[i])) {
+            out[i] = PlayerState();
+            out[i].time = time;
+            out[i].alive = false;
+        }
+    }
+}
+
+void AceWorld::clear_history(size_t player) {
+    if (player < this->history.size())
+        this->history[player].count = 0;
+}
+
+// WorldUpdate is a packet id and then, per player, its id and position and orientation as little endian floats.
+constexpr uint8_t WORLD_UPDATE_ID = 3;
+constexpr size_t WORLD_UPDATE_PLAYERS = 32;
+constexpr size_t WORLD_UPDATE_RECORD = 1 + 6 * sizeof(float);
+constexpr size_t WORLD_UPDATE_MAX_SIZE = 1 + WORLD_UPDATE_PLAYERS * WORLD_UPDATE_RECORD;
+
+// Every living player's WorldUpdate record, read straight off the players and packed once per send, so the packet
+// for each recipient is the records it gets copied back to back.
+struct WorldUpdateEncoder {
+    void record(const AceWorld &world);
+    // the WorldUpdate with the records of player ids in `mask`, `out` needs WORLD_UPDATE_MAX_SIZE bytes
+    size_t assemble(uint32_t mask, char *out) const;
+
+    char records[WORLD_UPDATE_PLAYERS][WORLD_UPDATE_RECORD];
+    uint32_t recorded = 0;
+};
+
+void WorldUpdateEncoder::record(const AceWorld &world) {
+    this->recorded = 0;
+    for (const AcePlayer *ply : world.players) {
+        if (!ply || !ply->alive || ply->id < 0 || ply->id >= (int)WORLD_UPDATE_PLAYERS)
+            continue;
+        const float values[6] = { (float)ply->p.x, (float)ply->p.y, (float)ply->p.z,
+                                  (float)ply->f.x, (float)ply->f.y, (float)ply->f.z };
+        char *record = this->records[ply->id];
+        record[0] = (char)ply->id;
+        memcpy(record + 1, values, sizeof(values));
+        this->recorded |= 1u << ply->id;
+    }
+}
+
+size_t WorldUpdateEncoder::assemble(uint32_t mask, char *out) const {
+    size_t size = 1;
+    out[0] = (char)WORLD_UPDATE_ID;
+    mask &= this->recorded;
+    for (size_t id = 0; mask; id++, mask >>= 1) {
+        if (!(mask & 1))
+            continue;
+        memcpy(out + size, this->records[id], WORLD_UPDATE_RECORD);
+        size += WORLD_UPDATE_RECORD;
+    }
+    return size;
+}
+
+// Line of sight between every pair of players, traced on a thread of its own so the tick never waits for it.
+// Each tick submit() hands the worker the latest player positions (unless it's still busy with the last ones) and
+// picks up whatever it finished. The worker traces at most `budget` segments per pass, round robin over the pairs,
+// and a pair's result only counts for VISIBILITY_MAX_AGE, so when it can't keep up everyone ends up visible.
+// The worker reads the map while the server changes it; a block changing mid-trace only makes a result a pass stale.
+struct AceVisibility {
+    AceVisibility(AceMap *map, size_t budget);
+    ~AceVisibility();
+    AceVisibility(const AceVisibility &) = delete;
+    AceVisibility &operator=(const AceVisibility &) = delete;
+
+    // false if the worker was still busy and the positions were skipped
+    bool submit(const AceWorld &world, double time);
+    // as of the last finished pass; teammates and players without results can always see each other
+    bool visible(const AceWorld &world, size_t viewer, size_t target, double time) const;
+    // ids of the live players `viewer` should hear about on this tick's WorldUpdate: the ones it can see, and of
+    // those further than `near` only every `far_interval`th tick (staggered by id so packets stay even)
+    uint32_t interest(const AceWorld &world, size_t viewer, double time, size_t tick, double near,
+                      size_t far_interval) const;
+
+    size_t budget;
+
+private:
+    struct Snapshot {
+        const AcePlayer *ply; // who had the slot, to notice it changing hands
+        bool alive;
+        int team;
+        Vector e, p;
+    };
+    struct Pair {
+        double checked, seen; // when the pair was last traced, and last found in sight
+    };
+
+    void work();
+    void run_pass();
+    bool trace_pair(const Snapshot &a, const Snapshot &b, size_t *segments) const;
+    static size_t pair_index(size_t a, size_t b) {
+        return a < b ? a * VISIBILITY_SLOTS + b : b * VISIBILITY_SLOTS + a;
+    }
+
+    AceMap *map;
+    std::thread worker;
+    std::mutex mutex;
+    std::condition_variable wake;
+    bool busy, stopping;
+
+    // written by submit() under the mutex, copied by the worker when it starts a pass
+    Snapshot next[VISIBILITY_SLOTS];
+    double next_time;
+    // worker only
+    Snapshot current[VISIBILITY_SLOTS];
+    double current_time;
+    Pair pairs[VISIBILITY_SLOTS * VISIBILITY_SLOTS];
+    size_t cursor;
+    // end of every pass, under the mutex
+    Pair published[VISIBILITY_SLOTS * VISIBILITY_SLOTS];
+    // main thread's copy of published
+    Pair front[VISIBILITY_SLOTS * VISIBILITY_SLOTS];
+};
+
+AceVisibility::AceVisibility(AceMap *map, size_t budget) :
+    budget(budget), map(map), busy(false), stopping(false), next_time(0.0), current_time(0.0), cursor(0) {
+    const Snapshot empty = { nullptr, false, -1, Vector(), Vector() };
+    const Pair never = { -INFINITY, -INFINITY };
+    std::fill(this->next, this->next + VISIBILITY_SLOTS, empty);
+    std::fill(this->current, this->current + VISIBILITY_SLOTS, empty);
+    std::fill(this->pairs, this->pairs + VISIBILITY_SLOTS * VISIBILITY_SLOTS, never);
+    std::fill(this->published, this->published + VISIBILITY_SLOTS * VISIBILITY_SLOTS, never);
+    std::fill(this->front, this->front + VISIBILITY_SLOTS * VISIBILITY_SLOTS, never);
+    this->worker = std::thread([this] { this->work(); });
+}
+
+AceVisibility::~AceVisibility() {
+    {
+        std::lock_guard<std::mutex> lock(this->mutex);
+        this->stopping = true;
+    }
+    this->wake.notify_all();
+    this->worker.join();
+}
+
+bool AceVisibility::submit(const AceWorld &world, double time) {
+    {
+        std::lock_guard<std::mutex> lock(this->mutex);
+        std::copy(this->published, this->published + VISIBILITY_SLOTS * VISIBILITY_SLOTS, this->front);
+        if (this->busy)
+            return false;
+        for (size_t i = 0; i < VISIBILITY_SLOTS; i++) {
+            const AcePlayer *ply = i < world.players.size() ? world.players[i] : nullptr;
+            if (ply)
+                this->next[i] = { ply, ply->alive, ply->team, ply->e, ply->p };
+            else
+                this->next[i] = { nullptr, false, -1, Vector(), Vector() };
+        }
+        this->next_time = time;
+        this->busy = true;
+    }
+    this->wake.notify_one();
+    return true;
+}
+
+bool AceVisibility::visible(const AceWorld &world, size_t viewer, size_t target, double time) const {
+    if (viewer == target || viewer >= VISIBILITY_SLOTS || target >= VISIBILITY_SLOTS)
+        return true;
+    const AcePlayer *a = viewer < world.players.size() ? world.players[viewer] : nullptr;
+    const AcePlayer *b = target < world.players.size() ? world.players[target] : nullptr;
+    if (!a || !b || a->team == b->team)
+        return true;
+    const Pair &pair = this->front[pair_index(viewer, target)];
+    if (time - pair.checked > VISIBILITY_MAX_AGE)
+        return true;
+    return time - pair.seen <= VISIBILITY_HIDE_DELAY;
+}
+
+uint32_t AceVisibility::interest(const AceWorld &world, size_t viewer, double time, size_t tick, double near,
+                                 size_t far_interval) const {
+    const AcePlayer *from = viewer < world.players.size() ? world.players[viewer] : nullptr;
+    if (!from)
+        return 0;
+    far_interval = std::max<size_t>(far_interval, 1);
+    uint32_t mask = 0;
+    for (size_t i = 0; i < world.players.size(); i++) {
+        const AcePlayer *ply = world.players[i];
+        if (!ply || !ply->alive || ply->id < 0 || ply->id >= 32 || !this->visible(world, viewer, i, time))
+            continue;
+        const double dx = ply->p.x - from->p.x, dy = ply->p.y - from->p.y;
+        if (dx * dx + dy * dy <= near * near || (tick + ply->id) % far_interval == 0)
+            mask |= 1u << ply->id;
+    }
+    return mask;
+}
+
+void AceVisibility::work() {
+    const Pair never = { -INFINITY, -INFINITY };
+    std::unique_lock<std::mutex> lock(this->mutex);
+    while (true) {
+        this->wake.wait(lock, [this] { return this->stopping || this->busy; });
+        if (this->stopping)
+            return;
+        // a slot that changed hands or respawned starts over without results, i.e. visible
+        for (size_t i = 0; i < VISIBILITY_SLOTS; i++) {
+            if (this->next[i].ply == this->current[i].ply && (this->current[i].alive || !this->next[i].alive))
+                continue;
+            for (size_t j = 0; j < VISIBILITY_SLOTS; j++)
+                this->pairs[pair_index(i, j)] = never;
+        }
+        std::copy(this->next, this->next + VISIBILITY_SLOTS, this->current);
+        this->current_time = this->next_time;
+        lock.unlock();
+
+        this->run_pass();
+
+        lock.lock();
+        std::copy(this->pairs, this->pairs + VISIBILITY_SLOTS * VISIBILITY_SLOTS, this->published);
+        this->busy = false;
+    }
+}
+
+void AceVisibility::run_pass() {
+    constexpr size_t TOTAL = VISIBILITY_SLOTS * VISIBILITY_SLOTS;
+    size_t segments = 0, k = 0;
+    for (; k < TOTAL && segments < this->budget; k++) {
+        const size_t index = (this->cursor + k) % TOTAL;
+        const size_t i = index / VISIBILITY_SLOTS, j = index % VISIBILITY_SLOTS;
+        const Snapshot &a = this->current[i], &b = this->current[j];
+        if (i >= j || !a.alive || !b.alive || a.team == b.team)
+            continue;
+
+        Pair &pair = this->pairs[index];
+        pair.checked = this->current_time;
+        if (this->trace_pair(a, b, &segments))
+            pair.seen = this->current_time;
+    }
+    this->cursor = (this->cursor + k) % TOTAL;
+}
+
+// Either eye to the other's head, chest or feet. Sight goes both ways so the result is shared.
+bool AceVisibility::trace_pair(const Snapshot &a, const Snapshot &b, size_t *segments) const {
+    const double dx = a.p.x - b.p.x, dy = a.p.y - b.p.y;
+    if (dx * dx + dy * dy > VISIBILITY_RANGE * VISIBILITY_RANGE)
+        return false;
+
+    const Snapshot *ends[2][2] = { { &a, &b }, { &b, &a } };
+    Vector hit;
+    for (auto &end : ends) {
+        const Snapshot &from = *end[0], &to = *end[1];
+        const Vector points[] = { to.e, Vector(to.p.x, to.p.y, to.p.z + 1.0), Vector(to.p.x, to.p.y, to.p.z + 2.0) };
+        for (const Vector &point : points) {
+            (*segments)++;
+            if (!clip_segment(this->map, from.e, point, &hit))
+                return true;
+        }
+    }
+    return false;
+}
+
+struct NavPoint {
+    int x, y, z; // z of the solid voxel stood on
+};
+
+// Where players can walk, following AcePlayer::boxclipmove: a cell is the top of a solid voxel with room to at least
+// crouch above it, linked to cells in the 8 columns around it by walking, stepping up a block, jumping up two or
+// dropping down. Cells are kept per map region, and a region is rebuilt at the start of the next query once its
+// revision changes (see AceMap::region_revision), so edits cost nothing until something asks.
+// Paths are cached by their end cells and dropped once a region they go through changes.
+// Not thread safe; the batch queries split the work across the thread pool themselves.
+struct AceNavigation {
+    AceNavigation(AceMap *map, size_t capacity);
+
+    // rebuilds the regions edited since the last call, the queries below do this themselves
+    void sync();
+    // the cell under a point (the first one at or below it in its column), false if there's none
+    bool cell_below(const Vector &p, NavPoint *out);
+    // cells from the one under start to the one under goal, both included. False if there's no way there found
+    // within `max_nodes` cells searched. A `weight` above 1 trades path length for searching far fewer cells.
+    bool find_path(const Vector &start, const Vector &goal, size_t max_nodes, double weight,
+                   std::vector<NavPoint> *out);
+    void find_paths(const Vector *starts, const Vector *goals, size_t count, size_t max_nodes, double weight,
+                    std::vector<NavPoint> *out, uint8_t *found);
+    // walking cost from the closest source to each target, INFINITY if it's further than max_cost or unreachable.
+    // With `nearest`, only the targets closest to a source (anything as close as the closest one) get a cost.
+    void distances(const Vector *sources, size_t source_count, const Vector *targets, size_t count, double max_cost,
+                   bool nearest, double *out);
+    // how many cells can be walked to from p, up to `limit`. 0 if p is inside a wall or has nothing under it
+    size_t reachable(const Vector &p, size_t limit);
+
+    AceMap *map;
+    size_t capacity;
+    size_t hits, misses;
+
+private:
+    struct Cell {
+        uint8_t z, room; // free voxels right above, 255 if open to the sky
+    };
+    struct Region {
+        uint32_t revision;
+        uint16_t start[REGION_SIZE * REGION_SIZE + 1]; // cells of column c are cells[start[c]:start[c + 1]], top first
+        std::vector<Cell> cells;
+    };
+    // a cell as seen by a search: its id (see offsets) and where it is
+    struct Node {
+        uint32_t id;
+        NavPoint p;
+        const Cell *cell;
+    };
+    struct Path {
+        std::vector<NavPoint> points;
+        bool found;
+        size_t max_nodes; // a failed search might still succeed with more
+        std::vector<std::pair<uint32_t, uint32_t>> regions;
+    };
+    // per thread search state over every cell, reset by bumping the generation instead of clearing
+    struct Scratch {
+        std::vector<double> cost;
+        std::vector<uint32_t> parent, seen, closed;
+        std::vector<NavPoint> points;
+        uint32_t generation = 0;
+    };
+
+    std::vector<Region> regions;
+    // cells of region r have ids offsets[r] + their index in it, so searches can use flat arrays
+    std::vector<uint32_t> offsets;
+    std::unordered_map<uint64_t, Path> paths;
+    std::vector<Path> batch;
+
+    void build_region(size_t region);
+    const Cell *cells_of(int x, int y, size_t *count) const;
+    bool node_at(const NavPoint &p, Node *out) const;
+    bool below(const Vector &p, Node *out) const;
+    bool clear(int x, int y, int z, int height) const;
+    template <typename F> void for_links(const Node &from, F &&visit) const;
+    Scratch &scratch() const;
+    void search(const Node &start, const Node &goal, size_t max_nodes, double weight, Path *out) const;
+    const Path *find(uint64_t key, size_t max_nodes);
+    void insert(uint64_t key, Path &&path);
+};
+
+AceNavigation::AceNavigation(AceMap *map, size_t capacity) :
+    map(map), capacity(capacity), hits(0), misses(0), regions(REGIONS_X * REGIONS_Y),
+    offsets(REGIONS_X * REGIONS_Y + 1) {
+    for (size_t i = 0; i < this->regions.size(); i++)
+        this->regions[i].revision = map->region_revision(i) + 1;
+    this->sync();
+}
+
+void AceNavigation::sync() {
+    std::vector<size_t> dirty;
+    for (size_t i = 0; i < this->regions.size(); i++) {
+        if (this->regions[i].revision != this->map->region_revision(i))
+            dirty.push_back(i);
+    }
+    if (dirty.empty())
+        return;
+    thread_pool().parallel_for(dirty.size(), 16, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; i++)
+            this->build_region(dirty[i]);
+    });
+    for (size_t i = 0; i < this->regions.size(); i++)
+        this->offsets[i + 1] = this->offsets[i] + this->regions[i].cells.size();
+}
+
+void AceNavigation::build_region(size_t index) {
+    Region &region = this->regions[index];
+    region.revision = this->map->region_revision(index);
+    region.cells.clear();
+    const int x0 = (index % REGIONS_X) * REGION_SIZE, y0 = (index / REGIONS_X) * REGION_SIZE;
+    for (size_t c = 0; c < REGION_SIZE * REGION_SIZE; c++) {
+        region.start[c] = region.cells.size();
+        const int x = x0 + c % REGION_SIZE, y = y0 + c / REGION_SIZE;
+        int room = 255;
+        // clipbox is solid from MAP_Z down, so every column ends on a cell
+        for (int z = 0; z <= MAP_Z; z++) {
+            if (clipbox(this->map, x, y, z)) {
+                if (room >= NAV_CROUCH_ROOM)
+                    region.cells.push_back({ uint8_t(z), uint8_t(room) });
+                room = 0;
+            }
+            else
+                room = std::min(room + 1, 255);
+        }
+    }
+    region.start[REGION_SIZE * REGION_SIZE] = region.cells.size();
+}
+
+const AceNavigation::Cell *AceNavigation::cells_of(int x, int y, size_t *count) const {
+    const Region &region = this->regions[AceMap::region_of(x, y)];
+    const size_t c = (x % REGION_SIZE) + (y % REGION_SIZE) * REGION_SIZE;
+    *count = region.start[c + 1] - region.start[c];
+    return region.cells.data() + region.start[c];
+}
+
+bool AceNavigation::node_at(const NavPoint &p, Node *out) const {
+    const size_t region = AceMap::region_of(p.x, p.y);
+    size_t count;
+    const Cell *cells = this->cells_of(p.x, p.y, &count);
+    for (size_t i = 0; i < count; i++) {
+        if (cells[i].z == p.z) {
+            *out = { uint32_t(this->offsets[region] + (&cells[i] - this->regions[region].cells.data())), p, &cells[i] };
+            return true;
+        }
+    }
+    return false;
+}
+
+bool AceNavigation::below(const Vector &p, Node *out) const {
+    const int x = floor(p.x), y = floor(p.y);
+    if (x < 0 || y < 0 || x >= MAP_X || y >= MAP_Y)
+        return false;
+    size_t count;
+    const Cell *cells = this->cells_of(x, y, &count);
+    for (size_t i = 0; i < count; i++) {
+        if (cells[i].z >= p.z)
+            return this->node_at({ x, y, cells[i].z }, out);
+    }
+    return false;
+}
+
+// nothing solid in the `height` voxels above z
+bool AceNavigation::clear(int x, int y, int z, int height) const {
+    for (int k = 1; k <= height; k++) {
+        if (clipbox(this->map, x, y, z - k))
+            return false;
+    }
+    return true;
+}
+
+// calls visit(node, cost) for every cell a player standing on `from` can get to in one move
+template <typename F>
+void AceNavigation::for_links(const Node &from, F &&visit) const {
+    static const int directions[8][2] = { { 1, 0 }, { -1, 0 }, { 0, 1 }, { 0, -1 },
+                                          { 1, 1 }, { 1, -1 }, { -1, 1 }, { -1, -1 } };
+    const Cell &cell = *from.cell;
+    // how tall the player is here, crouching if there's no room to stand
+    const int height = std::min<int>(cell.room, NAV_STAND_ROOM);
+    for (int d = 0; d < 8; d++) {
+        const int x = from.p.x + directions[d][0], y = from.p.y + directions[d][1];
+        if (x < 0 || y < 0 || x >= MAP_X || y >= MAP_Y)
+            continue;
+        // diagonals only go flat, and can't cut corners
+        const bool diagonal = d >= 4;
+        if (diagonal && (!this->clear(from.p.x, y, from.p.z, height) || !this->clear(x, from.p.y, from.p.z, height)))
+            continue;
+
+        const size_t region = AceMap::region_of(x, y);
+        const Cell *first = this->regions[region].cells.data();
+        size_t count;
+        const Cell *cells = this->cells_of(x, y, &count);
+        for (size_t i = 0; i < count; i++) {
+            const Cell &to = cells[i];
+            const int drop = int(to.z) - from.p.z;
+            double cost;
+            if (drop == 0)
+                cost = to.room < NAV_STAND_ROOM ? NAV_CROUCH_COST : 1.0;
+            else if (diagonal)
+                continue;
+            // boxclipmove climbs a block when walking into it standing up, jumping makes that two
+            else if (drop == -1 && cell.room >= NAV_STAND_ROOM && to.room >= NAV_STAND_ROOM)
+                cost = NAV_CLIMB_COST;
+            else if (drop == -2 && cell.room >= NAV_JUMP_ROOM && to.room >= NAV_STAND_ROOM)
+                cost = NAV_JUMP_COST;
+            // the column dropped down has to fit the player from where it starts
+            else if (drop > 0 && drop <= NAV_MAX_DROP && to.room >= drop + height)
+                cost = 1.0 + drop * NAV_DROP_COST;
+            else
+                continue;
+
+            if (to.z >= MAP_Z - 1)
+                cost *= NAV_WATER_COST;
+            const Node next = { uint32_t(this->offsets[region] + (&to - first)), { x, y, to.z }, &to };
+            visit(next, diagonal ? cost * M_SQRT2 : cost);
+        }
+    }
+}
+
+AceNavigation::Scratch &AceNavigation::scratch() const {
+    thread_local Scratch scratch;
+    const size_t total = this->offsets.back();
+    if (scratch.seen.size() < total) {
+        scratch.cost.resize(total);
+        scratch.parent.resize(total);
+        scratch.seen.resize(total);
+        scratch.closed.resize(total);
+        scratch.points.resize(total);
+    }
+    if (++scratch.generation == 0) {
+        std::fill(scratch.seen.begin(), scratch.seen.end(), 0);
+        std::fill(scratch.closed.begin(), scratch.closed.end(), 0);
+        scratch.generation = 1;
+    }
+    return scratch;
+}
+
+// A* over the cells, with the octile distance as heuristic since every link moves exactly one column
+void AceNavigation::search(const Node &start, const Node &goal, size_t max_nodes, double weight, Path *out) const {
+    auto heuristic = [&goal, weight](const NavPoint &p) {
+        const double dx = std::abs(p.x - goal.p.x), dy = std::abs(p.y - goal.p.y);
+        return (std::max(dx, dy) + (M_SQRT2 - 1.0) * std::min(dx, dy)) * weight;
+    };
+    using Open = std::pair<double, uint32_t>;
+    std::priority_queue<Open, std::vector<Open>, std::greater<Open>> open;
+    Scratch &s = this->scratch();
+    const uint32_t generation = s.generation;
+
+    out->points.clear();
+    out->regions.clear();
+    out->found = false;
+    out->max_nodes = max_nodes;
+    std::vector<uint8_t> touched(REGIONS_X * REGIONS_Y);
+    auto touch = [&](int x, int y) {
+        const size_t region = AceMap::region_of(x, y);
+        if (!touched[region]) {
+            touched[region] = true;
+            out->regions.emplace_back(region, this->map->region_revision(region));
+        }
+    };
+
+    s.cost[start.id] = 0.0;
+    s.parent[start.id] = start.id;
+    s.points[start.id] = start.p;
+    s.seen[start.id] = generation;
+    open.push({ heuristic(start.p), start.id });
+    size_t expanded = 0;
+    while (!open.empty() && expanded < max_nodes) {
+        const uint32_t id = open.top().second;
+        open.pop();
+        if (s.closed[id] == generation)
+            continue;
+        s.closed[id] = generation;
+        expanded++;
+
+        if (id == goal.id) {
+            out->found = true;
+            for (uint32_t k = id;; k = s.parent[k]) {
+                out->points.push_back(s.points[k]);
+                if (k == start.id)
+                    break;
+            }
+            std::reverse(out->points.begin(), out->points.end());
+            // a path only depends on the columns it goes through and the corners it goes past
+            std::fill(touched.begin(), touched.end(), 0);
+            out->regions.clear();
+            for (size_t i = 0; i < out->points.size(); i++) {
+                const NavPoint &p = out->points[i];
+                touch(p.x, p.y);
+                if (i) {
+                    touch(p.x, out->points[i - 1].y);
+                    touch(out->points[i - 1].x, p.y);
+                }
+            }
+            return;
+        }
+        // a failed search depends on everything it looked at
+        touch(s.points[id].x, s.points[id].y);
+
+        Node node;
+        if (!this->node_at(s.points[id], &node))
+            continue;
+        const double g = s.cost[id];
+        this->for_links(node, [&](const Node &next, double cost) {
+            if (s.seen[next.id] == generation && (s.closed[next.id] == generation || g + cost >= s.cost[next.id]))
+                return;
+            s.seen[next.id] = generation;
+            s.cost[next.id] = g + cost;
+            s.parent[next.id] = id;
+            s.points[next.id] = next.p;
+            open.push({ g + cost + heuristic(next.p), next.id });
+        });
+    }
+}
+
+const AceNavigation::Path *AceNavigation::find(uint64_t key, size_t max_nodes) {
+    auto it = this->paths.find(key);
+    if (it == this->paths.end())
+        return nullptr;
+    bool valid = it->second.found || it->second.max_nodes >= max_nodes;
+    for (const auto &region : it->second.regions)
+        valid = valid && this->map->region_revision(region.first) == region.second;
+    if (!valid) {
+        this->paths.erase(it);
+        return nullptr;
+    }
+    return &it->second;
+}
+
+void AceNavigation::insert(uint64_t key, Path &&path) {
+    if (this->paths.size() >= std::max<size_t>(this->capacity, 1) && !this->paths.count(key))
+        this->paths.erase(this->paths.begin());
+    this->paths[key] = std::move(path);
+}
+
+// cells are looked up by position, their ids change whenever a region before them is rebuilt
+static uint64_t path_key(const NavPoint &start, const NavPoint &goal) {
+    auto pack = [](const NavPoint &p) { return uint64_t(p.x | p.y << 9 | p.z << 18); };
+    return pack(start) << 32 | pack(goal);
+}
+
+bool AceNavigation::cell_below(const Vector &p, NavPoint *out) {
+    this->sync();
+    Node node;
+    if (!this->below(p, &node))
+        return false;
+    *out = node.p;
+    return true;
+}
+
+bool AceNavigation::find_path(const Vector &start, const Vector &goal, size_t max_nodes, double weight,
+                              std::vector<NavPoint> *out) {
+    uint8_t found;
+    this->find_paths(&start, &goal, 1, max_nodes, weight, out, &found);
+    return found;
+}
+
+void AceNavigation::find_paths(const Vector *starts, const Vector *goals, size_t count, size_t max_nodes,
+                               double weight, std::vector<NavPoint> *out, uint8_t *found) {
+    this->sync();
+    this->batch.resize(count);
+    std::vector<Node> ends(count * 2);
+    std::vector<size_t> missing;
+    for (size_t i = 0; i < count; i++) {
+        out[i].clear();
+        found[i] = false;
+        if (!this->below(starts[i], &ends[i * 2]) || !this->below(goals[i], &ends[i * 2 + 1]))
+            continue;
+        if (const Path *path = this->find(path_key(ends[i * 2].p, ends[i * 2 + 1].p), max_nodes)) {
+            this->hits++;
+            out[i] = path->points;
+            found[i] = path->found;
+        }
+        else
+            missing.push_back(i);
+    }
+    this->misses += missing.size();
+
+    thread_pool().parallel_for(missing.size(), 1, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; i++) {
+            const size_t k = missing[i];
+            this->search(ends[k * 2], ends[k * 2 + 1], max_nodes, std::max(weight, 1.0), &this->batch[k]);
+        }
+    });
+    for (size_t k : missing) {
+        out[k] = this->batch[k].points;
+        found[k] = this->batch[k].found;
+        this->insert(path_key(ends[k * 2].p, ends[k * 2 + 1].p), std::move(this->batch[k]));
+    }
+}
+
+// Dijkstra out from every source at once, until all the targets are reached
+void AceNavigation::distances(const Vector *sources, size_t source_count, const Vector *targets, size_t count,
+                              double max_cost, bool nearest, double *out) {
+    this->sync();
+    using Open = std::pair<double, uint32_t>;
+    std::priority_queue<Open, std::vector<Open>, std::greater<Open>> open;
+    Scratch &s = this->scratch();
+    const uint32_t generation = s.generation;
+
+    // targets not reached yet are marked closed ahead of time, they're only ever compared against the generation
+    std::vector<Node> ends(count);
+    std::vector<uint8_t> valid(count);
+    size_t waiting = 0;
+    for (size_t i = 0; i < count; i++) {
+        out[i] = INFINITY;
+        valid[i] = this->below(targets[i], &ends[i]);
+        if (valid[i] && s.closed[ends[i].id] != generation + 1) {
+            s.closed[ends[i].id] = generation + 1;
+            waiting++;
+        }
+    }
+    Node node;
+    for (size_t i = 0; i < source_count; i++) {
+        if (this->below(sources[i], &node) && s.seen[node.id] != generation) {
+            s.seen[node.id] = generation;
+            s.cost[node.id] = 0.0;
+            s.points[node.id] = node.p;
+            open.push({ 0.0, node.id });
+        }
+    }
+
+    while (!open.empty() && waiting) {
+        const double g = open.top().first;
+        const uint32_t id = open.top().second;
+        open.pop();
+        if (g > s.cost[id] || s.closed[id] == generation)
+            continue;
+        if (g > max_cost)
+            break;
+        if (s.closed[id] == generation + 1) {
+            waiting--;
+            if (nearest)
+                max_cost = g;
+        }
+        s.closed[id] = generation;
+
+        if (!this->node_at(s.points[id], &node))
+            continue;
+        this->for_links(node, [&](const Node &next, double cost) {
+            if (s.seen[next.id] == generation && s.cost[next.id] <= g + cost)
+                return;
+            s.seen[next.id] = generation;
+            s.cost[next.id] = g + cost;
+            s.points[next.id] = next.p;
+            open.push({ g + cost, next.id });
+        });
+    }
+
+    for (size_t i = 0; i < count; i++) {
+        const uint32_t id = ends[i].id;
+        if (valid[i] && s.closed[id] == generation && s.cost[id] <= max_cost)
+            out[i] = s.cost[id];
+    }
+    // the next generation would see targets never reached as closed
+    for (size_t i = 0; i < count; i++) {
+        if (valid[i] && s.closed[ends[i].id] == generation + 1)
+            s.closed[ends[i].id] = 0;
+    }
+}
+
+size_t AceNavigation::reachable(const Vector &p, size_t limit) {
+    this->sync();
+    Node start;
+    if (clipbox(this->map, p.x, p.y, p.z) || !this->below(p, &start))
+        return 0;
+
+    Scratch &s = this->scratch();
+    std::vector<Node> queue = { start };
+    s.seen[start.id] = s.generation;
+    for (size_t i = 0; i < queue.size() && queue.size() < limit; i++) {
+        const Node node = queue[i]; // the queue grows under it
+        this->for_links(node, [&](const Node &next, double) {
+            if (s.seen[next.id] != s.generation) {
+                s.seen[next.id] = s.generation;
+                queue.push_back(next);
+            }
+        });
+    }
+    return std::min(queue.size(), limit);
+}
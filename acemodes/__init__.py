@@ -1,5 +1,5 @@
 import importlib
-from typing import Tuple
+from typing import Optional, Tuple
 
 from acelib import constants
 from aceserver import protocol, connection, types, util
@@ -75,6 +75,10 @@ class GameMode:
         x, y, z = self.get_random_pos(player.team)
         return x + 0.5, y + 0.5, z - 2
 
+    def get_objective(self, player: 'connection.ServerConnection') -> Optional[Tuple[float, float, float]]:
+        # Where a bot on the player's side should be heading right now, None if it's free to roam (see bots.BotManager)
+        return None
+
     def get_random_pos(self, team) -> Tuple[int, int, int]:
         sections = self.protocol.map.width() // 8
         offset = team.id * (self.protocol.map.width() - (sections * 2))
@@ -92,6 +92,17 @@ The first team to retrieve their enemies intel {self.score_limit} times wins.
             intel.set_position(*player.position.xyz)
             self.protocol.broadcast_hud_message(f"{player} dropped the {intel.team} Intel")
 
+    def get_objective(self, player: ServerConnection):
+        enemy_intel = self.intels[player.team.other]
+        if enemy_intel.carrier is player:
+            return self.cps[player.team].position.xyz
+        own_intel = self.intels[player.team]
+        if own_intel.carrier is not None:
+            return own_intel.carrier.position.xyz
+        if enemy_intel.carrier is None:
+            return enemy_intel.position.xyz
+        return None
+
     def reset_intel(self, intel):
         intel.set_carrier(None)
         intel.set_position(*self.get_random_pos(intel.team))
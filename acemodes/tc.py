@@ -2,6 +2,7 @@ import asyncio
 import random
 from typing import *
 
+from acelib import world
 from acemodes import GameMode
 from aceserver import types, util
 from aceserver.protocol import ServerProtocol
@@ -13,6 +14,8 @@ DEFAULT_CAPTURE_DISTANCE = 16
 DEFAULT_CAPTURE_RATE = 0.05
 DEFAULT_TERRITORY_COUNT = 7
 DEFAULT_SPAWN_RADIUS = 32
+# tries at finding a spawn location players aren't boxed in at
+SPAWN_ATTEMPTS = 8
 
 
 class Territory(types.CommandPost):
@@ -23,40 +26,50 @@ class Territory(types.CommandPost):
         super().__init__(*args, **kwargs)
         self._progress = float(self.team.id) if self.team is not None else 0.5
         self._rate = 0
-        self.players = []
 
         self.capture_radius = capture_radius or DEFAULT_CAPTURE_DISTANCE
         self.capture_rate = capture_rate or DEFAULT_CAPTURE_RATE
+        # whether anyone was on it as of the last update
+        self.occupied = False
+        # the world tells us who walks in and out of capture range and keeps count per team
+        self.wo.radius = 0
+        self.trigger = world.Trigger.sphere(*self.position.xyz, self.capture_radius)
+        self.protocol.world.add(self.trigger, self)
+
+    @property
+    def players(self) -> List[ServerConnection]:
+        return self.trigger.occupants
 
     def update(self, dt):
         if self.destroyed:
             return
-        self.do_gravity()
-        self.get_players()
-
-        self.progress += self.rate * dt
 
-    def get_players(self):
-        old = self.players.copy()
-        self.players.clear()
-        for ply in self.protocol.players.values():
-            if ply.dead: continue
+        rate = self.rate
+        # checked once all of the tick's ENTERED/LEFT events are in, so players walking onto it together count too
+        occupied = len(self.trigger) > 0
+        if occupied and not self.occupied:
+            capturing = self.protocol.team1 if rate < 0 else self.protocol.team2
+            self.protocol.loop.create_task(self.on_start_capture(self, capturing))
+        self.occupied = occupied
+        self.progress += rate * dt
 
-            dist = self.position.sq_distance(ply.position)
-            if dist <= self.capture_radius ** 2:
-                self.players.append(ply)
-
-        if self.players != old:
-            # Stop showing the progress bar to players that left
-            left = set(old) - set(self.players)
+    def on_world_event(self, event: world.WORLD_EVENT, value):
+        if self.destroyed:
+            return
+        if event == world.WORLD_EVENT.ENTERED:
+            self.send_progress_bar(self._rate, connections=(value,))
+        elif event == world.WORLD_EVENT.LEFT:
             progress_bar.stopped = True
-            self.protocol.broadcast_loader(progress_bar, connections=left)
+            value.send_loader(progress_bar)
+        else:
+            if event == world.WORLD_EVENT.MOVED:
+                self.trigger.set_position(*self.position.xyz)
+            super().on_world_event(event, value)
 
-            if not old and self.players:
-                # there werent any players on it last update but there are now
-                # TODO this isnt the best way
-                capturing = self.protocol.team1 if self.rate < 0 else self.protocol.team2
-                self.protocol.loop.create_task(self.on_start_capture(self, capturing))
+    def destroy(self):
+        if not self.destroyed:
+            self.protocol.world.remove(self.trigger)
+        super().destroy()
 
     @property
     def progress(self):
@@ -88,24 +101,30 @@ class Territory(types.CommandPost):
 
     @property
     def rate(self):
-        rate = sum(-1 if ply.team is self.protocol.team1 else 1 for ply in self.players) * self.capture_rate
+        team1 = self.trigger.count(self.protocol.team1.id)
+        team2 = self.trigger.count(self.protocol.team2.id)
+        rate = (team2 - team1) * self.capture_rate
         if rate != self._rate:
             self.send_progress_bar(rate)
         self._rate = rate
         return rate
 
-    def send_progress_bar(self, rate):
+    def send_progress_bar(self, rate, connections=None):
         progress_bar.set(self._progress, rate)
         progress_bar.color1.rgb = self.protocol.team1.color
         progress_bar.color2.rgb = self.protocol.team2.color
-        self.protocol.broadcast_loader(progress_bar, connections=self.players)
+        self.protocol.broadcast_loader(progress_bar, connections=self.players if connections is None else connections)
 
     def get_spawn_location(self, radius=DEFAULT_SPAWN_RADIUS):
         x1 = max(0, self.position.x - radius)
         y1 = max(0, self.position.y - radius)
         x2 = min(512, self.position.x + radius)
         y2 = min(512, self.position.y + radius)
-        return self.protocol.map.get_random_pos(x1, y1, x2, y2)
+        for _ in range(SPAWN_ATTEMPTS):
+            x, y, z = self.protocol.map.get_random_pos(x1, y1, x2, y2)
+            if not self.protocol.nav.is_stuck((x + 0.5, y + 0.5, z - 2)):
+                break
+        return x, y, z
 
 
 class TC(GameMode):
@@ -134,6 +153,7 @@ First team to capture all {self.score_limit} territories win.
         super().start()
 
         self.territories: List[Territory] = []
+        self.frontline: Dict[types.Team, Territory] = {}
         self.spawn_ents()
         self.update_scores()
 
@@ -166,8 +186,20 @@ First team to capture all {self.score_limit} territories win.
     def update_scores(self):
         self.protocol.team1.score = len([t for t in self.territories if t.team is self.protocol.team1])
         self.protocol.team2.score = len([t for t in self.territories if t.team is self.protocol.team2])
+        self.frontline = {team: self.find_frontline(team) for team in (self.protocol.team1, self.protocol.team2)}
         self.check_win()
 
+    def find_frontline(self, team: types.Team) -> Optional[Territory]:
+        # The territory of the team's that's the shortest walk from any it doesn't hold.
+        # Walls built later aren't taken into account until the next capture.
+        own = [t for t in self.territories if t.team is team]
+        others = [t for t in self.territories if t.team is not team]
+        if not own or not others:
+            return None
+        costs = self.protocol.nav.distances([t.position for t in others], [t.position for t in own], nearest=True)
+        cost, territory = min(zip(costs, own), key=lambda pair: pair[0])
+        return territory if cost != float("inf") else None
+
     async def on_territory_captured(self, territory: Territory, capturing: types.Team):
         grid = self.protocol.map.to_grid(territory.position.x, territory.position.y)
         msg = f"{capturing.name} team captured {grid}" if capturing is not None else f"{grid} has been neutralized"
@@ -180,9 +212,16 @@ First team to capture all {self.score_limit} territories win.
         grid = self.protocol.map.to_grid(territory.position.x, territory.position.y)
         self.protocol.broadcast_hud_message(f"{capturing.name} team is capturing {grid}")
 
+    def get_objective(self, player: ServerConnection):
+        targets = [t for t in self.territories if t.team is not player.team]
+        if not targets:
+            return None
+        return min(targets, key=lambda t: t.position.sq_distance(player.position)).position.xyz
+
     def get_spawn_point(self, player: ServerConnection) -> Tuple[int, int, int]:
-        # TODO: maybe choose the controlled Territory closest to the enemy side?
-        t: Territory = random.choice([t for t in self.territories if t.team is player.team])
+        t: Territory = self.frontline.get(player.team)
+        if t is None or t.team is not player.team:
+            t = random.choice([t for t in self.territories if t.team is player.team])
         x, y, z = t.get_spawn_location()
         return x + 0.5, y + 0.5, z - 2
 
@@ -30,6 +30,11 @@ class EssentialsScript(Script):
     def kill(self, connection: ServerConnection):
         connection.hurt(1000)
 
+    @commands.command()
+    def unstuck(self, connection: ServerConnection):
+        if connection.hp > 0 and self.protocol.nav.is_stuck(connection.position):
+            connection.set_position(*self.protocol.mode.get_spawn_point(connection))
+
     @commands.command(admin=True)
     def restock(self, connection: ServerConnection):
         connection.restock()
@@ -74,6 +79,23 @@ class EssentialsScript(Script):
             obj.fuse = eta
         obj.broadcast_item()
 
+    @commands.command(admin=True)
+    def bots(self, connection: ServerConnection, count: int):
+        # keep the server topped up to `count` players with bots, always leaving a slot for someone to join
+        self.protocol.bots.quota = max(0, min(count, self.protocol.max_players - 1))
+        self.protocol.bots.balance()
+
+    @commands.command(admin=True)
+    def movement(self, connection: ServerConnection, other: ServerConnection):
+        if other.wo is None:
+            connection.send_server_message(f"{other.name} isn't in the game yet")
+            return
+        stats = other.wo.movement_stats
+        connection.send_server_message(
+            f"{other.name}: {stats['corrections']}/{stats['reports']} corrected, "
+            f"error {stats['mean_error']:.2f} (max {stats['max_error']:.2f}), "
+            f"ahead {stats['divergence']:.2f} (max {stats['max_divergence']:.2f})")
+
     @commands.command(admin=True)
     def fog(self, connection: ServerConnection, r: int, g: int, b: int):
         self.protocol.set_fog_color(r, g, b)
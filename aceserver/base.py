@@ -20,7 +20,7 @@ class BaseConnection:
 
 class BaseProtocol:
     def __init__(self, loop: asyncio.AbstractEventLoop, interface: str="", port: int=32887, max_connections: int=32,
-                 connection_factory=BaseConnection):
+                 connection_factory=BaseConnection, tick_rate: float=30, max_catchup: int=5):
         self.loop: asyncio.AbstractEventLoop = loop
         self.host: enet.Host = enet.Host(enet.Address(interface, port), max_connections, 1, 0, 0)
         self.host.compress_with_range_coder()
@@ -32,24 +32,43 @@ class BaseProtocol:
         self.time = 0
         self.running = True
 
+        # Simulation always advances in steps of exactly 1 / tick_rate.
+        self.tick_rate = tick_rate
+        # If we fall behind by more than this many ticks, the extra ticks are dropped instead of being caught up on.
+        self.max_catchup = max_catchup
+        self.ticks = 0
+        self.missed_ticks = 0
+
     async def run(self):
         ip, port = util.get_ip(), self.host.address.port
         print(f"Running server on {ip}:{port}")
         print(f"Server identifier is {util.get_identifier(ip, port)}")
 
-        last: float = self.loop.time()
+        step: float = 1 / self.tick_rate
+        next_tick: float = self.loop.time()
         while self.running:
-            now = self.loop.time()
-            dt = now - last
-            self.time += dt
-            try:
-                self.update(dt)
-            except Exception:
-                print("Ignoring exception in update(): ")
-                traceback.print_exc()
-            await asyncio.sleep(1 / 30)
-            # print(self.time, dt, 1 / dt)
-            last = now
+            # Run every tick whose deadline has passed, so the tick rate doesn't drift with update time or loop jitter.
+            due = int((self.loop.time() - next_tick) // step) + 1
+            if due > self.max_catchup:
+                self.on_missed_ticks(due - self.max_catchup)
+                next_tick += (due - self.max_catchup) * step
+                due = self.max_catchup
+
+            for _ in range(due):
+                self.time += step
+                self.ticks += 1
+                try:
+                    self.update(step)
+                except Exception:
+                    print("Ignoring exception in update(): ")
+                    traceback.print_exc()
+                next_tick += step
+
+            await asyncio.sleep(max(0.0, next_tick - self.loop.time()))
+
+    def on_missed_ticks(self, missed: int):
+        self.missed_ticks += missed
+        print(f"Can't keep up! Dropped {missed} ticks ({self.missed_ticks} total)")
 
     def stop(self):
         self.running = False
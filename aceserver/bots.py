@@ -0,0 +1,316 @@
+import math
+import random
+from typing import *
+
+from acelib import packets
+from acelib.constants import *
+from aceserver import connection, protocol, types, weapons
+from aceserver.loaders import input_data, weapon_input
+
+# how often a bot looks around and decides what to do, physics still runs at the tick rate
+DEFAULT_DECISION_RATE = 10
+# paths searched per tick at most, the rest wait for the next one
+DEFAULT_PATHS_PER_TICK = 2
+# cells a path search gives up after, and how much longer than the shortest one a path may be to find it quicker
+PATH_SEARCH_LIMIT = 20000
+PATH_WEIGHT = 2.0
+# enemies further than this are ignored, fog is at 128
+ENGAGE_DISTANCE = 96
+# close enough to stop walking at an enemy
+HOLD_DISTANCE = 16
+# an objective counts as reached this close
+GOAL_DISTANCE = 4
+# a goal that moved this far gets a new path
+REPATH_DISTANCE = 8
+# seconds without getting a block closer before a bot tries something else
+STUCK_TIME = 2.0
+
+
+class BotPeer:
+    # Stands in for the enet.Peer a bot doesn't have. Anything sent to it goes nowhere.
+    roundTripTime = 0
+
+    def send(self, channel: int, packet):
+        pass
+
+    def disconnect(self, reason: int=0):
+        pass
+
+
+class BotConnection(connection.ServerConnection):
+    # A player run by the server. It takes a player id and goes through spawning, hits and kills like any other
+    # connection, but nothing is ever encoded for it and it's only in `protocol.players`, not `protocol.connections`.
+    # BotManager does its thinking.
+    def __init__(self, protocol: 'protocol.ServerProtocol', name: str, team: types.Team, weapon: WEAPON=WEAPON.SEMI):
+        super().__init__(protocol, BotPeer())
+        self.id = protocol.player_ids.pop()
+        self.name = self.validate_name(name)
+        self.team = team
+        self.weapon = weapons.WEAPONS[weapon](self)
+
+        self.target: Optional[connection.ServerConnection] = None
+        self.goal: Optional[Tuple[float, float, float]] = None
+        self.path: Optional[List[Tuple[int, int, int]]] = None
+        self.path_goal: Optional[Tuple[float, float, float]] = None
+        self.path_index = 0
+        self.wants_path = False
+        self.next_decision = protocol.time
+        self.progress_time = protocol.time
+        self.progress_distance = math.inf
+
+    def join(self):
+        self.protocol.loop.create_task(self.on_player_join(self))
+        self.spawn()
+
+    def disconnect(self, reason: DISCONNECT=DISCONNECT.UNDEFINED):
+        respawn_task = self.store.pop("respawn_task", None)
+        if respawn_task is not None:
+            respawn_task.cancel()
+        # gone right away rather than once the leave hook gets to run, so nothing it queued or that was queued on it
+        # this tick gets traced, and the manager stops counting it whoever disconnected it
+        if self in self.protocol.bots.bots:
+            self.protocol.bots.bots.remove(self)
+        self.protocol.drop_hits(self)
+        if self.wo is not None:
+            self.protocol.world.remove(self.wo)
+            self.wo = None
+        self.on_disconnect()
+
+    def send_loader(self, loader: packets.Loader, flags=None):
+        pass
+
+    def _send_loader(self, writer, flags=None):
+        pass
+
+    def spawn(self, x: float=None, y: float=None, z: float=None):
+        super().spawn(x, y, z)
+        self.target = None
+        self.path = None
+        self.wants_path = True
+        self.progress_time = self.protocol.time
+        self.progress_distance = math.inf
+
+    def update(self, dt):
+        if self.dead: return
+
+        ammo = self.tool.primary_ammo
+        super().update(dt)
+        # Tool.update fires at the weapon's rate while primary is held, every shot is traced like a reported hit.
+        # A bot doesn't claim a part, the trace decides where (and whether) it hit
+        if self.tool_type == TOOL.WEAPON and self.tool.primary_ammo < ammo and self.target is not None \
+                and not self.target.dead:
+            self.protocol.queue_hit(self, self.target, None, self.eye, self.tool.hit_spread)
+        if self.tool_type == TOOL.WEAPON and not self.tool.primary_ammo:
+            self.set_firing(False)
+            self.tool.reload()
+
+    def set_inputs(self, up: bool, jump: bool=False):
+        # InputData only goes out when something changed, so clients can animate the bot
+        if (self.wo.mf, self.wo.jump) == (up, jump):
+            return
+        self.wo.set_walk(up, False, False, False)
+        self.wo.set_animation(jump, False, False, False)
+        input_data.player_id = self.id
+        input_data.up, input_data.down, input_data.left, input_data.right = up, False, False, False
+        input_data.jump, input_data.crouch, input_data.sneak, input_data.sprint = jump, False, False, False
+        self.protocol.broadcast_loader(input_data)
+
+    def set_firing(self, primary: bool):
+        if self.tool.primary == primary:
+            return
+        primary = self.tool.set_primary(primary)
+        self.wo.set_fire(primary, False)
+        weapon_input.player_id = self.id
+        weapon_input.primary = primary
+        weapon_input.secondary = False
+        self.protocol.broadcast_loader(weapon_input)
+
+    def look_at(self, x: float, y: float, z: float, error: float=0.0):
+        eye = self.eye
+        dx, dy, dz = x - eye.x, y - eye.y, z - eye.z
+        if error:
+            dx += random.gauss(0, error)
+            dy += random.gauss(0, error)
+            dz += random.gauss(0, error)
+        length = math.sqrt(dx * dx + dy * dy + dz * dz)
+        if length > 1e-6:
+            self.wo.set_orientation(dx / length, dy / length, dz / length)
+
+
+class BotManager:
+    # Runs every bot. Each tick only the bots whose turn it is decide anything, and what they need from the world
+    # (who they can see, paths) is looked up for all of them at once.
+    def __init__(self, protocol: 'protocol.ServerProtocol'):
+        self.protocol = protocol
+        self.bots: List[BotConnection] = []
+        # bots are added while there are fewer players than this, and leave as people join
+        self.quota: int = protocol.config.get("bots", 0)
+        self.decision_rate: float = protocol.config.get("bot_decision_rate", DEFAULT_DECISION_RATE)
+        self.paths_per_tick: int = protocol.config.get("bot_paths_per_tick", DEFAULT_PATHS_PER_TICK)
+        # 0 sprays, 1 never misses
+        self.skill: float = protocol.config.get("bot_skill", 0.5)
+        self.next_balance = 0
+        self.count = 0
+
+    def add(self, team: types.Team=None, weapon: WEAPON=None) -> Optional[BotConnection]:
+        # the last free id is left for whoever connects next, or bots could keep everyone out for good
+        if len(self.protocol.player_ids.ids) <= 1:
+            return None
+        if team is None:
+            # bots only show up in protocol.players once their join hook ran
+            players = set(self.protocol.players.values()).union(self.bots)
+            team1 = sum(1 for player in players if player.team is self.protocol.team1)
+            team2 = sum(1 for player in players if player.team is self.protocol.team2)
+            team = self.protocol.team1 if team1 <= team2 else self.protocol.team2
+        if weapon is None:
+            weapon = random.choice((WEAPON.SEMI, WEAPON.SMG, WEAPON.SHOTGUN))
+
+        self.count += 1
+        bot = BotConnection(self.protocol, f"Bot{self.count}", team, weapon)
+        # staggered so the bots don't all decide on the same tick
+        bot.next_decision = self.protocol.time + random.random() / self.decision_rate
+        self.bots.append(bot)
+        bot.join()
+        return bot
+
+    def remove(self, bot: BotConnection):
+        # takes itself off self.bots
+        bot.disconnect()
+
+    def balance(self):
+        # bots only show up in protocol.players once their join hook ran, so they're told apart rather than counted
+        humans = sum(1 for player in self.protocol.players.values() if not isinstance(player, BotConnection))
+        wanted = max(0, self.quota - humans)
+        while len(self.bots) < wanted and self.add():
+            pass
+        while len(self.bots) > wanted:
+            self.remove(self.bots[-1])
+        # a human may have taken the last free id since. A bot's id comes back once its leave hook ran, so one goes
+        # at a time
+        if self.bots and not self.protocol.player_ids.ids:
+            self.remove(self.bots[-1])
+
+    def update(self, dt: float):
+        if self.protocol.time >= self.next_balance:
+            self.next_balance = self.protocol.time + 1
+            self.balance()
+
+        time = self.protocol.time
+        deciding = [bot for bot in self.bots if bot.next_decision <= time and not bot.dead]
+        if not deciding:
+            return
+        for bot in deciding:
+            bot.next_decision = max(bot.next_decision + 1 / self.decision_rate, time)
+
+        self.perceive(deciding)
+        self.plan_paths(deciding)
+        for bot in deciding:
+            self.decide(bot)
+
+    def perceive(self, bots: List[BotConnection]):
+        # the visibility matrix is already traced off the main thread, looking it up is cheap
+        visibility = self.protocol.visibility
+        for bot in bots:
+            best, best_distance = None, ENGAGE_DISTANCE
+            for other in visibility.visible_to(bot.wo):
+                if other.team is bot.team or other.dead:
+                    continue
+                distance = other.position.distance(bot.position)
+                if distance < best_distance:
+                    best, best_distance = other, distance
+            bot.target = best
+
+            goal = self.protocol.mode.get_objective(bot)
+            if goal is None and bot.goal is None:
+                # nothing in particular to do, go look for trouble on the other side
+                x, y, z = self.protocol.mode.get_random_pos(bot.team.other)
+                goal = x + 0.5, y + 0.5, z
+            if goal is not None and (bot.goal is None or _distance(goal, bot.goal) > REPATH_DISTANCE):
+                bot.goal = goal
+                bot.wants_path = True
+
+    def plan_paths(self, bots: List[BotConnection]):
+        waiting = [bot for bot in bots if bot.wants_path and bot.goal is not None][:self.paths_per_tick]
+        if not waiting:
+            return
+        paths = self.protocol.nav.find_paths([bot.position for bot in waiting], [bot.goal for bot in waiting],
+                                             PATH_SEARCH_LIMIT, PATH_WEIGHT)
+        for bot, path in zip(waiting, paths):
+            bot.path = path
+            bot.path_goal = bot.goal
+            bot.path_index = 0
+            bot.wants_path = False
+
+    def decide(self, bot: BotConnection):
+        if bot.target is not None:
+            target = bot.target
+            error = (1 - self.skill) * 0.02 * target.position.distance(bot.position)
+            bot.look_at(*target.eye.xyz, error=error)
+            bot.set_firing(bot.tool_type == TOOL.WEAPON and not getattr(bot.tool, "reloading", False))
+            bot.set_inputs(up=target.position.distance(bot.position) > HOLD_DISTANCE)
+            return
+        bot.set_firing(False)
+
+        if bot.goal is None or _distance(bot.position.xyz, bot.goal) < GOAL_DISTANCE:
+            bot.goal = None
+            bot.set_inputs(up=False)
+            return
+
+        # keep track of how long it's been since the bot last got closer to the goal
+        distance = _distance(bot.position.xyz, bot.goal)
+        if distance < bot.progress_distance - 1:
+            bot.progress_distance = distance
+            bot.progress_time = self.protocol.time
+        elif self.protocol.time - bot.progress_time > STUCK_TIME:
+            bot.progress_time = self.protocol.time
+            bot.progress_distance = distance
+            if bot.path is None or self.protocol.nav.is_stuck(bot.position):
+                self.build_step(bot)
+            bot.wants_path = True
+
+        if not bot.path:
+            # nowhere to walk to yet, or no way there: head straight at it and hope
+            bot.look_at(bot.goal[0], bot.goal[1], bot.eye.z)
+            bot.set_inputs(up=True)
+            return
+        self.follow_path(bot)
+
+    def follow_path(self, bot: BotConnection):
+        cell = self.protocol.nav.cell(bot.position)
+        path = bot.path
+        if cell is not None:
+            # the bot can drift or get pushed, pick the closest cell a bit ahead of where it was
+            ahead = path[bot.path_index:bot.path_index + 8]
+            nearest = min(range(len(ahead)), key=lambda i: abs(ahead[i][0] - cell[0]) + abs(ahead[i][1] - cell[1]))
+            bot.path_index += nearest
+        if bot.path_index >= len(path) - 1:
+            bot.path = None
+            bot.wants_path = True
+            return
+
+        # aim a couple of cells ahead so it doesn't zigzag along diagonals
+        x, y, z = path[min(bot.path_index + 2, len(path) - 1)]
+        next_z = path[bot.path_index + 1][2]
+        bot.look_at(x + 0.5, y + 0.5, bot.eye.z)
+        # z grows downwards: stepping up one block is automatic, two need a jump
+        bot.set_inputs(up=True, jump=cell is not None and cell[2] - next_z >= 2)
+
+    def build_step(self, bot: BotConnection):
+        # Put a block on the ground in front of the bot, toward its goal, so it can climb out of wherever it is
+        cell = self.protocol.nav.cell(bot.position)
+        if cell is None or bot.goal is None:
+            return
+        x, y, z = cell
+        dx, dy = bot.goal[0] - (x + 0.5), bot.goal[1] - (y + 0.5)
+        if abs(dx) >= abs(dy):
+            x += 1 if dx > 0 else -1
+        else:
+            y += 1 if dy > 0 else -1
+        ground = self.protocol.nav.cell((x + 0.5, y + 0.5, z - 1))
+        if ground is None or ground[2] < z:
+            return
+        bot.build_block(x, y, ground[2] - 1)
+
+
+def _distance(a, b) -> float:
+    return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
@@ -0,0 +1,61 @@
+from typing import Dict, Optional, Set, Tuple
+
+from acelib.constants import SET
+from aceserver import protocol, connection, types
+
+__all__ = ["StateChanges"]
+
+# the order an entity's changes go out in, its new carrier has to be known before where it was dropped
+ENTITY_ORDER = (SET.STATE, SET.CARRIER, SET.POSITION)
+
+
+class StateChanges:
+    # State that's broadcast at most once a tick. Setting an entity's state, carrier or position, a team or player's
+    # score, or the fog color only marks it here, and flush() sends whatever it ends up as. ServerProtocol.update
+    # flushes at the end of every tick in a fixed order: fog, team scores, player scores, then entities by id.
+    def __init__(self, protocol: 'protocol.ServerProtocol'):
+        self.protocol = protocol
+
+        self.fog: Optional[Tuple[int, int, int]] = None
+        self.teams: Set['types.Team'] = set()
+        self.players: Set['connection.ServerConnection'] = set()
+        self.entities: Dict['types.Entity', Set[SET]] = {}
+
+    def fog_changed(self, color: Tuple[int, int, int]):
+        self.fog = color
+
+    def team_score_changed(self, team: 'types.Team'):
+        self.teams.add(team)
+
+    def player_score_changed(self, conn: 'connection.ServerConnection'):
+        self.players.add(conn)
+
+    def entity_changed(self, ent: 'types.Entity', change: SET):
+        changes = self.entities.get(ent)
+        if changes is None:
+            changes = self.entities[ent] = set()
+        changes.add(change)
+
+    def flush(self):
+        if self.fog is None and not self.teams and not self.players and not self.entities:
+            return
+        fog, self.fog = self.fog, None
+        teams, self.teams = self.teams, set()
+        players, self.players = self.players, set()
+        entities, self.entities = self.entities, {}
+
+        if fog is not None:
+            self.protocol.broadcast_fog_color(*fog)
+        for team in sorted(teams, key=lambda team: team.id):
+            team.broadcast_score()
+        for conn in sorted(players, key=lambda conn: conn.id):
+            # a SetScore for someone the clients were told left would crash them
+            if self.protocol.players.get(conn.id) is conn:
+                conn.broadcast_score()
+        for ent in sorted(entities, key=lambda ent: ent.id):
+            if ent.destroyed:
+                continue
+            changes = entities[ent]
+            for change in ENTITY_ORDER:
+                if change in changes:
+                    ent.broadcast_change(change)
@@ -24,6 +24,15 @@ def on_loader_receive(*loaders):
     return decorator
 
 
+# The packets clients keep streaming about themselves skip the loaders: they're read straight into the player's world
+# object, and the connection only gets what it has to act on. See on_receive and received_direct.
+_direct_readers: Dict[int, Callable[[world.Player, ByteReader], Any]] = {
+    packets.PositionOrientationData.id: world.Player.receive_client_update,
+    packets.InputData.id: world.Player.receive_input_data,
+    packets.WeaponInput.id: world.Player.receive_weapon_input,
+}
+
+
 class ServerConnection(base.BaseConnection):
     def __init__(self, protocol: 'protocol.ServerProtocol', peer: enet.Peer):
         self.protocol = protocol
@@ -32,7 +41,7 @@ class ServerConnection(base.BaseConnection):
         self.id: int = None
         self.name = "Deuce"
         self.hp = 100
-        self.team: types.Team = None
+        self._team: types.Team = None
         self._score = 0
         self.wo: world.Player = None
 
@@ -51,6 +60,7 @@ class ServerConnection(base.BaseConnection):
         self._listeners: Dict[int, List[asyncio.Future]] = defaultdict(list)
 
     def on_connect(self, data: int):
+        self.protocol.regroup(self)
         if data != PROTOCOL_VERSION:
             return self.disconnect(DISCONNECT.WRONG_VERSION)
 
@@ -62,22 +72,43 @@ class ServerConnection(base.BaseConnection):
         self.protocol.loop.create_task(self.send_connection_data())
 
     def on_disconnect(self):
+        self.protocol.regroup(self)
         if self.id is not None:
             self.protocol.loop.create_task(self.on_player_leave(self))
 
     def on_receive(self, packet: enet.Packet):
+        loader: packets.Loader = None
         try:
-            reader: ByteReader = ByteReader(packet.data, packet.dataLength)
+            # pyenet only hands out packet memory as a copy, the reader works on that copy in place
+            reader: ByteReader = ByteReader(packet.data)
             packet_id: int = reader.read_uint8()
-            loader: packets.Loader = packets.CLIENT_LOADERS[packet_id](reader)
+            direct = _direct_readers.get(packet_id)
+            # anyone waiting for one of these gets it as a loader like any other packet
+            if direct is not None and self.wo is not None and not self.dead and not self._listeners.get(packet_id):
+                value = direct(self.wo, reader)
+            else:
+                loader = packets.CLIENT_LOADERS[packet_id](reader)
         except:
             print(f"Malformed packet from player #{self.id}, disconnecting.", file=sys.stderr)
             traceback.print_exc()
             return self.disconnect()
+        if loader is None:
+            return self.received_direct(packet_id, value)
         self.received_loader(loader)
 
+    def received_direct(self, packet_id: int, value):
+        # `value` is what the world.Player.receive_* method returned
+        if packet_id == packets.PositionOrientationData.id:
+            if not value:
+                return self.disconnect()
+        elif packet_id == packets.InputData.id:
+            self.input_changed(value)
+        elif packet_id == packets.WeaponInput.id:
+            self.weapon_input_changed(bool(value & 1), bool(value & 2))
+
     def _send_loader(self, writer: ByteWriter, flags=enet.PACKET_FLAG_RELIABLE):
-        packet: enet.Packet = enet.Packet(bytes(writer), flags)
+        packet: enet.Packet = enet.Packet(writer.get(), flags)
+        writer.release()
         self.peer.send(0, packet)
 
     def send_loader(self, loader: packets.Loader, flags=enet.PACKET_FLAG_RELIABLE):
@@ -87,7 +118,10 @@ class ServerConnection(base.BaseConnection):
         self.peer.disconnect(reason)
 
     def reset(self):
+        if self.wo is not None:
+            self.protocol.world.remove(self.wo)
         self.wo = None
+        self.protocol.regroup(self)
         respawn_task = self.store["respawn_task"]
         if respawn_task is not None:
             respawn_task.cancel()
@@ -193,8 +227,12 @@ class ServerConnection(base.BaseConnection):
 
         if self.wo is None:
             self.wo = world.Player(self.protocol.map)
+            self.protocol.world.add(self.wo, self)
 
+        self.wo.team = self.team.id
+        self.wo.id = self.id
         self.wo.set_dead(False)
+        self.protocol.regroup(self)
         self.wo.set_position(*pos, reset=True)
         self.restock()
         self.protocol.loop.create_task(self.on_player_spawn(self, x, y, z))
@@ -221,6 +259,7 @@ class ServerConnection(base.BaseConnection):
         respawn_time = hook or respawn_time
 
         self.wo.set_dead(True)
+        self.protocol.regroup(self)
         kill_action.player_id = self.id
         kill_action.killer_id = (killer or self).id
         kill_action.kill_type = kill_type
@@ -419,10 +458,8 @@ class ServerConnection(base.BaseConnection):
         if util.bad_float(px, py, pz, ox, oy, oz):
             return self.disconnect()
 
-        if math3d.Vector3(px, py, pz).sq_distance(self.wo.position) >= 3 ** 2:
-            self.set_position(reset=False)
-        else:
-            self.wo.set_position(px, py, pz)
+        # checked against the server's own stepping of our inputs on the next tick, see on_world_event
+        self.wo.report_position(px, py, pz)
         self.wo.set_orientation(ox, oy, oz)
 
     @on_loader_receive(packets.InputData)
@@ -431,15 +468,22 @@ class ServerConnection(base.BaseConnection):
 
         walk = loader.up, loader.down, loader.left, loader.right
         animation = loader.jump, loader.crouch, loader.sneak, loader.sprint
-
-        # TODO: Maybe MountedEntities should be given direct control of walk/animation changes.
         self.wo.set_walk(*walk)
-        self.protocol.loop.create_task(self.on_walk_change(self, *walk))
         self.wo.set_animation(*animation)
-        self.protocol.loop.create_task(self.on_animation_change(self, *animation))
+        self.input_changed(sum(bool(value) << bit for bit, value in enumerate(walk + animation)))
 
-        loader.player_id = self.id
-        self.protocol.broadcast_loader(loader, predicate=lambda conn: conn is not self)
+    def input_changed(self, flags: int):
+        # the player's walk and animation were just set from an InputData with `flags`
+        # TODO: Maybe MountedEntities should be given direct control of walk/animation changes.
+        if self.on_walk_change:
+            walk = [bool(flags & (1 << bit)) for bit in range(0, 4)]
+            self.protocol.loop.create_task(self.on_walk_change(self, *walk))
+        if self.on_animation_change:
+            animation = [bool(flags & (1 << bit)) for bit in range(4, 8)]
+            self.protocol.loop.create_task(self.on_animation_change(self, *animation))
+
+        packet = enet.Packet(bytes((packets.InputData.id, self.id, flags)), enet.PACKET_FLAG_RELIABLE)
+        self.protocol._broadcast_packet(packet, exclude=self)
 
     @on_loader_receive(packets.ExistingPlayer)
     def recv_existing_player(self, loader: packets.ExistingPlayer):
@@ -501,12 +545,15 @@ class ServerConnection(base.BaseConnection):
     @on_loader_receive(packets.WeaponInput)
     def recv_weapon_input(self, loader: packets.WeaponInput):
         if self.dead: return
+        self.weapon_input_changed(loader.primary, loader.secondary)
 
-        loader.primary = self.tool.set_primary(loader.primary)
-        loader.secondary = self.tool.set_secondary(loader.secondary)
-        loader.player_id = self.id
-        self.wo.set_fire(loader.primary, loader.secondary)
-        self.protocol.broadcast_loader(loader, predicate=lambda conn: conn is not self)
+    def weapon_input_changed(self, primary: bool, secondary: bool):
+        primary = self.tool.set_primary(primary)
+        secondary = self.tool.set_secondary(secondary)
+        self.wo.set_fire(primary, secondary)
+        flags = bool(primary) | bool(secondary) << 1
+        packet = enet.Packet(bytes((packets.WeaponInput.id, self.id, flags)), enet.PACKET_FLAG_RELIABLE)
+        self.protocol._broadcast_packet(packet, exclude=self)
 
     @on_loader_receive(packets.WeaponReload)
     def recv_weapon_reload(self, loader: packets.WeaponReload):
@@ -514,7 +561,7 @@ class ServerConnection(base.BaseConnection):
         reloading = self.tool.reload()
         if reloading:
             loader.player_id = self.id
-            self.protocol.broadcast_loader(loader, predicate=lambda conn: conn is not self)
+            self.protocol.broadcast_loader(loader, exclude=self)
 
     @on_loader_receive(packets.ChangeClass)
     def recv_change_class(self, loader: packets.ChangeClass):
@@ -536,7 +583,7 @@ class ServerConnection(base.BaseConnection):
 
         self.block.color.rgb = loader.color.rgb
         loader.player_id = self.id
-        self.protocol.broadcast_loader(loader, predicate=lambda conn: conn is not self)
+        self.protocol.broadcast_loader(loader, exclude=self)
 
     @on_loader_receive(packets.UseOrientedItem)
     def recv_oriented_item(self, loader: packets.UseOrientedItem):
@@ -546,7 +593,7 @@ class ServerConnection(base.BaseConnection):
         if util.bad_float(*loader.position.xyz, *loader.velocity.xyz, loader.value):
             return self.disconnect()
 
-        position = validate(math3d.Vector3(*loader.position.xyz), self.wo.position).xyz
+        position = validate(loader.position.xyz, self.wo.position)
         velocity = loader.velocity.xyz
 
         obj_type = None
@@ -557,13 +604,13 @@ class ServerConnection(base.BaseConnection):
                 obj_type = types.Grenade
             print(self.wo.velocity + self.wo.orientation)
             print(loader.velocity.xyz)
-            velocity = validate(math3d.Vector3(*velocity), self.wo.orientation + self.wo.velocity).xyz
+            velocity = validate(velocity, self.wo.orientation + self.wo.velocity)
         elif loader.tool == TOOL.RPG:
             if self.tool_type != TOOL.RPG:
                 return
             if self.rpg.on_primary():
                 obj_type = types.Rocket
-            velocity = validate(math3d.Vector3(*velocity), self.wo.orientation).xyz
+            velocity = validate(velocity, self.wo.orientation)
             # note: loader.velocity is actually orientation for RPG rockets.
 
         if obj_type is not None:
@@ -576,7 +623,6 @@ class ServerConnection(base.BaseConnection):
         if self.dead:
             return
 
-        # TODO our own raycasting and hack detection etc.
         other = self.protocol.players.get(loader.player_id)
         if other is None:
             return
@@ -589,35 +635,47 @@ class ServerConnection(base.BaseConnection):
                 eye.z -= 1.5
                 print(self.mounted_entity.position.xyz)
                 print(self.orientation)
+                spread = HITSCAN_SPREAD
             elif self.tool_type in (TOOL.WEAPON, TOOL.SNIPER) and self.tool.primary:
                 if self.tool.type != WEAPON.SHOTGUN and not self.tool.check_rapid():
                     return
                 eye = self.eye
+                spread = self.tool.hit_spread
             else:
                 return
 
-            vec = (other.eye - eye).normalized
-            if self.orientation.dot(vec) <= 0.9:
-                print(f"incorrect orientation to hit for {self!r}")
-                print(f"self.pos={self.position} other.pos={other.position}")
-                print(f"self.orien={self.orientation} expected={vec}")
-                return
+            # checked against our own hitboxes along with every other hit this tick, see apply_hit
+            self.protocol.queue_hit(self, other, loader.value, eye, spread)
+            return
 
-            if self.mounted_entity:
-                damage = self.mounted_entity.get_damage(loader.value, other.position.distance(self.position))
-                cause = KILL.ENTITY
-            else:
-                damage = self.weapon.get_damage(loader.value, other.position.distance(self.position))
-                cause = KILL.HEADSHOT if loader.value == HIT.HEAD else KILL.WEAPON
-        else:
-            if self.tool_type != TOOL.SPADE or not self.tool.check_rapid():
-                return
-            if other.position.distance(self.position) > MELEE_DISTANCE:
-                return
+        if self.tool_type != TOOL.SPADE or not self.tool.check_rapid():
+            return
+        if other.position.distance(self.position) > MELEE_DISTANCE:
+            return
+        other.hurt(damage=50, cause=KILL.MELEE, damager=self)
+
+    def apply_hit(self, other: 'ServerConnection', value: Optional[HIT], hit: Optional[tuple]):
+        # `other` and `value` are what the client reported (None for whatever part the trace finds), `hit` is what
+        # protocol.trace_hits found: (player, HIT, distance) or None. A miss or someone else in the way drops the hit
+        if self.dead or other.dead or self.protocol.players.get(other.id) is not other:
+            return
+        if hit is None or hit[0] is not other:
+            return
 
-            damage = 50
-            cause = KILL.MELEE
+        _, part, distance = hit
+        # the victim's padded box is forgiving, but headshots have to be real ones
+        if value is None or value == HIT.HEAD and part != HIT.HEAD:
+            value = part
 
+        if self.mounted_entity:
+            damage = self.mounted_entity.get_damage(value, distance)
+            cause = KILL.ENTITY
+        else:
+            damage = self.weapon.get_damage(value, distance)
+            cause = KILL.HEADSHOT if value == HIT.HEAD else KILL.WEAPON
+        # the trigger may have been let go or a reload started since the hit was queued
+        if damage is None:
+            return
         other.hurt(damage=damage, cause=cause, damager=self)
 
     @on_loader_receive(packets.PlaceMG)
@@ -635,11 +693,17 @@ class ServerConnection(base.BaseConnection):
     def update(self, dt):
         if self.dead: return
 
-        fall_dmg: int = self.wo.update(dt, self.protocol.time)
-        if fall_dmg > 0:
-            self.hurt(fall_dmg)
+        # physics is stepped for every player at once by `protocol.world`, see on_world_event
         self.tool.update(dt)
 
+    def on_world_event(self, event: world.WORLD_EVENT, value: int):
+        if event == world.WORLD_EVENT.FALL_DAMAGE:
+            self.hurt(value)
+        elif event == world.WORLD_EVENT.CORRECTED:
+            # the reported position was turned down, put the client back where the server has it
+            self.set_position(reset=False)
+            self.protocol.loop.create_task(self.on_position_corrected(self, world.MOVEMENT(value)))
+
     def to_existing_player(self) -> packets.ExistingPlayer:
         existing_player.name = self.name
         existing_player.player_id = self.id
@@ -650,6 +714,15 @@ class ServerConnection(base.BaseConnection):
         existing_player.color.rgb = self.block.color.rgb
         return existing_player
 
+    @property
+    def team(self) -> types.Team:
+        return self._team
+
+    @team.setter
+    def team(self, team: types.Team):
+        self._team = team
+        self.protocol.regroup(self)
+
     @property
     def score(self):
         return self._score
@@ -657,6 +730,9 @@ class ServerConnection(base.BaseConnection):
     @score.setter
     def score(self, value):
         self._score = max(0, min(int(value), 255))
+        self.protocol.changes.player_score_changed(self)
+
+    def broadcast_score(self):
         set_score.type = SCORE.PLAYER
         set_score.specifier = self.id
         set_score.value = self._score
@@ -741,6 +817,9 @@ class ServerConnection(base.BaseConnection):
     on_animation_change = util.AsyncEvent()
     # (self, position, orientation) -> None
     on_client_update = util.AsyncEvent()
+    # Called when a reported position didn't match the server's simulation and the player was put back
+    # (self, world.MOVEMENT) -> None
+    on_position_corrected = util.AsyncEvent()
 
     # (self) -> None
     on_use_command = util.AsyncEvent()
@@ -752,8 +831,8 @@ class ServerConnection(base.BaseConnection):
         return f"<{self.__class__.__name__}(id={self.id}, name={self.name}, pos={self.position}, tool={self.tool})>"
 
 
-def validate(client: math3d.Vector3, server: math3d.Vector3) -> math3d.Vector3:
-    if client.sq_distance(server) >= 3 ** 2:
-        return server
+def validate(client: Tuple[float, float, float], server: math3d.Vector3) -> Tuple[float, float, float]:
+    if server.sq_distance_xyz(*client) >= 3 ** 2:
+        return server.xyz
     else:
         return client
@@ -10,24 +10,24 @@ import enet
 
 import acescripts
 import acemodes
-from acelib import packets, vxl, world
+from acelib import math3d, packets, vxl, world
 from acelib.bytes import ByteWriter
 from acelib.constants import *
-from aceserver import base, util, connection, types
+from aceserver import base, util, changes, connection, types, bots
 from aceserver.loaders import *
 
 
 class ServerProtocol(base.BaseProtocol):
     def __init__(self, config, *, loop):
         super().__init__(loop=loop, interface=config["interface"], port=config["port"],
-                         connection_factory=connection.ServerConnection)
+                         connection_factory=connection.ServerConnection, tick_rate=config.get("tick_rate", 30))
 
         self.config = config
         self.name = self.config["name"]
         self.max_players = min(32, self.config.get("max_players", 32))
 
-        with open(self.config["map"], "rb") as f:
-            self.map: vxl.VXLMap = vxl.VXLMap(f.read(), {"name": os.path.splitext(f.name)[0]})
+        self.map: vxl.VXLMap = self.load_map(self.config["map"])
+        self.world = world.World(self.map)
 
         self.packs: List[Tuple[bytes, int, int]] = []
         for pname in self.config.get("packs", ()):
@@ -47,6 +47,11 @@ class ServerProtocol(base.BaseProtocol):
         self.team1.other = self.team2
         self.team2.other = self.team1
         self.teams = {self.team1.id: self.team1, self.team2.id: self.team2, self.spectator_team.id: self.spectator_team}
+        # who to send to without asking every connection, see regroup(). Each team keeps its own
+        self.everyone = util.Recipients()
+        self.alive = util.Recipients()
+        # entity, score and fog changes, sent once at the end of each tick
+        self.changes = changes.StateChanges(self)
 
         self.fog_color = self.config.get("fog_color", (128, 232, 255))
 
@@ -54,11 +59,48 @@ class ServerProtocol(base.BaseProtocol):
         self.entities: Dict[int, types.Entity] = {}
         self.sounds: Dict[int, types.Sound] = {}
         self.objects: List[Any] = []
+        # hits reported since the last tick, checked in one batch by trace_hits
+        self.pending_hits: List[tuple] = []
 
         self.mode: acemodes.GameMode = acemodes.get_game_mode(self, self.config.get("mode", "ctf"))
         self.scripts = acescripts.ScriptLoader(self)
         self.max_respawn_time = self.config.get("respawn_time", 5)
 
+        # WorldUpdates can go out less often than the simulation ticks, trading bandwidth for CPU.
+        self.world_update_rate = min(self.tick_rate, self.config.get("world_update_rate", self.tick_rate))
+        self.next_world_update = 0
+        self.world_update_count = 0
+        self.world_updates = world.WorldUpdates(
+            self.world, lambda data: enet.Packet(data, enet.PACKET_FLAG_UNSEQUENCED))
+        # players further apart than near_update_distance only hear about each other every far_update_interval-th
+        # WorldUpdate
+        self.near_update_distance = self.config.get("near_update_distance", 64)
+        self.far_update_interval = self.config.get("far_update_interval", 3)
+        # enemies out of sight are left out of each player's WorldUpdate. A budget of 0 turns that off
+        self.visibility = world.Visibility(self.world, self.config.get("visibility_budget", 4096))
+        self.grenade_paths = world.GrenadePaths(self.map, self.config.get("grenade_path_cache", 256))
+        # where players can walk, for bots, spawns and the like
+        self.nav = world.Navigation(self.map, self.config.get("nav_path_cache", 1024))
+        self.bots = bots.BotManager(self)
+
+    def load_map(self, path: str) -> vxl.VXLMap:
+        with open(path, "rb") as f:
+            data = f.read()
+        map_info = {"name": os.path.splitext(path)[0]}
+
+        # Instances running the same map can share one decoded copy of it, see VXLMap.from_image
+        shared = self.config.get("shared_map")
+        if not shared:
+            return vxl.VXLMap(data, map_info)
+
+        try:
+            return vxl.VXLMap.from_image(shared, map_info, checksum=zlib.crc32(data))
+        except (OSError, ValueError):
+            pass
+        map = vxl.VXLMap(data, map_info)
+        map.publish(shared)
+        return map
+
     async def run(self):
         self.init_hooks()
         self.mode.start()
@@ -72,6 +114,10 @@ class ServerProtocol(base.BaseProtocol):
 
     def update(self, dt):
         super().update(dt)
+        self.trace_hits()
+        for event, obj, value in self.world.update(dt, self.time):
+            obj.on_world_event(event, value)
+        self.visibility.update(self.time)
         for ent in self.entities.values():
             ent.update(dt)
         for ply in self.players.values():
@@ -79,33 +125,96 @@ class ServerProtocol(base.BaseProtocol):
         for obj in self.objects:
             obj.update(dt)
         self.mode.update(dt)
-        self.world_update()
+        self.bots.update(dt)
+        self.changes.flush()
+        # half a tick of slack so float error can't push a send back by a whole tick
+        if self.time >= self.next_world_update - 0.5 / self.tick_rate:
+            self.world_update()
+            # Never send more than one per tick, even while catching up
+            self.next_world_update = max(self.next_world_update + 1 / self.world_update_rate, self.time)
+
+    def queue_hit(self, conn: 'connection.ServerConnection', other: 'connection.ServerConnection',
+                  value: Optional[HIT], eye: math3d.Vector3, spread: float):
+        # aim is taken now, the trace happens at the start of the next tick against where players were when the
+        # shooter saw them, about half a round trip ago
+        rewind = self.time - conn.peer.roundTripTime / 2000
+        self.pending_hits.append((conn, other, value, eye.xyz, conn.orientation.xyz, spread, rewind))
+
+    def drop_hits(self, conn: 'connection.ServerConnection'):
+        # forgets the hits queued this tick by or on `conn`
+        self.pending_hits = [hit for hit in self.pending_hits if hit[0] is not conn and hit[1] is not conn]
+
+    def trace_hits(self):
+        if not self.pending_hits:
+            return
+        # hits from or on someone who has left since (and so has no world object anymore) are dropped
+        hits = [hit for hit in self.pending_hits if hit[0].wo is not None and hit[1].wo is not None]
+        self.pending_hits = []
+        if not hits:
+            return
+        # only the reported victim's hitbox is padded, see World.hitscan
+        results = self.world.hitscan([hit[3] for hit in hits], [hit[4] for hit in hits], [hit[0].wo for hit in hits],
+                                     tolerance=HITSCAN_TOLERANCE, spread=[hit[5] for hit in hits],
+                                     times=[hit[6] for hit in hits], targets=[hit[1].wo for hit in hits])
+        for (conn, other, value, *_), result in zip(hits, results):
+            conn.apply_hit(other, value, result)
 
     def world_update(self):
-        world_update.clear()
-        for conn in self.players.values():
-            if not conn.name or conn.dead:
-                continue
-            world_update[conn.id] = (conn.position.xyz, conn.orientation)
-        self.broadcast_loader(world_update, flags=enet.PACKET_FLAG_UNSEQUENCED)
-
-    def _broadcast_loader(self, writer: ByteWriter, flags=enet.PACKET_FLAG_RELIABLE, predicate=None, connections=None):
-        packet: enet.Packet = enet.Packet(bytes(writer), flags)
+        self.world_update_count += 1
+        self.world_updates.update()
+        # peers that aren't alive in the game (loading, dead, spectating) get everyone, every time
+        everyone = self.world_updates.packet()
 
+        for conn in self.connections.values():
+            if conn.dead:
+                conn.peer.send(0, everyone)
+                continue
+            mask = self.visibility.interest(conn.wo, self.world_update_count, self.near_update_distance,
+                                            self.far_update_interval)
+            # players that get the same records share a packet
+            conn.peer.send(0, self.world_updates.packet(mask))
+
+    def _broadcast_loader(self, writer: ByteWriter, flags=enet.PACKET_FLAG_RELIABLE, predicate=None, connections=None,
+                          recipients: util.Recipients=None, exclude: 'connection.ServerConnection'=None):
+        packet: enet.Packet = enet.Packet(writer.get(), flags)
+        writer.release()
+        return self._broadcast_packet(packet, predicate, connections, recipients, exclude)
+
+    def _broadcast_packet(self, packet: enet.Packet, predicate=None, connections=None,
+                          recipients: util.Recipients=None, exclude: 'connection.ServerConnection'=None):
         if connections is not None:
             for conn in connections:
                 conn.peer.send(0, packet)
             return
 
-        if not callable(predicate):
-            return self.host.broadcast(0, packet)
-
-        for conn in self.connections.values():
-            if predicate(conn):
-                conn.peer.send(0, packet)
+        if callable(predicate):
+            for conn in self.connections.values():
+                if predicate(conn):
+                    conn.peer.send(0, packet)
+            return
 
-    def broadcast_loader(self, loader: packets.Loader, flags=enet.PACKET_FLAG_RELIABLE, *, predicate=None, connections=None):
-        return self._broadcast_loader(loader.generate(), flags, predicate, connections)
+        if recipients is not None:
+            return recipients.send(packet, exclude)
+        if exclude is not None:
+            return self.everyone.send(packet, exclude)
+        return self.host.broadcast(0, packet)
+
+    def broadcast_loader(self, loader: packets.Loader, flags=enet.PACKET_FLAG_RELIABLE, *, predicate=None, connections=None,
+                         recipients: util.Recipients=None, exclude: 'connection.ServerConnection'=None):
+        return self._broadcast_loader(loader.generate(), flags, predicate, connections, recipients, exclude)
+
+    def regroup(self, conn: 'connection.ServerConnection'):
+        # puts `conn` in the recipient groups it belongs to now and takes it out of the rest. Bots aren't connected
+        # and so are never in any
+        connected = self.connections.get(conn.peer) is conn
+        self.everyone.set(conn, connected)
+        self.alive.set(conn, connected and not conn.dead)
+        for team in self.teams.values():
+            team.recipients.set(conn, connected and conn.team is team)
+
+    @property
+    def spectators(self) -> util.Recipients:
+        return self.spectator_team.recipients
 
     TObj = TypeVar('TObj')
     def create_object(self, obj_type: Type[TObj], *args, **kwargs) -> TObj:
@@ -143,26 +252,27 @@ class ServerProtocol(base.BaseProtocol):
             self.sound_ids.push(sound.id)
 
     @util.static_vars(wrapper=textwrap.TextWrapper(width=MAX_CHAT_SIZE))
-    def broadcast_message(self, message: str, chat_type=CHAT.SYSTEM, player_id=0xFF, predicate=None):
+    def broadcast_message(self, message: str, chat_type=CHAT.SYSTEM, player_id=0xFF, predicate=None,
+                          recipients: util.Recipients=None):
         chat_message.chat_type = chat_type
         chat_message.player_id = player_id
         lines: List[str] = self.broadcast_message.wrapper.wrap(message)
         for line in lines:
             chat_message.value = line
-            self.broadcast_loader(chat_message, predicate=predicate)
+            self.broadcast_loader(chat_message, predicate=predicate, recipients=recipients)
 
     def broadcast_chat_message(self, message: str, sender: connection.ServerConnection, team: types.Team=None):
-        predicate = (lambda conn: conn.team == team) if team else None
+        recipients = team.recipients if team else None
         chat_type = CHAT.TEAM if team else CHAT.ALL
-        return self.broadcast_message(message, player_id=sender.id, chat_type=chat_type, predicate=predicate)
+        return self.broadcast_message(message, player_id=sender.id, chat_type=chat_type, recipients=recipients)
 
     def broadcast_server_message(self, message: str, team: types.Team=None):
-        predicate = (lambda conn: conn.team == team) if team else None
-        return self.broadcast_message("[*] " + message, chat_type=CHAT.SYSTEM, predicate=predicate)
+        recipients = team.recipients if team else None
+        return self.broadcast_message("[*] " + message, chat_type=CHAT.SYSTEM, recipients=recipients)
 
     def broadcast_hud_message(self, message: str, team: types.Team =None):
-        predicate = (lambda conn: conn.team == team) if team else None
-        return self.broadcast_message(message, chat_type=CHAT.BIG, predicate=predicate)
+        recipients = team.recipients if team else None
+        return self.broadcast_message(message, chat_type=CHAT.BIG, recipients=recipients)
 
     def set_fog_color(self, r: int, g: int, b: int, save=True):
         r &= 255
@@ -170,6 +280,9 @@ class ServerProtocol(base.BaseProtocol):
         b &= 255
         if save:
             self.fog_color = (r, g, b)
+        self.changes.fog_changed((r, g, b))
+
+    def broadcast_fog_color(self, r: int, g: int, b: int):
         fog_color.color.rgb = r, g, b
         self.broadcast_loader(fog_color)
 
@@ -181,12 +294,17 @@ class ServerProtocol(base.BaseProtocol):
         print(f"player leave {conn.id}")
         ply = self.players.pop(conn.id, None)
         self.player_ids.push(conn.id)
+        if conn.wo is not None:
+            self.world.remove(conn.wo)
+            conn.wo = None
 
         for ent in self.entities.values():
             if ent.carrier and ent.carrier.id == ply.id:
                 ent.set_carrier(None, force=True)
 
         if ply:  # PlayerLeft will crash the clients if the left player didn't actually join the game.
+            # the carriers dropped above have to reach them first
+            self.changes.flush()
             player_left.player_id = conn.id
             self.broadcast_loader(player_left)
 
@@ -1,8 +1,7 @@
-import math
-from typing import Generator
+from typing import Generator, List
 
 from acelib import math3d, packets, world
-from acelib.constants import TEAM, SET, ENTITY, SCORE, KILL, ACTION, ROCKET_SPEED, ROCKET_FALLOFF, TOOL
+from acelib.constants import TEAM, SET, ENTITY, SCORE, KILL, ACTION, TOOL
 from aceserver import protocol, connection, util, loaders
 from aceserver.loaders import play_sound, stop_sound, change_entity, oriented_item
 
@@ -15,14 +14,14 @@ class Sound:
         self.name = name
         self.position = position
 
-    def play(self, predicate=None):
-        self.protocol.broadcast_loader(self.to_play_sound(), predicate=predicate)
+    def play(self, predicate=None, recipients: 'util.Recipients'=None):
+        self.protocol.broadcast_loader(self.to_play_sound(), predicate=predicate, recipients=recipients)
 
-    def stop(self, predicate=None):
+    def stop(self, predicate=None, recipients: 'util.Recipients'=None):
         if self.id is None:
             return
         stop_sound.loop_id = self.id
-        self.protocol.broadcast_loader(stop_sound, predicate=predicate)
+        self.protocol.broadcast_loader(stop_sound, predicate=predicate, recipients=recipients)
 
     def destroy(self):
         self.stop()
@@ -46,6 +45,8 @@ class Team:
         self.spectator = spectator
 
         self.other: 'Team' = None
+        # connected players on this team
+        self.recipients = util.Recipients()
 
         self._score = 0
 
@@ -78,6 +79,9 @@ class Team:
     @score.setter
     def score(self, value):
         self._score = value
+        self.protocol.changes.team_score_changed(self)
+
+    def broadcast_score(self):
         loaders.set_score.type = SCORE.TEAM
         loaders.set_score.specifier = self.id
         loaders.set_score.value = self._score
@@ -93,6 +97,7 @@ class Team:
 class Entity:
     type = None
     mountable = False
+    radius = 3  # players within this distance touch the entity
     on_collide = util.Event()
 
     def __init__(self, entity_id: int, protocol: 'protocol.ServerProtocol', position=(0, 0, 0), team=None, carrier=None,
@@ -100,33 +105,50 @@ class Entity:
         self.id = entity_id
         self.protocol = protocol
 
-        self.position = math3d.Vector3(*position)
+        # gravity and collisions are stepped by the native world, see on_world_event
+        self.wo = world.Entity(protocol.map, *position, self.radius)
+        self.position = self.wo.position
         self.yaw = yaw
         self.team: Team = team
         self.carrier: connection.ServerConnection = carrier
+        self.protocol.world.add(self.wo, self)
 
         self.destroyed = False
 
     def update(self, dt):
+        pass
+
+    def on_world_event(self, event: world.WORLD_EVENT, value):
         if self.destroyed:
             return
+        if event == world.WORLD_EVENT.MOVED:
+            self.protocol.changes.entity_changed(self, SET.POSITION)
+        elif event == world.WORLD_EVENT.CONTACT:
+            # an earlier contact this tick may have picked us up already
+            if self.carrier is None:
+                self.on_contact(value)
+
+    def on_contact(self, conn: 'connection.ServerConnection'):
+        if self.on_collide:
+            self.on_collide(self, conn)
 
-        self.do_gravity()
-        self.do_collide()
+    @property
+    def team(self) -> Team:
+        return self._team
 
-    def do_gravity(self):
-        z = self.protocol.map.get_z(self.position.x, self.position.y, self.position.z - 1)
-        if z != self.position.z:
-            self.set_position(self.position.x, self.position.y, z)
+    @team.setter
+    def team(self, team: Team):
+        self._team = team
+        self.wo.team = -1 if team is None else team.id
 
-    def do_collide(self):
-        if not self.carrier and self.on_collide:
-            for conn in self.protocol.players.values():
-                if conn.dead: continue
+    @property
+    def carrier(self) -> 'connection.ServerConnection':
+        return self._carrier
 
-                dist = self.position.sq_distance(conn.position)
-                if dist <= 3 ** 2:
-                    self.on_collide(self, conn)
+    @carrier.setter
+    def carrier(self, carrier: 'connection.ServerConnection'):
+        self._carrier = carrier
+        self.wo.carrier = -1 if carrier is None else carrier.id
 
     def set_team(self, team: Team=None, force=False):
         if self.destroyed:
@@ -134,20 +156,13 @@ class Entity:
         if not force and team is self.team:
             return
         self.team = team
-        state = self.team.id if self.team else TEAM.NEUTRAL
-        change_entity.entity_id = self.id
-        change_entity.type = SET.STATE
-        change_entity.state = state
-        self.protocol.broadcast_loader(change_entity)
+        self.protocol.changes.entity_changed(self, SET.STATE)
 
     def set_position(self, x: float, y: float, z: float):
         if self.destroyed:
             return
-        self.position.set(x, y, z)
-        change_entity.entity_id = self.id
-        change_entity.type = SET.POSITION
-        change_entity.position.xyz = self.position.xyz
-        self.protocol.broadcast_loader(change_entity)
+        self.wo.set_position(x, y, z)
+        self.protocol.changes.entity_changed(self, SET.POSITION)
 
     def set_carrier(self, carrier: 'connection.ServerConnection'=None, force=False):
         if self.destroyed:
@@ -155,16 +170,28 @@ class Entity:
         if not force and carrier is self.carrier:
             return
         self.carrier = carrier
-        player = self.carrier.id if self.carrier else -1
+        self.protocol.changes.entity_changed(self, SET.CARRIER)
+
+    # the set_* methods above only mark what changed, this sends it as it is now. See changes.StateChanges
+    def broadcast_change(self, change: SET):
         change_entity.entity_id = self.id
-        change_entity.type = SET.CARRIER
-        change_entity.carrier = player
+        change_entity.type = change
+        if change == SET.STATE:
+            change_entity.state = self.team.id if self.team else TEAM.NEUTRAL
+        elif change == SET.CARRIER:
+            change_entity.carrier = self.carrier.id if self.carrier else -1
+        else:
+            change_entity.position.xyz = self.position.xyz
         self.protocol.broadcast_loader(change_entity)
 
+    def broadcast_position(self):
+        self.broadcast_change(SET.POSITION)
+
     def destroy(self):
         if self.destroyed:
             return
         self.destroyed = True
+        self.protocol.world.remove(self.wo)
         self.protocol.destroy_entity(self)
 
     def to_loader(self):
@@ -293,11 +320,10 @@ class Explosive:
 
         x, y, z = self.wo.position.xyz
         self.thrower.destroy_block(int(x), int(y), int(z), ACTION.GRENADE)
-        for player in self.protocol.players.values():
-            if player.dead: continue
-
+        players = self.protocol.world.query_radius(self.wo.position, 16)
+        for player, hit in zip(players, self.hit_test_many(players)):
             dist = player.position.sq_distance(self.wo.position)
-            if dist < 16 ** 2 and self.hit_test(player):
+            if dist < 16 ** 2 and hit:
                 if dist == 0:
                     damage = 100
                 else:
@@ -305,12 +331,21 @@ class Explosive:
                 player.hurt(damage, KILL.GRENADE, self.thrower, self.position.xyz)
         self.protocol.loop.create_task(self.on_explode(self))
 
-    def broadcast_item(self, predicate=None):
+    def broadcast_item(self, predicate=None, recipients: 'util.Recipients'=None):
         raise NotImplementedError
 
     def hit_test(self, player: 'connection.ServerConnection'):
         return not world.cast_ray(self.protocol.map, player.position, self.wo.position, isdirection=False)
 
+    def hit_test_many(self, players: List['connection.ServerConnection']) -> List[bool]:
+        # whether the blast reaches each of `players`. Subclasses that only override hit_test still get asked per player
+        if type(self).hit_test is not Explosive.hit_test:
+            return [self.hit_test(player) for player in players]
+        # line of sight for everyone in range in one go
+        blocked = world.cast_rays(self.protocol.map, [player.position for player in players],
+                                  [self.wo.position] * len(players))
+        return [not wall for wall in blocked]
+
     def destroy(self):
         self.destroyed = True
         self.protocol.destroy_object(self)
@@ -328,6 +363,7 @@ class Grenade(Explosive):
     def __init__(self, protocol: 'protocol.ServerProtocol', thrower: 'connection.ServerConnection', position, velocity, fuse=5):
         self.wo = world.Grenade(protocol.map, *position, *velocity)
         super().__init__(protocol, self.wo, thrower)
+        self.protocol.world.add(self.wo, self)
 
         self.start_time = self.protocol.time
         self.explode_time = self.start_time + fuse
@@ -335,22 +371,35 @@ class Grenade(Explosive):
     def update(self, dt):
         if self.destroyed: return
 
-        bounced = self.wo.update(dt, self.protocol.time)
-        if bounced:
-            self.protocol.loop.create_task(self.on_collide(self))
         if self.protocol.time >= self.explode_time:
             self.explode()
 
+    def on_world_event(self, event: world.WORLD_EVENT, value: int):
+        if event == world.WORLD_EVENT.BOUNCED:
+            self.protocol.loop.create_task(self.on_collide(self))
+
+    def destroy(self):
+        super().destroy()
+        self.protocol.world.remove(self.wo)
+
     def next_collision(self, dt: float, max: float=5):
-        return self.wo.next_collision(dt, max)
+        bounces, end = self.protocol.grenade_paths.predict(self.wo.position, self.wo.velocity, max, dt)
+        if bounces:
+            eta, position = bounces[0]
+            return eta, math3d.Vector3(*position)
+        return False, math3d.Vector3(*end)
+
+    def predict_path(self, dt: float=1 / 60):
+        # every bounce left as (seconds from now, (x, y, z)) and where it'll explode
+        return self.protocol.grenade_paths.predict(self.wo.position, self.wo.velocity, max(self.fuse, 0), dt)
 
-    def broadcast_item(self, predicate=None):
+    def broadcast_item(self, predicate=None, recipients: 'util.Recipients'=None):
         oriented_item.player_id = self.thrower.id
         oriented_item.value = self.fuse
         oriented_item.position.xyz = self.wo.position.xyz
         oriented_item.velocity.xyz = self.wo.velocity.xyz
         oriented_item.tool = TOOL.GRENADE
-        self.protocol.broadcast_loader(oriented_item, predicate=predicate)
+        self.protocol.broadcast_loader(oriented_item, predicate=predicate, recipients=recipients)
 
     @property
     def fuse(self):
@@ -366,60 +415,42 @@ class Rocket(Explosive):
     on_explode = util.AsyncEvent()
 
     def __init__(self, protocol: 'protocol.ServerProtocol', thrower: 'connection.ServerConnection', position, orientation, value=None):
-        self.wo = world.GenericMovement(protocol.map, *position)
+        self.wo = world.Rocket(protocol.map, *position, *orientation)
         super().__init__(protocol, self.wo, thrower)
-
-        # i dont know math so im going to try my best to replicate the client
-        self.pitch = self.yaw = 0
-        self.yawmat = None
-        self.set_orientation(*orientation)
+        self.protocol.world.add(self.wo, self)
 
     def update(self, dt):
-        if self.destroyed: return
-
-        b = math3d.Matrix4x4.rotate(self.pitch, math3d.Vector3(-1, 0, 0))
-        rotation = b * self.yawmat
-
-        # im not sure if the error is in my Matrix class or mat's, but mat4 * vec3 behaves differently
-        # his implementation seems to multiply each matrix column by the vector, not each row, which is how i learned it
-        # so instead of doing the proper thing (velocity = rotation * vec3(0, 0, -1)) we'll just emulate his version
-        velocity = tuple(x for x in rotation.get_row(2)[:3])
-        velocity = math3d.Vector3(-velocity[0], -velocity[2], velocity[1])
-
-        f = dt * ROCKET_SPEED
-        self.wo.position += velocity * f
+        # flight and collision are stepped by the native world
+        pass
 
-        bounced = self.wo.update(dt, self.protocol.time)
-        if bounced:
+    def on_world_event(self, event: world.WORLD_EVENT, value: int):
+        if event == world.WORLD_EVENT.HIT and not self.destroyed:
             self.explode()
 
-        self.pitch += math.radians(ROCKET_FALLOFF) * dt
+    def destroy(self):
+        super().destroy()
+        self.protocol.world.remove(self.wo)
 
-    def set_orientation(self, x: int, y: int, z: int):
-        try:
-            self.pitch = math.asin(z)
-        except ValueError:
-            self.pitch = math.pi / 2
+    def set_orientation(self, x: float, y: float, z: float):
+        self.wo.set_orientation(x, y, z)
 
-        try:
-            self.yaw = math.atan2(x, y)
-        except ValueError:
-            self.yaw = 0.0
+    def get_orientation(self) -> (float, float, float):
+        return self.wo.get_orientation()
 
-        self.yawmat = math3d.Matrix4x4.rotate(self.yaw + math.pi, math3d.Vector3(0, 1, 0))
+    @property
+    def pitch(self):
+        return self.wo.pitch
 
-    def get_orientation(self) -> (int, int, int):
-        x = math.sin(self.yaw) * math.cos(self.pitch)
-        y = math.cos(self.yaw) * math.cos(self.pitch)
-        z = math.sin(self.pitch)
-        return (x, y, z)
+    @property
+    def yaw(self):
+        return self.wo.yaw
 
     # a1 client is bork, assumes all UseOrientedItem packets are grenades.
     # (this is fixed in later builds)
-    def broadcast_item(self, predicate=None):
+    def broadcast_item(self, predicate=None, recipients: 'util.Recipients'=None):
         oriented_item.player_id = self.thrower.id
         oriented_item.value = 0
         oriented_item.position.xyz = self.wo.position.xyz
         oriented_item.velocity.xyz = self.get_orientation()
         oriented_item.tool = TOOL.RPG
-        self.protocol.broadcast_loader(oriented_item, predicate=predicate)
+        self.protocol.broadcast_loader(oriented_item, predicate=predicate, recipients=recipients)
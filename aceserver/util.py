@@ -7,7 +7,7 @@ import weakref
 from typing import Union, Tuple
 from urllib import request, parse
 
-__all__ = ["IDPool", "Event", "static_vars", "get_ip", "get_identifier", "read_identifier"]
+__all__ = ["IDPool", "Event", "Recipients", "static_vars", "get_ip", "get_identifier", "read_identifier"]
 
 
 class IDPool:
@@ -100,6 +100,39 @@ class AsyncEvent(Event):
             self.flush()
 
 
+class Recipients:
+    # A group of connections to send to, kept current by ServerProtocol.regroup as they connect, change team, spawn,
+    # die and leave. pyenet only exposes peers as Python objects, so the group keeps them in a tuple that's rebuilt
+    # when it changes and a send is a single pass over it with the one packet.
+    def __init__(self):
+        self.members = {}
+        self.peers = ()
+
+    def set(self, conn, member: bool):
+        if member == (conn in self.members):
+            return
+        if member:
+            self.members[conn] = conn.peer
+        else:
+            del self.members[conn]
+        self.peers = tuple(self.members.values())
+
+    def send(self, packet, exclude=None):
+        skip = exclude.peer if exclude is not None else None
+        for peer in self.peers:
+            if peer is not skip:
+                peer.send(0, packet)
+
+    def __contains__(self, conn):
+        return conn in self.members
+
+    def __iter__(self):
+        return iter(tuple(self.members))
+
+    def __len__(self):
+        return len(self.members)
+
+
 def static_vars(**kwargs):
     def wrapper(func):
         for var, obj in kwargs.items():
@@ -113,8 +113,8 @@ class Block(Tool):
         self.color.rgb = r, g, b
         loaders.set_color.player_id = self.connection.id
         loaders.set_color.color.rgb = r, g, b
-        predicate = lambda conn: conn != self.connection if sender_is_self else None
-        self.connection.protocol.broadcast_loader(loaders.set_color, predicate)
+        exclude = self.connection if sender_is_self else None
+        self.connection.protocol.broadcast_loader(loaders.set_color, exclude=exclude)
 
 
 class Weapon(Tool):
@@ -124,6 +124,8 @@ class Weapon(Tool):
 
     damage = {HIT.TORSO: None, HIT.HEAD: None, HIT.ARMS: None, HIT.LEGS: None}
     falloff = 0
+    # how far off the shooter's orientation a reported hit may be, see ServerProtocol.trace_hits
+    hit_spread = HITSCAN_SPREAD
 
     def __init__(self, connection: 'connection.ServerConnection'):
         super().__init__(connection)
@@ -253,6 +255,8 @@ class Shotgun(Weapon):
 
     damage = {HIT.TORSO: 25, HIT.HEAD: 30, HIT.ARMS: 20, HIT.LEGS: 20}
     falloff = 0.40
+    # pellets spread out from where the player aims
+    hit_spread = 0.2
 
 
 class RPG(Weapon):
@@ -1,3 +1,4 @@
+import sys
 from distutils.core import setup, Extension
 from Cython.Build import cythonize
 
@@ -7,10 +8,15 @@ include = []
 
 link_args = []
 compile_args = []
+if sys.platform != "win32":
+    # the native thread pool (pool_c.h)
+    link_args.append("-pthread")
+    compile_args.append("-pthread")
 
 for name in names:
     #                                                                 TODO: FIX THIS (build as library?)
-    modules.append(Extension(name, [f"{name.replace('.', '/')}.pyx", "acelib/vxl_c.cpp"], language="c++", include_dirs=['acelib']))
+    modules.append(Extension(name, [f"{name.replace('.', '/')}.pyx", "acelib/vxl_c.cpp"], language="c++", include_dirs=['acelib'],
+                             extra_compile_args=compile_args, extra_link_args=link_args))
 
 setup(
     name='ext',